@@ -1,17 +1,688 @@
 # Веб-моделювання трансакційних витрат.
+import os
+import tempfile
+import time
+import uuid
+from typing import Dict, Tuple
+
+import numpy as np
 import streamlit as st
 import pandas as pd  # для таблиць
+
+import profiling
 from model_transaction_costs import (
+    RESULT_FIELDS,
     ModelParams,
     ExtraItem,
     calc_total,
+    params_key,
+)
+from calibration import load_params
+from downsampling import lttb
+from library import DEFAULT_PATH as DEFAULT_LIBRARY_PATH, ScenarioLibrary
+from formulas import Formula, FormulaError, compile_formulas, evaluate
+from profiling import instrument
+from projection import ProjectionSpec, StaffStep, project, seasonal_profile
+from reports import breakdown_rows, store_conclusion, write_pdf, write_xlsx
+from jobs import JobRunner
+from monte_carlo import SHARE_FIELDS, relative_triangular, simulate, summarize
+from scenario_store import COMPARISON_COLUMNS, PLOT_COLUMNS, ScenarioStore
+from sensitivity import relative_bounds, sobol, tornado
+from optimizer import (
+    DEFAULT_BOUNDS,
+    marketing_budget,
+    min_orders,
+    optimize,
+    pareto_front,
+)
+
+# Скільки останніх сценаріїв показувати на графіку прогнозу
+PROJECTION_CHART_SCENARIOS = 10
+
+# Статті витрат на графіку прогнозу
+PROJECTION_COMPONENTS = {
+    "logistics": "Логістика",
+    "payments": "Платіжні сервіси",
+    "marketing": "Маркетинг",
+    "staff": "Персонал",
+    "extra_net": "Додаткові",
+}
+
+# Тип і база нарахування додаткового показника (підпис -> код ExtraItem)
+EXTRA_KIND_LABELS = {
+    "Витрати (+ до витрат)": "cost",
+    "Дохід (– до витрат)": "revenue",
+}
+EXTRA_BASIS_LABELS = {
+    "Фіксована сума, грн": "flat",
+    "На замовлення, грн": "per_order",
+    "На повернення, грн": "per_return",
+    "% від виручки": "percent_of_revenue",
+}
+
+# Параметри, які в Монте-Карло вважаються невизначеними
+UNCERTAIN_FIELDS = ("p_loc", "return_rate", "online_share", "cac", "avg_check")
+
+# Формат числових колонок таблиці порівняння (значення зберігаються числами)
+COMPARISON_FORMATS = {
+    "Q (замовлення)": "%d",
+    "Середній чек, грн": "%.2f",
+    "Частка локальних доставок": "%.3f",
+    "Частка міжобласних": "%.3f",
+    "Рівень повернень": "%.4f",
+    "Вартість локальної доставк., грн": "%.2f",
+    "Вартість міжобласної доставк., грн": "%.2f",
+    "Повернення локал., грн": "%.2f",
+    "Повернення міжобл., грн": "%.2f",
+    "Частка онлайн оплат": "%.3f",
+    "Комісія платіжного сервісу, %": "%.2f",
+    "Залучені клієнти": "%d",
+    "CAC, грн": "%.2f",
+    "Фіксовані витрати персонал, грн": "%.2f",
+    "Змінні витрати на замовлення, грн": "%.2f",
+    "Логістика, грн": "%.2f",
+    "Платіжні сервіси, грн": "%.2f",
+    "Маркетинг, грн": "%.2f",
+    "Персонал, грн": "%.2f",
+    "Додаткові, грн": "%.2f",
+    "Разом, грн": "%.2f",
+}
+
+# Колонка графіка -> (поле сховища, множник)
+PLOT_FIELDS = {label: (name, scale) for label, name, scale in PLOT_COLUMNS}
+
+# Числові колонки таблиці порівняння -> (поле сховища, множник) для
+# сортування й фільтрування на сервері
+COMPARISON_FIELDS = {
+    label: (name, scale) for label, name, scale in COMPARISON_COLUMNS if name != "extras"
+}
+COMPARISON_PAGE_SIZES = (25, 50, 100, 500)
+
+# Більше точок графік не отримує: довші ряди проріджуються LTTB
+CHART_POINT_BUDGET = 2000
+
+REPORT_WRITERS = {"pdf": write_pdf, "xlsx": write_xlsx}
+
+# Фонові завдання: як часто панель опитує хід виконання і як часто
+# Монте-Карло перераховує проміжні перцентилі, с
+JOB_POLL_SECONDS = 1.0
+MC_PARTIAL_SECONDS = 1.0
+JOB_STATUS_LABELS = {
+    "queued": "у черзі",
+    "running": "виконується",
+    "done": "готово",
+    "failed": "помилка",
+    "cancelled": "скасовано",
+}
+
+# Поля, які може змінювати оптимізатор (p_int = 1 - p_loc)
+OPTIMIZE_FIELDS = {
+    "Q": "Кількість замовлень",
+    "avg_check": "Середній чек",
+    "p_loc": "Частка локальних доставок",
+    "return_rate": "Рівень повернень",
+    "online_share": "Частка онлайн-оплат",
+    "pay_commission": "Комісія платіжного сервісу",
+    "n_new_customers": "Залучені клієнти",
+    "cac": "CAC",
+    "staff_fixed": "Фіксовані витрати на персонал",
+    "staff_per_order": "Витрати на обробку одного замовлення",
+}
+
+
+# --- КЕШОВАНІ ОБЧИСЛЕННЯ ---
+# Ключем кешу є хеш вмісту ModelParams (params_key) або ключ сховища
+# сценаріїв (змінюється при кожному додаванні), тому самі об'єкти
+# (аргументи з "_") Streamlit не хешує.
+
+
+# Параметри, відкалібровані за історичними даними (calibration.py);
+# якщо файлу немає, використовуються значення 2024 року
+CALIBRATED_PARAMS_PATH = os.environ.get(
+    "BAGSHOP_CALIBRATED_PARAMS",
+    os.path.join(os.path.dirname(__file__), "calibrated_params.json"),
 )
 
+
+@st.cache_resource
+def default_params(path: str = CALIBRATED_PARAMS_PATH) -> ModelParams:
+    if os.path.exists(path):
+        return load_params(path)
+    return ModelParams(
+        Q=10900,
+        avg_check=870,
+        p_loc=0.30,
+        p_int=0.70,
+        return_rate=0.061,
+        c_loc=45,
+        c_int=50,
+        c_ret_loc=15,
+        c_ret_int=20,
+        online_share=0.50,
+        pay_commission=0.0275,
+        n_new_customers=12308,
+        cac=52,
+        staff_fixed=500000,
+        staff_per_order=22,
+        extra_items=[],
+    )
+
+
+def input_bounds(params: ModelParams) -> Dict[str, Tuple[float, float]]:
+    # Межі полів вводу та оптимізатора: DEFAULT_BOUNDS, розширені під
+    # значення за замовчуванням. calibrate() підсумовує замовлення всіх
+    # журналів, тож рік даних дає Q у мільйонах; тоді межа - удвічі більша
+    # за значення, щоб його можна було й збільшити (частки - не більше 1).
+    bounds = {}
+    for name, (lo, hi) in DEFAULT_BOUNDS.items():
+        wider = 2.0 * float(getattr(params, name))
+        if name in SHARE_FIELDS:
+            wider = min(wider, 1.0)
+        bounds[name] = (lo, max(hi, wider))
+    return bounds
+
+
+@st.cache_data(max_entries=1000)
+def cached_total(key: str, _params: ModelParams, _formulas=None) -> dict:
+    # key - params_key разом із ключем набору формул
+    return evaluate(_params, _formulas)
+
+
+@st.cache_data(max_entries=1000)
+def result_table(key: str, _res: dict) -> pd.DataFrame:
+    table = []
+    for number, (label, value) in enumerate(breakdown_rows(_res), start=1):
+        text = f"{value:.2f}"
+        if label == "Додаткові показники":
+            text += " (+)" if value > 0 else " (-)"
+        table.append({"№": number, "Стаття": label, "Сума, грн": text})
+    return pd.DataFrame(table).set_index("№")
+
+
+@st.cache_data(max_entries=100)
+def chart_frame(key: str, x_metric: str, y_metric: str, _store: ScenarioStore) -> pd.DataFrame:
+    # Колонки x / y: назви з крапками й комами vega-lite трактує як шляхи.
+    # Понад CHART_POINT_BUDGET точок ряд проріджується зі збереженням форми
+    # (піки й провали лишаються), тож обсяг даних для браузера не зростає
+    # разом із кількістю сценаріїв.
+    x_name, x_scale = PLOT_FIELDS[x_metric]
+    y_name, y_scale = PLOT_FIELDS[y_metric]
+    order = _store.order_by(x_name)
+    x = _store.column(x_name)[order]
+    y = _store.column(y_name)[order]
+    if len(order) > CHART_POINT_BUDGET:
+        picked = lttb(x, y, CHART_POINT_BUDGET)
+        x, y = x[picked], y[picked]
+    return pd.DataFrame({"x": x * x_scale, "y": y * y_scale})
+
+
+def line_chart_spec(x_metric: str, y_metric: str) -> dict:
+    # Готова специфікація vega-lite: st.line_chart щоразу будує графік
+    # через Altair, що на тисячах точок займає більшу частину перезапуску
+    return {
+        "mark": {"type": "line"},
+        "encoding": {
+            "x": {"field": "x", "type": "quantitative", "title": x_metric},
+            "y": {"field": "y", "type": "quantitative", "title": y_metric},
+        },
+    }
+
+
+@st.cache_data(max_entries=100)
+def sensitivity_frames(key: str, percent: int, _params: ModelParams):
+    bounds = relative_bounds(_params, rel=percent / 100.0)
+    return tornado(_params, bounds), sobol(_params, bounds, n=2048)
+
+
+@st.cache_data(max_entries=100)
+def projection_frames(key: str, spec: ProjectionSpec, _store: ScenarioStore):
+    # Прогноз для всіх сценаріїв сховища одним векторизованим проходом
+    # каталоги статей і набори формул - щоб статті на замовлення /
+    # повернення / % від виручки і власні статті зростали разом з Q періоду
+    proj = project(
+        _store.batch(), spec,
+        extra_items=_store.extra_catalogs(), formulas=_store.formula_sets(),
+    )
+    components = proj.frame(len(_store) - 1)[list(PROJECTION_COMPONENTS)]
+    components = components.rename(columns=PROJECTION_COMPONENTS)
+    shown = slice(max(len(_store) - PROJECTION_CHART_SCENARIOS, 0), len(_store))
+    cumulative = proj.metric_frame("total", cumulative=True, names=_store.ids.tolist())
+    cumulative = cumulative.iloc[:, shown]
+    horizon = pd.DataFrame(
+        {"Разом за горизонт, грн": proj.totals()["total"]},
+        index=pd.Index(_store.ids, name="Сценарій"),
+    )
+    approximate = _store.ids[proj.approximate].tolist()
+    return components, cumulative, horizon, approximate
+
+
+@st.fragment
+@instrument(name="app.projection")
+def projection_section():
+    # --- ПРОГНОЗ НА КІЛЬКА МІСЯЦІВ ---
+    store = st.session_state["scenarios"]
+    last = store[-1]
+    with st.expander("Прогноз на кілька місяців"):
+        months = st.slider("Горизонт прогнозу, міс.", min_value=12, max_value=60, value=12)
+        growth_percent = st.number_input(
+            "Приріст кількості замовлень за місяць, %",
+            min_value=-50.0,
+            max_value=50.0,
+            value=2.0,
+            step=0.5,
+        )
+        amplitude_percent = st.slider(
+            "Сезонні коливання рівня повернень, ±%",
+            min_value=0,
+            max_value=100,
+            value=20,
+        )
+        peak_month = st.selectbox(
+            "Місяць з найбільшою кількістю повернень",
+            options=list(range(1, 13)),
+            index=0,
+        )
+        step_q = st.number_input(
+            "Поріг замовлень за місяць для розширення штату (0 – без порогу)",
+            min_value=0,
+            value=0,
+            step=1000,
+        )
+        step_staff = st.number_input(
+            "Фіксовані витрати на персонал після порогу, грн",
+            min_value=0.0,
+            value=float(last.params.staff_fixed) * 1.5,
+            step=10000.0,
+        )
+        spec = ProjectionSpec(
+            periods=months,
+            q_growth=growth_percent / 100.0,
+            return_seasonality=tuple(
+                seasonal_profile(amplitude_percent / 100.0, peak_month - 1).tolist()
+            ),
+            staff_steps=(StaffStep(step_q, step_staff),) if step_q > 0 else (),
+        )
+        # вміст згорнутого блоку теж виконується при кожному перезапуску,
+        # тому графіки будуються лише на вимогу
+        if not st.checkbox("Показати прогноз"):
+            return
+        components, cumulative, horizon, approximate = projection_frames(store.key, spec, store)
+        if approximate:
+            st.warning(
+                "Прогноз наближений для сценаріїв "
+                + ", ".join(f"№{i}" for i in approximate)
+                + ": частина додаткових показників (без каталогу статей або "
+                "власні статті без формул) лишається на рівні першого місяця."
+            )
+
+        st.write(f"Витрати сценарію №{last.id} по місяцях, грн")
+        st.area_chart(components)
+        st.write("Накопичені загальні витрати, грн (останні сценарії)")
+        st.line_chart(cumulative)
+        st.dataframe(horizon, column_config={
+            "Разом за горизонт, грн": st.column_config.NumberColumn(format="%.2f")
+        })
+
+
+# --- СЕКЦІЇ ПОРІВНЯННЯ (фрагменти) ---
+
+
+@st.fragment
+@instrument(name="app.comparison")
+def comparison_section():
+    st.subheader("Порівняння сценаріїв")
+
+    store = st.session_state["scenarios"]
+    # Сортування, фільтр і поділ на сторінки виконуються на сервері:
+    # у браузер іде лише поточна сторінка, скільки б не було сценаріїв
+    sort_col, order_col, size_col = st.columns([2, 1, 1])
+    with sort_col:
+        sort_label = st.selectbox(
+            "Сортувати за", ["Сценарій"] + list(COMPARISON_FIELDS), key="comparison_sort"
+        )
+    with order_col:
+        descending = st.checkbox("За спаданням", key="comparison_descending")
+    with size_col:
+        page_size = st.selectbox(
+            "Рядків на сторінці", COMPARISON_PAGE_SIZES, key="comparison_page_size"
+        )
+
+    filters = {}
+    filter_col, low_col, high_col = st.columns([2, 1, 1])
+    with filter_col:
+        filter_label = st.selectbox(
+            "Фільтр", ["Без фільтра"] + list(COMPARISON_FIELDS), key="comparison_filter"
+        )
+    if filter_label in COMPARISON_FIELDS:
+        name, scale = COMPARISON_FIELDS[filter_label]
+        column = store.column(name)
+        smallest, largest = float(column.min() * scale), float(column.max() * scale)
+        with low_col:
+            low = st.number_input("Від", value=smallest)
+        with high_col:
+            high = st.number_input("До", value=largest)
+        # межі за замовчуванням не відсікають нічого (і не залежать від
+        # округлення при зворотному діленні на множник)
+        filters[name] = (
+            low / scale if low > smallest else None,
+            high / scale if high < largest else None,
+        )
+
+    sort_by = COMPARISON_FIELDS[sort_label][0] if sort_label in COMPARISON_FIELDS else None
+    rows = store.select(filters, sort_by=sort_by, ascending=not descending)
+    pages = max(1, -(-len(rows) // page_size))
+    page = st.number_input("Сторінка", min_value=1, max_value=pages, value=1, step=1)
+    start = (page - 1) * page_size
+    shown = rows[start:start + page_size]
+
+    st.dataframe(
+        store.comparison_page(shown),
+        use_container_width=True,
+        column_config={
+            label: st.column_config.NumberColumn(format=fmt)
+            for label, fmt in COMPARISON_FORMATS.items()
+        },
+    )
+    if len(rows):
+        st.caption(f"Рядки {start + 1}–{start + len(shown)} з {len(rows)} (усього {len(store)})")
+    else:
+        st.caption(f"Жоден зі сценаріїв ({len(store)}) не проходить фільтр")
+
+
+@st.fragment
+@instrument(name="app.chart")
+def chart_section():
+    # --- ГРАФІК ЗАЛЕЖНОСТЕЙ (X – обирається, Y – фіксоване «Разом, грн») ---
+    st.subheader("Графік залежності загальних трансакційних витрат")
+
+    store = st.session_state["scenarios"]
+    metric_options = [label for label, _, _ in PLOT_COLUMNS]
+
+    # кнопка показу графіка
+    if st.button("Створити графік"):
+        st.session_state["show_chart"] = True
+
+    if st.session_state["show_chart"]:
+        # Y фіксовано – «Разом, грн»
+        y_metric = "Разом, грн" if "Разом, грн" in metric_options else metric_options[-1]
+        x_options = [label for label in metric_options if label != y_metric]
+
+        # користувач обирає X
+        x_metric = st.selectbox(
+            "Показник по осі X",
+            options=x_options,
+            index=x_options.index("Частка онлайн оплат, %")
+            if "Частка онлайн оплат, %" in x_options
+            else 0,
+        )
+
+        chart_df = chart_frame(store.key, x_metric, y_metric, store)
+        st.vega_lite_chart(
+            chart_df, line_chart_spec(x_metric, y_metric), use_container_width=True
+        )
+
+        st.caption(
+            f"На графіку показано, як змінюється загальна сума трансакційних витрат "
+            f"(«{y_metric}») залежно від вибраного показника «{x_metric}» "
+            "для всіх розрахованих сценаріїв."
+        )
+        if len(chart_df) < len(store):
+            st.caption(
+                f"Показано {len(chart_df)} з {len(store)} точок "
+                "(проріджено зі збереженням форми кривої)."
+            )
+
+
+@st.fragment
+@instrument(name="app.sensitivity")
+def sensitivity_section():
+    # --- АНАЛІЗ ЧУТЛИВОСТІ ---
+    store = st.session_state["scenarios"]
+    if st.checkbox("Показати аналіз чутливості"):
+        scenario_ids = store.ids.tolist()
+        sens_id = st.selectbox(
+            "Сценарій для аналізу",
+            options=scenario_ids,
+            index=len(scenario_ids) - 1,
+        )
+        sens_percent = st.slider(
+            "Діапазон зміни параметрів, ±%",
+            min_value=1,
+            max_value=50,
+            value=10,
+        )
+        sens_params = store[sens_id - 1].params
+        tornado_df, sobol_df = sensitivity_frames(
+            params_key(sens_params), sens_percent, sens_params
+        )
+
+        st.write("Торнадо-діаграма: розмах «Разом, грн» при зміні одного параметра")
+        st.bar_chart(tornado_df.set_index("field")["swing"])
+
+        st.write("Індекси Соболя (S1 – власний внесок, ST – з урахуванням взаємодій)")
+        st.bar_chart(sobol_df.set_index("field")[["S1", "ST"]])
+
+
+@st.cache_data(max_entries=100)
+def conclusion_text(key: str, _store: ScenarioStore) -> str:
+    return store_conclusion(_store)
+
+
+@st.cache_data(max_entries=4)
+def report_file(key: str, fmt: str, _store: ScenarioStore) -> bytes:
+    # Звіт reports.py для поточних сценаріїв (формується лише на вимогу)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"report.{fmt}")
+        REPORT_WRITERS[fmt](_store, path, "Порівняння сценаріїв BagShop")
+        with open(path, "rb") as fh:
+            return fh.read()
+
+
+@st.fragment
+@instrument(name="app.conclusion")
+def conclusion_section():
+    # --- Далі твій оригінальний детальний висновок ---
+    store = st.session_state["scenarios"]
+    st.subheader("Висновок")
+    st.write(conclusion_text(store.key, store))
+
+    if st.checkbox("Сформувати звіт (PDF / XLSX)"):
+        try:
+            pdf = report_file(store.key, "pdf", store)
+            xlsx = report_file(store.key, "xlsx", store)
+        except (ImportError, RuntimeError) as e:
+            st.warning(str(e))
+        else:
+            col1, col2 = st.columns(2)
+            col1.download_button("Завантажити PDF", pdf, file_name="bagshop_report.pdf",
+                                 mime="application/pdf")
+            col2.download_button(
+                "Завантажити XLSX", xlsx, file_name="bagshop_report.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+
+    # Кнопка скидання (перезапускає весь застосунок, а не лише фрагмент)
+    if st.button("Почати спочатку"):
+        st.session_state["scenarios"] = ScenarioStore()
+        st.session_state["compare_clicked"] = False
+        st.session_state["show_chart"] = False
+        st.rerun()
+
+
+# --- БІБЛІОТЕКА СЦЕНАРІЇВ ---
+# Спільна для всіх сесій (library.py); шлях - змінна BAGSHOP_LIBRARY
+
+
+@st.cache_resource
+def scenario_library() -> ScenarioLibrary:
+    return ScenarioLibrary(os.environ.get("BAGSHOP_LIBRARY", DEFAULT_LIBRARY_PATH))
+
+
+def _tag_list(text: str) -> list:
+    return [t.strip() for t in text.split(",") if t.strip()]
+
+
+@st.fragment
+@instrument(name="app.library")
+def library_section():
+    library = scenario_library()
+    store = st.session_state["scenarios"]
+    st.caption(f"Збережено сценаріїв: {len(library)}")
+
+    if store:
+        last = store[-1]
+        col1, col2 = st.columns(2)
+        name = col1.text_input("Назва", value=f"Сценарій №{last.id}")
+        tags = col2.text_input("Теги (через кому)", key="library_save_tags")
+        if st.button("Зберегти останній сценарій"):
+            key = library.save(last.params, last.result, name=name, tags=_tag_list(tags))
+            st.success(f"Збережено (ключ {key[:12]}…)")
+
+    col1, col2 = st.columns(2)
+    text = col1.text_input("Пошук за назвою чи тегом")
+    tags = col2.text_input("Лише з тегами (через кому)", key="library_search_tags")
+    found = library.search(text, _tag_list(tags), limit=1000)
+    st.dataframe(
+        found.rename(
+            columns={"name": "Назва", "tags": "Теги", "created": "Збережено", "total": "Разом, грн"}
+        ).drop(columns="key"),
+        hide_index=True,
+        use_container_width=True,
+        column_config={"Разом, грн": st.column_config.NumberColumn(format="%.2f")},
+    )
+    col1, col2, col3 = st.columns(3)
+    if col1.button("Додати знайдені до порівняння", disabled=found.empty):
+        library.to_store(found["key"].tolist(), store)
+        st.rerun()
+    if col2.button("Додати всю бібліотеку", disabled=not len(library)):
+        library.to_store(store=store)
+        st.rerun()
+    # файл експорту готується лише на запит, а не при кожному перезапуску
+    if not found.empty and col3.checkbox("Експорт знайдених"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "scenarios.csv")
+            library.export(path, found["key"].tolist())
+            with open(path, "rb") as fh:
+                col3.download_button("Експорт (CSV)", fh.read(), file_name="scenarios.csv")
+
+    upload = st.file_uploader("Імпорт сценаріїв (CSV або JSONL)", type=["csv", "jsonl"])
+    if upload is not None and st.button("Імпортувати"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, upload.name)
+            with open(path, "wb") as fh:
+                fh.write(upload.getbuffer())
+            added = library.import_file(path, tags=_tag_list(tags))
+        st.success(f"Додано нових сценаріїв: {added}")
+
+
 st.set_page_config(
     page_title="Розрахунок транcакційних витрат",
     layout="centered",
 )
 
+# --- ФОНОВІ ЗАВДАННЯ ---
+# Один JobRunner (jobs.py) на процес Streamlit, спільний для всіх сесій;
+# кількість потоків - BAGSHOP_JOB_WORKERS. Власник завдань -
+# ідентифікатор у query-параметрі "session": після перезавантаження
+# сторінки URL той самий, і сесія знову бачить свої завдання.
+
+
+@st.cache_resource
+def job_runner() -> JobRunner:
+    return JobRunner()
+
+
+def job_owner() -> str:
+    owner = st.query_params.get("session")
+    if not owner:
+        owner = uuid.uuid4().hex
+        st.query_params["session"] = owner
+    return owner
+
+
+def monte_carlo_job(ctx, params: ModelParams, spread: float, n_samples: int) -> dict:
+    # Виконується в потоці JobRunner: хід - після кожного блоку вибірок,
+    # проміжні перцентилі (лише total, повний summarize на мільйоні
+    # вибірок займає секунди) - не частіше ніж раз на MC_PARTIAL_SECONDS
+    point = calc_total(params)["total"]
+    total_row = RESULT_FIELDS.index("total")
+    last = time.monotonic()
+
+    def progress(done: int, total: int, blocks: list) -> None:
+        nonlocal last
+        partial = None
+        if done < total and time.monotonic() - last >= MC_PARTIAL_SECONDS:
+            samples = np.concatenate([block[total_row] for block in blocks])[None, :]
+            partial = {
+                "point": point,
+                "mc": summarize(samples, ["total"], (5, 50, 95), tail_levels=(), bins=1),
+            }
+            last = time.monotonic()
+        samples = sum(block.shape[1] for block in blocks)
+        message = f"{samples} з {n_samples} вибірок"
+        if done == total:
+            message += ", підсумкові перцентилі та хвости розподілу"
+        ctx.progress(done / total, message, partial)
+
+    mc = simulate(
+        params,
+        relative_triangular(params, {name: spread for name in UNCERTAIN_FIELDS}),
+        n_samples=n_samples,
+        workers=1,
+        progress=progress,
+    )
+    return {"point": point, "mc": mc}
+
+
+def monte_carlo_view(value: dict) -> None:
+    mc = value["mc"]
+    p = mc.percentiles.loc["total"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Точкова оцінка, грн", f"{value['point']:.2f}")
+    col2.metric("P5, грн", f"{p['P5']:.2f}")
+    col3.metric("P50, грн", f"{p['P50']:.2f}")
+    col4.metric("P95, грн", f"{p['P95']:.2f}")
+    st.dataframe(mc.percentiles[["P5", "P50", "P95"]])
+
+
+def jobs_panel() -> bool:
+    # Повертає True, якщо є завдання в черзі або у виконанні
+    runner = job_runner()
+    jobs = runner.jobs(job_owner())
+    st.subheader("Фонові завдання")
+    for job in jobs:
+        st.write(
+            f"**{job.name}** — {JOB_STATUS_LABELS[job.status]}"
+            + (f" ({job.elapsed:.1f} с)" if job.started else "")
+        )
+        if job.active:
+            col1, col2 = st.columns([4, 1])
+            col1.progress(job.progress, text=job.message or None)
+            if col2.button("Скасувати", key=f"job_cancel_{job.id}"):
+                runner.cancel(job.id)
+            if job.partial is not None:
+                st.caption(f"Проміжний результат за {job.partial['mc'].n_samples} вибірками")
+                monte_carlo_view(job.partial)
+        elif job.status == "done":
+            monte_carlo_view(job.result)
+        elif job.status == "failed":
+            st.error(job.error)
+    return any(job.active for job in jobs)
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def active_jobs_section():
+    # Опитування перезапускає лише цей фрагмент; коли всі завдання
+    # завершились, повний перезапуск замінює його на jobs_section
+    if not jobs_panel():
+        st.rerun()
+
+
+@st.fragment
+def jobs_section():
+    jobs_panel()
+
+
 st.title("Моделювання транcакційних витрат BagShop")
 st.write(
     "Введіть параметри нижче та натисніть **«Розрахувати»**, "
@@ -20,7 +691,7 @@ st.write(
 
 # Пам'ять сценаріїв
 if "scenarios" not in st.session_state:
-    st.session_state["scenarios"] = []
+    st.session_state["scenarios"] = ScenarioStore()
 
 # прапорець для показу блоку порівняння (щоб графік не зникав)
 if "compare_clicked" not in st.session_state:
@@ -31,39 +702,24 @@ if "show_chart" not in st.session_state:
     st.session_state["show_chart"] = False
 
 # Значення за замовчуванням (2024 рік)
-default = ModelParams(
-    Q=10900,
-    avg_check=870,
-    p_loc=0.30,
-    p_int=0.70,
-    return_rate=0.061,
-    c_loc=45,
-    c_int=50,
-    c_ret_loc=15,
-    c_ret_int=20,
-    online_share=0.50,
-    pay_commission=0.0275,
-    n_new_customers=12308,
-    cac=52,
-    staff_fixed=500000,
-    staff_per_order=22,
-    extra_items=[],
-)
+default = default_params()
+bounds = input_bounds(default)
 
+inputs_timer = profiling.begin("app.inputs")
 st.subheader("Вхідні дані")
 
 Q = st.number_input(
     "Кількість замовлень",
     min_value=0,
-    max_value=100000,
-    value=default.Q,
+    max_value=int(bounds["Q"][1]),
+    value=int(default.Q),
     step=100,
 )
 
 avg_check = st.number_input(
     "Середній чек (грн)",
     min_value=0.0,
-    max_value=10000.0,
+    max_value=bounds["avg_check"][1],
     value=float(default.avg_check),
     step=10.0,
 )
@@ -89,14 +745,14 @@ return_rate = st.slider(
 c_loc = st.number_input(
     "Вартість локальної доставки, грн",
     min_value=0.0,
-    max_value=500.0,
+    max_value=bounds["c_loc"][1],
     value=float(default.c_loc),
     step=5.0,
 )
 c_int = st.number_input(
     "Вартість міжобласної доставки, грн",
     min_value=0.0,
-    max_value=500.0,
+    max_value=bounds["c_int"][1],
     value=float(default.c_int),
     step=5.0,
 )
@@ -104,14 +760,14 @@ c_int = st.number_input(
 c_ret_loc = st.number_input(
     "Вартість повернення локальної доставки, грн",
     min_value=0.0,
-    max_value=200.0,
+    max_value=bounds["c_ret_loc"][1],
     value=float(default.c_ret_loc),
     step=1.0,
 )
 c_ret_int = st.number_input(
     "Вартість повернення міжобласної доставки, грн",
     min_value=0.0,
-    max_value=200.0,
+    max_value=bounds["c_ret_int"][1],
     value=float(default.c_ret_int),
     step=1.0,
 )
@@ -127,7 +783,7 @@ online_share = st.slider(
 pay_commission_percent = st.number_input(
     "Комісія платіжного сервісу (%)",
     min_value=0.0,
-    max_value=10.0,
+    max_value=bounds["pay_commission"][1] * 100,
     value=float(default.pay_commission * 100),
     step=0.1,
 )
@@ -136,15 +792,15 @@ pay_commission = pay_commission_percent / 100.0
 n_new_customers = st.number_input(
     "Залучені клієнти",
     min_value=0,
-    max_value=50000,
-    value=default.n_new_customers,
+    max_value=int(bounds["n_new_customers"][1]),
+    value=int(default.n_new_customers),
     step=100,
 )
 
 cac = st.number_input(
     "CAC (грн)",
     min_value=0.0,
-    max_value=200.0,
+    max_value=bounds["cac"][1],
     value=float(default.cac),
     step=1.0,
 )
@@ -152,7 +808,7 @@ cac = st.number_input(
 staff_fixed = st.number_input(
     "Фіксовані витрати на персонал, грн",
     min_value=0.0,
-    max_value=10000000.0,
+    max_value=bounds["staff_fixed"][1],
     value=float(default.staff_fixed),
     step=10000.0,
 )
@@ -160,36 +816,95 @@ staff_fixed = st.number_input(
 staff_per_order = st.number_input(
     "Витрати на обробку одного замовлення, грн",
     min_value=0.0,
-    max_value=200.0,
+    max_value=bounds["staff_per_order"][1],
     value=float(default.staff_per_order),
     step=1.0,
 )
 
-# Додати показник
-st.subheader("Додатковий показник (за бажанням)")
-add_extra = st.checkbox("Додати додатковий показник до поточного сценарію")
+# Додаткові показники
+st.subheader("Додаткові показники (за бажанням)")
+add_extra = st.checkbox("Додати додаткові показники до поточного сценарію")
 extra_items = []
 if add_extra:
-    extra_kind_label = st.radio(
-        "Тип показника",
-        ["Додаткові витрати (+ до витрат)", "Додатковий дохід (– до витрат)"],
-    )
-    extra_name = st.text_input("Назва показника")
-    extra_amount = st.number_input(
-        "Сума показника, грн",
-        min_value=0.0,
-        value=0.0,
-        step=10.0,
+    extra_df = st.data_editor(
+        pd.DataFrame(
+            {
+                "Назва": [""],
+                "Тип": [next(iter(EXTRA_KIND_LABELS))],
+                "База": [next(iter(EXTRA_BASIS_LABELS))],
+                "Категорія": [""],
+                "Сума": [0.0],
+            }
+        ),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "Тип": st.column_config.SelectboxColumn(
+                options=list(EXTRA_KIND_LABELS), required=True
+            ),
+            "База": st.column_config.SelectboxColumn(
+                options=list(EXTRA_BASIS_LABELS), required=True
+            ),
+            "Сума": st.column_config.NumberColumn(min_value=0.0, format="%.2f"),
+        },
+        key="extra_editor",
     )
 
-    if extra_name and extra_amount > 0:
-        if extra_kind_label.startswith("Додаткові витрати"):
-            kind = "cost"
-        else:
-            kind = "revenue"
-        extra_items.append(
-            ExtraItem(name=extra_name.strip(), kind=kind, amount=extra_amount)
+    for name, kind, basis, category, amount in zip(
+        extra_df["Назва"], extra_df["Тип"], extra_df["База"],
+        extra_df["Категорія"], extra_df["Сума"],
+    ):
+        # у нових рядках редактора порожні клітинки - None або NaN
+        if isinstance(name, str) and name.strip() and kind and basis and amount > 0:
+            extra_items.append(
+                ExtraItem(
+                    name=str(name).strip(),
+                    kind=EXTRA_KIND_LABELS[kind],
+                    amount=float(amount),
+                    basis=EXTRA_BASIS_LABELS[basis],
+                    category=category.strip() if isinstance(category, str) else "",
+                )
+            )
+
+# Власні статті: формули над полями та вбудованими статтями
+formula_set = None
+if st.checkbox("Додати власні статті (формули)"):
+    st.caption(
+        "Вираз над полями моделі (Q, avg_check, p_int, ...), статтями "
+        "logistics, payments, marketing, staff та іншими власними статтями; "
+        "дозволені + - * / ** та min, max, abs. Приклад: payments * p_int * 0.015"
+    )
+    formula_df = st.data_editor(
+        pd.DataFrame(
+            {
+                "Назва": ["packaging"],
+                "Формула": ["Q * 4.5"],
+                "Тип": [next(iter(EXTRA_KIND_LABELS))],
+            }
+        ),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "Тип": st.column_config.SelectboxColumn(
+                options=list(EXTRA_KIND_LABELS), required=True
+            ),
+        },
+        key="formula_editor",
+    )
+    formula_rows = [
+        Formula(name.strip(), expression, EXTRA_KIND_LABELS[kind])
+        for name, expression, kind in zip(
+            formula_df["Назва"], formula_df["Формула"], formula_df["Тип"]
         )
+        if isinstance(name, str) and name.strip()
+        and isinstance(expression, str) and expression.strip() and kind
+    ]
+    try:
+        formula_set = compile_formulas(formula_rows)
+    except FormulaError as e:
+        st.error(f"Помилка у формулах: {e}")
+
+profiling.end(inputs_timer)
 
 if st.button("Розрахувати"):
     params = ModelParams(
@@ -211,58 +926,136 @@ if st.button("Розрахувати"):
         # тільки для цього розрахунку
         extra_items=extra_items,
     )
-    result = calc_total(params)
-
-    # Збереження сценарію
-    st.session_state["scenarios"].append(
-        {
-            "id": len(st.session_state["scenarios"]) + 1,
-            "params": params,
-            "result": result,
-        }
-    )
-    # При новому розрахунку вимикаємо режим порівняння і графік
-    st.session_state["compare_clicked"] = False
-    st.session_state["show_chart"] = False
+    key = params_key(params) + (formula_set.key if formula_set else "")
+    try:
+        result = cached_total(key, params, formula_set)
+    except FormulaError as e:
+        st.error(f"Помилка у формулах: {e}")
+    else:
+        # Збереження сценарію
+        st.session_state["scenarios"].append(params, result, formula_set)
+        # При новому розрахунку вимикаємо режим порівняння і графік
+        st.session_state["compare_clicked"] = False
+        st.session_state["show_chart"] = False
 
-    st.success(
-        f"Сценарій №{len(st.session_state['scenarios'])} успішно розраховано."
-    )
+        st.success(
+            f"Сценарій №{len(st.session_state['scenarios'])} успішно розраховано."
+        )
+
+with st.expander("Бібліотека сценаріїв"):
+    # як і прогноз: вміст розгорнутого блоку виконується при кожному перезапуску
+    if st.checkbox("Відкрити бібліотеку"):
+        library_section()
 
 # Останній сценарій
 if st.session_state["scenarios"]:
     last = st.session_state["scenarios"][-1]
     st.subheader(
-        f"Результати останнього розрахунку (сценарій №{last['id']})"
+        f"Результати останнього розрахунку (сценарій №{last.id})"
     )
-    res = last["result"]
+    res = last.result
 
-    table = [
-        {"№": 1, "Стаття": "Логістика", "Сума, грн": f"{res['logistics']:.2f}"},
-        {"№": 2, "Стаття": "Платіжні сервіси", "Сума, грн": f"{res['payments']:.2f}"},
-        {"№": 3, "Стаття": "Маркетинг", "Сума, грн": f"{res['marketing']:.2f}"},
-        {"№": 4, "Стаття": "Персонал", "Сума, грн": f"{res['staff']:.2f}"},
-    ]
+    with profiling.section("app.results_table"):
+        df = result_table(f"{last.id}:{params_key(last.params)}", res)
+        st.table(df)
 
-    # Додаткові
-    if res["extra_net"] != 0:
-        sign = "+" if res["extra_net"] > 0 else "-"
-        table.append(
-            {
-                "№": 5,
-                "Стаття": "Додаткові показники",
-                "Сума, грн": f"{res['extra_net']:.2f} ({sign})",
-            }
+    # --- ОЦІНКА НЕВИЗНАЧЕНОСТІ (МОНТЕ-КАРЛО) ---
+    with st.expander("Оцінка невизначеності (Монте-Карло)"):
+        st.write(
+            "Частка локальних доставок, рівень повернень, частка онлайн-оплат, "
+            "CAC та середній чек розглядаються як невизначені величини "
+            "(трикутний розподіл навколо введених значень)."
         )
-        row_total = 6
-    else:
-        row_total = 5
+        spread_percent = st.slider(
+            "Відхилення невизначених параметрів, ±%",
+            min_value=1,
+            max_value=50,
+            value=10,
+        )
+        n_samples = st.selectbox(
+            "Кількість вибірок",
+            options=[10000, 100000, 1000000],
+            index=1,
+        )
+        if st.button("Запустити симуляцію"):
+            # симуляція йде у фоні; хід і результат - у блоці «Фонові завдання»
+            job_runner().submit(
+                job_owner(),
+                f"Монте-Карло: сценарій №{last.id}, {n_samples} вибірок, ±{spread_percent}%",
+                monte_carlo_job,
+                last.params,
+                spread_percent / 100.0,
+                n_samples,
+            )
+            st.info("Симуляцію запущено у фоні; хід виконання - нижче.")
 
-    table.append(
-        {"№": row_total, "Стаття": "Разом", "Сума, грн": f"{res['total']:.2f}"}
-    )
-    df = pd.DataFrame(table).set_index("№")
-    st.table(df)
+    # --- ОПТИМІЗАЦІЯ ---
+    with st.expander("Оптимальний сценарій"):
+        st.write(
+            "Оптимізатор шукає значення обраних параметрів, за яких загальні "
+            "трансакційні витрати мінімальні. Інші параметри беруться з "
+            "останнього сценарію."
+        )
+        opt_free = st.multiselect(
+            "Параметри, які можна змінювати",
+            options=list(OPTIMIZE_FIELDS),
+            default=["p_loc", "online_share"],
+            format_func=lambda name: OPTIMIZE_FIELDS[name],
+        )
+        opt_q_min = st.number_input(
+            "Мінімальна кількість замовлень",
+            min_value=0,
+            max_value=int(bounds["Q"][1]),
+            value=0,
+            step=100,
+        )
+        opt_budget = st.number_input(
+            "Бюджет маркетингу, грн (0 – без обмеження)",
+            min_value=0.0,
+            value=0.0,
+            step=10000.0,
+        )
+        opt_constraints = []
+        if opt_q_min > 0:
+            opt_constraints.append(min_orders(opt_q_min))
+        if opt_budget > 0:
+            try:
+                opt_constraints.append(
+                    marketing_budget(last.params, opt_budget, opt_free)
+                )
+            except ValueError as e:
+                st.warning(str(e))
+
+        if st.button("Знайти оптимум"):
+            try:
+                opt = optimize(
+                    last.params, opt_free, bounds=bounds, constraints=opt_constraints
+                )
+            except ValueError as e:
+                st.error(f"Оптимізація неможлива: {e}")
+            else:
+                st.session_state["scenarios"].append(opt.params, opt.result)
+                st.session_state["compare_clicked"] = False
+                st.session_state["show_chart"] = False
+                st.success(
+                    f"Оптимальний сценарій збережено як сценарій "
+                    f"№{len(st.session_state['scenarios'])}: "
+                    f"{opt.result['total']:.2f} грн."
+                )
+
+        if "Q" in opt_free and st.checkbox("Показати фронт Парето (витрати – обсяг)"):
+            q_lo = max(float(opt_q_min), bounds["Q"][0])
+            front = pareto_front(
+                last.params,
+                opt_free,
+                q_values=[q_lo + (bounds["Q"][1] - q_lo) * i / 20 for i in range(21)],
+                bounds=bounds,
+                constraints=opt_constraints,
+            )
+            if not front.empty:
+                st.line_chart(front.set_index("Q")[["total"]])
+
+    projection_section()
 
     count = len(st.session_state["scenarios"])
 
@@ -286,204 +1079,59 @@ if st.session_state["scenarios"]:
                 st.session_state["show_chart"] = False  # графік окремо вмикається кнопкою
 
         # --- БЛОК ПОРІВНЯННЯ СЦЕНАРІЇВ ---
+        # Кожна секція - окремий фрагмент: взаємодія з віджетами всередині
+        # (наприклад, вибір осі X) перезапускає лише цю секцію.
         if st.session_state["compare_clicked"]:
-            st.subheader("Порівняння сценаріїв")
-
-            comp_rows = []
-            for s in st.session_state["scenarios"]:
-                pr = s["params"]
-                rr = s["result"]
-
-                # опис додаткових показників
-                if pr.extra_items:
-                    extras = "; ".join(
-                        f"{item.name} ({'+' if item.kind=='cost' else '-'}{item.amount:.2f})"
-                        for item in pr.extra_items
-                    )
-                else:
-                    extras = "-"
-
-                comp_rows.append(
-                    {
-                        "Сценарій": s["id"],
-                        "Q (замовлення)": pr.Q,
-                        "Середній чек, грн": f"{pr.avg_check:.2f}",
-                        "Частка локальних доставок": f"{pr.p_loc:.3f}",
-                        "Частка міжобласних": f"{pr.p_int:.3f}",
-                        "Рівень повернень": f"{pr.return_rate:.4f}",
-                        "Вартість локальної доставк., грн": f"{pr.c_loc:.2f}",
-                        "Вартість міжобласної доставк., грн": f"{pr.c_int:.2f}",
-                        "Повернення локал., грн": f"{pr.c_ret_loc:.2f}",
-                        "Повернення міжобл., грн": f"{pr.c_ret_int:.2f}",
-                        "Частка онлайн оплат": f"{pr.online_share:.3f}",
-                        "Комісія платіжного сервісу, %": f"{pr.pay_commission*100:.2f}",
-                        "Залучені клієнти": pr.n_new_customers,
-                        "CAC, грн": f"{pr.cac:.2f}",
-                        "Фіксовані витрати персонал, грн": f"{pr.staff_fixed:.2f}",
-                        "Змінні витрати на замовлення, грн": f"{pr.staff_per_order:.2f}",
-                        "Додаткові показники": extras,
-                        "Логістика, грн": f"{rr['logistics']:.2f}",
-                        "Платіжні сервіси, грн": f"{rr['payments']:.2f}",
-                        "Маркетинг, грн": f"{rr['marketing']:.2f}",
-                        "Персонал, грн": f"{rr['staff']:.2f}",
-                        "Додаткові, грн": f"{rr['extra_net']:.2f}",
-                        "Разом, грн": f"{rr['total']:.2f}",
-                    }
-                )
-
-            comp_df = pd.DataFrame(comp_rows).set_index("Сценарій")
-            st.dataframe(comp_df, use_container_width=True)
-
-            # --- ГРАФІК ЗАЛЕЖНОСТЕЙ (X – обирається, Y – фіксоване «Разом, грн») ---
-            st.subheader("Графік залежності загальних трансакційних витрат")
-
-            # Формуємо окремий DataFrame з числовими значеннями
-            plot_rows = []
-            for s in st.session_state["scenarios"]:
-                pr = s["params"]
-                rr = s["result"]
-                plot_rows.append(
-                    {
-                        "Сценарій": s["id"],
-                        "Q (замовлення)": pr.Q,
-                        "Середній чек, грн": pr.avg_check,
-                        "Частка локальних доставок": pr.p_loc,
-                        "Частка міжобласних": pr.p_int,
-                        "Рівень повернень, %": pr.return_rate * 100,
-                        "Частка онлайн оплат, %": pr.online_share * 100,
-                        "Комісія платіжного сервісу, %": pr.pay_commission * 100,
-                        "Залучені клієнти": pr.n_new_customers,
-                        "CAC, грн": pr.cac,
-                        "Фіксовані витрати персонал, грн": pr.staff_fixed,
-                        "Змінні витрати на замовлення, грн": pr.staff_per_order,
-                        "Логістика, грн": rr["logistics"],
-                        "Платіжні сервіси, грн": rr["payments"],
-                        "Маркетинг, грн": rr["marketing"],
-                        "Персонал, грн": rr["staff"],
-                        "Додаткові, грн": rr["extra_net"],
-                        "Разом, грн": rr["total"],
-                    }
-                )
-
-            plot_df = pd.DataFrame(plot_rows).set_index("Сценарій")
-            metric_options = list(plot_df.columns)
-
-            # кнопка показу графіка
-            if st.button("Створити графік"):
-                st.session_state["show_chart"] = True
-
-            if st.session_state["show_chart"]:
-                # користувач обирає X
-                x_metric = st.selectbox(
-                    "Показник по осі X",
-                    options=metric_options,
-                    index=metric_options.index("Частка онлайн оплат, %")
-                    if "Частка онлайн оплат, %" in metric_options
-                    else 0,
-                )
-
-                # Y фіксовано – «Разом, грн»
-                y_metric = "Разом, грн" if "Разом, грн" in metric_options else metric_options[-1]
-
-                chart_df = (
-                    plot_df[[x_metric, y_metric]]
-                    .sort_values(x_metric)
-                    .set_index(x_metric)
-                )
-                st.line_chart(chart_df)
-
-                st.caption(
-                    f"На графіку показано, як змінюється загальна сума трансакційних витрат "
-                    f"(«{y_metric}») залежно від вибраного показника «{x_metric}» "
-                    "для всіх розрахованих сценаріїв."
-                )
-
-            # --- Далі твій оригінальний детальний висновок ---
-
-            # Пошук найкращого
-            best = min(
-                st.session_state["scenarios"],
-                key=lambda x: x["result"]["total"],
-            )
-            best_total = best["result"]["total"]
-            # Базовим є №1
-            base = st.session_state["scenarios"][0]
-            base_total = base["result"]["total"]
-            diff = base_total - best_total
-            st.subheader("Висновок")
-
-            text = []
-            text.append(
-                f"Найменші трансакційні витрати отримано у **сценарії №{best['id']}** "
-                f"із загальною сумою **{best_total:.2f} грн**."
-            )
-
-            if diff > 0:
-                text.append(
-                    f"Порівняно з базовим сценарієм №1, економія становить "
-                    f"**{diff:.2f} грн**, що свідчить про доцільність впровадження "
-                    f"відповідних змін у параметрах моделі."
-                )
-            elif diff < 0:
-                text.append(
-                    f"Порівняно з базовим сценарієм №1, витрати зросли на "
-                    f"**{-diff:.2f} грн**, тобто запропоновані зміни є економічно "
-                    f"недоцільними."
-                )
-            else:
-                text.append(
-                    "Загальні витрати збігаються з базовим сценарієм, тобто суттєвий "
-                    "економічний ефект від змін параметрів відсутній."
-                )
-
-            p = best["params"]
-            text.append(
-                "Найкращий сценарій характеризується такими ключовими параметрами: "
-                f"кількість замовлень – {p.Q}, середній чек – {p.avg_check:.2f} грн, "
-                f"частка локальних доставок – {p.p_loc:.2f}, рівень повернень – "
-                f"{p.return_rate:.3f}, частка онлайн-оплат – {p.online_share:.2f}, "
-                f"ставка комісії платіжного сервісу – {p.pay_commission * 100:.2f} %, "
-                f"кількість нових клієнтів – {p.n_new_customers}, CAC – {p.cac:.2f} грн, "
-                f"фіксовані витрати на персонал – {p.staff_fixed:.2f} грн, "
-                f"змінні витрати на обробку одного замовлення – "
-                f"{p.staff_per_order:.2f} грн."
-            )
-            # Додатковий показник
-            if p.extra_items:
-                extra_parts = []
-                for item in p.extra_items:
-                    mark = "+" if item.kind == "cost" else "-"
-                    extra_parts.append(
-                        f"{item.name} ({mark}{item.amount:.2f} грн)"
-                    )
-                text.append(
-                    "У найкращому сценарії додатково враховано такі показники: "
-                    + "; ".join(extra_parts)
-                    + "."
-                )
-
-            text.append(
-                "Таким чином, обраний сценарій забезпечує більш вигідне поєднання "
-                "обсягу замовлень, структури доставки, рівня повернень, вартості "
-                "залучення клієнтів та витрат на персонал, що в результаті знижує "
-                "загальну суму трансакційних витрат інтернет-магазину BagShop."
-            )
-
-            st.write("\n\n".join(text))
-
-            # Кнопка скидання
-            if st.button("Почати спочатку"):
-                st.session_state["scenarios"] = []
-                st.session_state["compare_clicked"] = False
-                st.session_state["show_chart"] = False
-                st.experimental_rerun()
+            comparison_section()
+            chart_section()
+            sensitivity_section()
+            conclusion_section()
 
 else:
     st.info(
         "Заповніть параметри вище і натисніть кнопку **«Розрахувати»**."
     )
 
+# --- ФОНОВІ ЗАВДАННЯ СЕСІЇ ---
+# Показуються й після перезавантаження сторінки, навіть якщо сценаріїв
+# у новій сесії ще немає
+session_jobs = job_runner().jobs(job_owner())
+if any(job.active for job in session_jobs):
+    active_jobs_section()
+elif session_jobs:
+    jobs_section()
 
-
-
-
+# --- ПРОДУКТИВНІСТЬ ---
+# Метрики збираються лише при BAGSHOP_PROFILE=1 (або "alloc"); шлях
+# BAGSHOP_PROFILE_FILE - файл для textfile collector Prometheus.
+if profiling.enabled():
+    with st.expander("Продуктивність"):
+        metrics = profiling.snapshot()
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Ділянка": metrics["name"],
+                    "Викликів": metrics["calls"],
+                    "Всього, мс": metrics["seconds"] * 1000,
+                    "Середнє, мс": metrics["mean_seconds"] * 1000,
+                    "Макс., мс": metrics["max_seconds"] * 1000,
+                    "Пам'ять (макс.), КБ": metrics["max_alloc_bytes"] / 1024,
+                }
+            ),
+            hide_index=True,
+            column_config={
+                label: st.column_config.NumberColumn(format="%.3f")
+                for label in ("Всього, мс", "Середнє, мс", "Макс., мс")
+            },
+        )
+        col1, col2 = st.columns(2)
+        col1.download_button(
+            "Завантажити (Prometheus)",
+            profiling.prometheus_text(),
+            file_name="bagshop_metrics.prom",
+            mime="text/plain",
+        )
+        if col2.button("Скинути метрики"):
+            profiling.reset()
+    if os.environ.get("BAGSHOP_PROFILE_FILE"):
+        profiling.write_prometheus(os.environ["BAGSHOP_PROFILE_FILE"])
@@ -0,0 +1,344 @@
+# Пакетний розрахунок сценаріїв з файлу (без браузера).
+#
+# Вхід - CSV (колонки полів ModelParams, необов'язкова колонка
+# extra_items з JSON-списком статей) або JSONL (по словнику
+# params_to_dict у рядку). Файл читається блоками по --chunk-size рядків;
+# блоки розбираються й рахуються в пулі процесів, а результати пишуться
+# у порядку вхідних рядків у CSV або Parquet (каталог part-*.parquet).
+#
+# Після кожного записаного блоку оновлюється контрольна точка (зміщення у
+# вхідному й вихідному файлах), тож перерваний запуск продовжується з
+# місця зупинки:
+#
+#   python batch_runner.py scenarios.csv results.csv --workers 8
+#   python batch_runner.py scenarios.jsonl results.parquet
+#
+# --zones zones.json замінює двозонну логістику (p_loc / c_loc / ...)
+# зонною моделлю logistics.py з багатьма зонами й перевізниками для всіх
+# рядків файлу.
+#
+# Рядки CSV не повинні містити переносів усередині значень.
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logistics import ZoneLogistics, load_zone_logistics
+from model_transaction_costs import (
+    EXTRA_BASES,
+    EXTRA_KINDS,
+    KIND_CODES,
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ExtraItem,
+    ModelParamsBatch,
+    calc_total_batch,
+    extra_coefficients,
+    extra_drivers,
+)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Як часто друкувати прогрес, с
+_PROGRESS_INTERVAL = 2.0
+
+
+@dataclass
+class Checkpoint:
+    input: str
+    output: str
+    chunk_size: int
+    chunks_done: int = 0
+    rows_done: int = 0
+    input_offset: int = 0     # байт вхідного файлу після останнього блоку
+    output_offset: int = 0    # байт вихідного CSV після останнього блоку
+
+    def save(self, path: str) -> None:
+        # Атомарний запис: спершу тимчасовий файл, потім заміна
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(asdict(self), fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as fh:
+            return cls(**json.load(fh))
+
+
+def input_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    raise ValueError(f"Непідтримуваний формат вхідного файлу: {path}")
+
+
+def read_raw_chunks(
+    path: str,
+    chunk_size: int,
+    offset: int = 0,
+) -> Iterator[Tuple[bytes, bytes, int, int]]:
+    # Блоки сирих рядків: (заголовок CSV або b"", рядки, кількість
+    # сценаріїв, зміщення після блоку). Розбір виконується в процесах пулу.
+    with open(path, "rb") as fh:
+        header = fh.readline() if input_format(path) == "csv" else b""
+        if offset:
+            fh.seek(offset)
+        while True:
+            lines = []
+            for line in fh:
+                if line.strip():
+                    lines.append(line)
+                    if len(lines) >= chunk_size:
+                        break
+            if not lines:
+                return
+            yield header, b"".join(lines), len(lines), fh.tell()
+
+
+def _items_table(items) -> np.ndarray:
+    # Матриця (бази × kind) для статей рядка: JSON-рядок, список або порожньо
+    if isinstance(items, str):
+        items = json.loads(items) if items.strip() else []
+    if not isinstance(items, list):
+        return np.zeros((len(EXTRA_BASES), len(EXTRA_KINDS)))
+    return extra_coefficients([ExtraItem(**item) for item in items])
+
+
+def parse_chunk(header: bytes, data: bytes) -> Tuple[ModelParamsBatch, pd.DataFrame]:
+    if header:
+        frame = pd.read_csv(io.BytesIO(header + data))
+    else:
+        frame = pd.DataFrame.from_records(
+            [json.loads(line) for line in data.splitlines() if line.strip()]
+        )
+    batch = ModelParamsBatch.from_columns(frame, size=len(frame))
+    if "extra_items" in frame:
+        # статті кожного рядка -> (рядки × бази × kind), далі один einsum;
+        # однакові набори статей (той самий JSON) розбираються один раз
+        items = frame["extra_items"].to_numpy()
+        tables = np.zeros((len(frame), len(EXTRA_BASES), len(EXTRA_KINDS)))
+        parsed = {}
+        for i in np.flatnonzero(pd.notna(items)):
+            value = items[i]
+            if isinstance(value, str):
+                if value not in parsed:
+                    parsed[value] = _items_table(value)
+                tables[i] = parsed[value]
+            else:
+                tables[i] = _items_table(value)
+        extra = np.einsum("nb,nbk->nk", extra_drivers(batch), tables)
+        batch.extra_cost = np.ascontiguousarray(extra[:, KIND_CODES["cost"]])
+        batch.extra_revenue = np.ascontiguousarray(extra[:, KIND_CODES["revenue"]])
+    return batch, frame
+
+
+def evaluate_chunk(args):
+    # Для CSV результат одразу кодується в байти (без заголовка), щоб
+    # форматування теж виконувалось у пулі, а не в процесі запису
+    header, data, first_row, with_params, encode, logistics = args
+    batch, frame = parse_chunk(header, data)
+    if logistics is None:
+        result = calc_total_batch(batch)
+    else:
+        result = logistics.calc_total_batch(batch)
+    columns = {"row": np.arange(first_row, first_row + len(batch))}
+    if with_params:
+        columns.update({name: getattr(batch, name) for name in PARAM_FIELDS})
+    columns.update({name: result[name] for name in RESULT_FIELDS})
+    out = pd.DataFrame(columns)
+    if encode:
+        return out.to_csv(header=False, index=False).encode()
+    return out
+
+
+def _columns(with_params: bool) -> List[str]:
+    return ["row"] + (list(PARAM_FIELDS) if with_params else []) + list(RESULT_FIELDS)
+
+
+class CsvSink:
+    encode = True
+
+    def __init__(self, path: str, offset: int, columns: List[str]):
+        self._fh = open(path, "r+b" if offset else "wb")
+        self._fh.truncate(offset)   # відкидаємо недописаний блок
+        self._fh.seek(offset)
+        if offset == 0:
+            self._fh.write((",".join(columns) + "\n").encode())
+
+    def write(self, data: bytes, chunk: int) -> int:
+        self._fh.write(data)
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        return self._fh.tell()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class ParquetSink:
+    # Кожен блок - окремий файл part-NNNNNN.parquet у каталозі output;
+    # pandas / pyarrow читають каталог як одну таблицю в порядку частин
+    encode = False
+
+    def __init__(self, path: str, chunks_done: int):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("Для запису Parquet потрібен пакет pyarrow") from e
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:11]) >= chunks_done:
+                os.remove(os.path.join(path, name))
+
+    def write(self, frame: pd.DataFrame, chunk: int) -> int:
+        target = os.path.join(self._path, f"part-{chunk:06d}.parquet")
+        frame.to_parquet(target + ".tmp", index=False, engine="pyarrow")
+        os.replace(target + ".tmp", target)
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+def _progress(rows: int, started: float, offset: int, start_offset: int, size: int) -> str:
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    done = offset / size if size else 1.0
+    read = offset - start_offset
+    remaining = (size - offset) * elapsed / read if read > 0 else float("nan")
+    eta = time.strftime("%H:%M:%S", time.gmtime(remaining)) if np.isfinite(remaining) else "-"
+    return f"{rows} рядків, {rate:,.0f} рядк./с, {done:.1%}, залишилось {eta}"
+
+
+def run(
+    input_path: str,
+    output_path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    checkpoint_path: Optional[str] = None,
+    restart: bool = False,
+    with_params: bool = False,
+    logistics: Optional[ZoneLogistics] = None,
+    log=sys.stderr,
+) -> int:
+    # Повертає кількість розрахованих рядків (разом із попередніми запусками).
+    # logistics - зонна модель замість двозонної логістики ModelParams
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint.json"
+    state = None if restart else Checkpoint.load(checkpoint_path)
+    if state is not None and (state.input, state.output, state.chunk_size) != (
+        os.path.abspath(input_path), os.path.abspath(output_path), chunk_size
+    ):
+        raise ValueError(
+            f"Контрольна точка {checkpoint_path} належить іншому запуску; "
+            "використайте --restart"
+        )
+    if state is None:
+        state = Checkpoint(os.path.abspath(input_path), os.path.abspath(output_path), chunk_size)
+    elif state.rows_done:
+        print(f"Продовження з рядка {state.rows_done}", file=log)
+
+    parquet = os.path.splitext(output_path)[1].lower() in (".parquet", ".pq")
+    sink = (ParquetSink(output_path, state.chunks_done) if parquet
+            else CsvSink(output_path, state.output_offset, _columns(with_params)))
+    size = os.path.getsize(input_path)
+    start_offset = state.input_offset
+    started = last_report = time.perf_counter()
+    rows_this_run = 0
+
+    def commit(data, rows: int, offset: int) -> None:
+        nonlocal rows_this_run, last_report
+        state.output_offset = sink.write(data, state.chunks_done)
+        state.chunks_done += 1
+        state.rows_done += rows
+        state.input_offset = offset
+        state.save(checkpoint_path)
+        rows_this_run += rows
+        now = time.perf_counter()
+        if now - last_report >= _PROGRESS_INTERVAL:
+            last_report = now
+            print(_progress(rows_this_run, started, offset, start_offset, size), file=log)
+
+    chunks = read_raw_chunks(input_path, chunk_size, state.input_offset)
+    first_row = state.rows_done
+    try:
+        if workers <= 1:
+            for header, data, rows, offset in chunks:
+                commit(
+                    evaluate_chunk(
+                        (header, data, first_row, with_params, sink.encode, logistics)
+                    ),
+                    rows,
+                    offset,
+                )
+                first_row += rows
+        else:
+            # Блоки рахуються паралельно, а записуються в порядку читання;
+            # у польоті не більше 2 * workers блоків
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = []
+                for header, data, rows, offset in chunks:
+                    args = (header, data, first_row, with_params, sink.encode, logistics)
+                    pending.append((pool.submit(evaluate_chunk, args), rows, offset))
+                    first_row += rows
+                    if len(pending) >= 2 * workers:
+                        future, rows, offset = pending.pop(0)
+                        commit(future.result(), rows, offset)
+                for future, rows, offset in pending:
+                    commit(future.result(), rows, offset)
+    finally:
+        sink.close()
+
+    # вхідний файл прочитано до кінця (разом із порожніми рядками в кінці);
+    # контрольної точки немає, якщо не було жодного блоку
+    print(_progress(rows_this_run, started, size, start_offset, size), file=log)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return state.rows_done
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пакетний розрахунок сценаріїв")
+    parser.add_argument("input", help="CSV або JSONL зі сценаріями")
+    parser.add_argument("output", help="CSV або .parquet (каталог частин)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--checkpoint", help="файл контрольної точки "
+                        "(за замовчуванням <output>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true",
+                        help="почати спочатку, ігноруючи контрольну точку")
+    parser.add_argument("--with-params", action="store_true",
+                        help="додати вхідні параметри до результатів")
+    parser.add_argument("--zones", help="JSON зонної моделі логістики "
+                        "(зони, перевізники, тарифна сітка; див. logistics.py)")
+    args = parser.parse_args()
+    rows = run(
+        args.input,
+        args.output,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+        with_params=args.with_params,
+        logistics=load_zone_logistics(args.zones) if args.zones else None,
+    )
+    print(f"Готово: {rows} рядків -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# Вимірювання часу перезапуску app.py при зміні осі X графіка.
+#
+# Сесія заповнюється N сценаріями, після чого кілька разів змінюється
+# «Показник по осі X». Час рахується від SCRIPT_STARTED до завершення
+# скрипту (або фрагмента) у потоці скрипту, тобто без очікування
+# тестового середовища Streamlit (AppTest).
+#
+#   python bench_app_rerun.py                      # поточний app.py
+#   git show <commit>:app.py > /tmp/app_before.py
+#   python bench_app_rerun.py --app /tmp/app_before.py --legacy
+import argparse
+import functools
+import os
+import random
+import statistics
+import sys
+import time
+
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner
+
+from model_transaction_costs import ModelParams, calc_total
+
+X_METRICS = ["Q (замовлення)", "Логістика, грн", "CAC, грн", "Частка онлайн оплат, %"]
+
+_STOP_EVENTS = (
+    ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS,
+    ScriptRunnerEvent.SCRIPT_STOPPED_FOR_RERUN,
+    ScriptRunnerEvent.FRAGMENT_STOPPED_WITH_SUCCESS,
+)
+
+
+def random_params(i: int) -> ModelParams:
+    r = random.Random(i)
+    p_loc = round(r.random(), 2)
+    return ModelParams(
+        Q=r.randint(0, 100000),
+        avg_check=r.uniform(0, 5000),
+        p_loc=p_loc,
+        p_int=1 - p_loc,
+        return_rate=r.random(),
+        c_loc=r.uniform(0, 100),
+        c_int=r.uniform(0, 100),
+        c_ret_loc=r.uniform(0, 50),
+        c_ret_int=r.uniform(0, 50),
+        online_share=r.random(),
+        pay_commission=r.uniform(0, 0.1),
+        n_new_customers=r.randint(0, 50000),
+        cac=r.uniform(0, 200),
+        staff_fixed=r.uniform(0, 1e6),
+        staff_per_order=r.uniform(0, 50),
+        extra_items=[],
+    )
+
+
+def _install_timer(stamps: dict) -> None:
+    original_init = local_script_runner.LocalScriptRunner.__init__
+
+    def init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+
+        def record(sender, event, **data):
+            if event == ScriptRunnerEvent.SCRIPT_STARTED:
+                stamps["start"] = time.perf_counter()
+            elif event in _STOP_EVENTS:
+                stamps["stop"] = time.perf_counter()
+
+        self.on_event.connect(record, weak=False)
+
+    local_script_runner.LocalScriptRunner.__init__ = init
+
+
+def _fragment_id(at: AppTest, name: str):
+    # Ідентифікатор фрагмента за ім'ям функції, обгорнутої st.fragment
+    for fragment_id, wrapped in at._fragment_storage._fragments.items():
+        for cell in wrapped.__closure__ or ():
+            if getattr(cell.cell_contents, "__name__", None) == name:
+                return fragment_id
+    return None
+
+
+def measure(at: AppTest, stamps: dict, repeats: int, fragment_id=None) -> float:
+    original = local_script_runner.RerunData
+    if fragment_id is not None:
+        # так само, як браузер просить перезапустити лише фрагмент
+        local_script_runner.RerunData = functools.partial(
+            RerunData, fragment_id_queue=[fragment_id]
+        )
+    try:
+        times = []
+        for i in range(repeats):
+            box = [b for b in at.selectbox if b.label == "Показник по осі X"][0]
+            box.set_value(X_METRICS[i % len(X_METRICS)]).run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+            times.append(stamps["stop"] - stamps["start"])
+    finally:
+        local_script_runner.RerunData = original
+    return statistics.median(times) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Час перезапуску app.py")
+    parser.add_argument("--app", default=os.path.join(os.path.dirname(__file__), "app.py"))
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=12)
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="сценарії як список словників (app.py до ScenarioStore)",
+    )
+    args = parser.parse_args()
+
+    params = [random_params(i) for i in range(args.scenarios)]
+    at = AppTest.from_file(os.path.abspath(args.app), default_timeout=600)
+    if args.legacy:
+        at.session_state["scenarios"] = [
+            {"id": i + 1, "params": p, "result": calc_total(p)}
+            for i, p in enumerate(params)
+        ]
+    else:
+        from scenario_store import ScenarioStore
+
+        store = ScenarioStore()
+        for p in params:
+            store.append(p, calc_total(p))
+        at.session_state["scenarios"] = store
+    at.session_state["compare_clicked"] = True
+    at.session_state["show_chart"] = True
+
+    stamps: dict = {}
+    _install_timer(stamps)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    full = measure(at, stamps, args.repeats)
+    print(f"{args.scenarios} сценаріїв, повний перезапуск: {full:.1f} мс")
+    chart = _fragment_id(at, "chart_section")
+    if chart is not None:
+        partial = measure(at, stamps, args.repeats, chart)
+        print(f"{args.scenarios} сценаріїв, перезапуск фрагмента графіка: {partial:.1f} мс")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
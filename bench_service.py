@@ -0,0 +1,178 @@
+# Навантажувальний тест service.py: затримка і пропускна здатність.
+#
+# Сервіс запускається в окремому процесі, генератор навантаження
+# відкриває --clients постійних з'єднань (за потреби в кількох процесах)
+# і протягом --duration секунд надсилає запити без пауз.
+#
+#   python bench_service.py                         # мікропакети
+#   python bench_service.py --max-batch 1           # без об'єднання запитів
+#   python bench_service.py --batch-size 100        # маршрут /calc/batch
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import statistics
+import sys
+import time
+
+from model_transaction_costs import PARAM_FIELDS
+
+# Поля, що є частками (p_int доповнює p_loc)
+_SHARES = ("p_loc", "return_rate", "online_share")
+
+
+def random_scenario(i: int) -> dict:
+    # Тіло запиту /calc з випадковими (відтворюваними за i) значеннями
+    r = random.Random(i)
+    data = {name: r.uniform(0, 100) for name in PARAM_FIELDS}
+    data.update({name: r.random() for name in _SHARES})
+    data.update(
+        Q=r.randint(0, 100000),
+        avg_check=r.uniform(0, 5000),
+        p_int=1 - data["p_loc"],
+        pay_commission=r.uniform(0, 0.1),
+        n_new_customers=r.randint(0, 50000),
+        staff_fixed=r.uniform(0, 1e6),
+        extra_items=[],
+    )
+    return data
+
+
+def _run_server(host: str, port: int, max_batch: int, max_delay: float) -> None:
+    from service import serve
+
+    asyncio.run(serve(host, port, max_batch, max_delay))
+
+
+def _wait_for_port(host: str, port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Сервіс не запустився")
+
+
+def _request(host: str, path: str, payload) -> bytes:
+    body = json.dumps(payload).encode() if payload is not None else b""
+    method = "POST" if payload is not None else "GET"
+    return (
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+
+async def _read_response(reader: asyncio.StreamReader) -> bytes:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = head.split(b" ", 2)[1]
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    body = await reader.readexactly(length)
+    if status != b"200":
+        raise RuntimeError(body.decode())
+    return body
+
+
+async def _client(host, port, requests, deadline, latencies) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        writer.write(requests[i % len(requests)])
+        await _read_response(reader)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    writer.close()
+
+
+def _load(args) -> list:
+    host, port, clients, duration, path, batch_size = args
+    scenarios = [random_scenario(i) for i in range(256)]
+    if batch_size:
+        requests = [
+            _request(host, path, {"scenarios": scenarios[i:i + batch_size]})
+            for i in range(0, len(scenarios), batch_size)
+        ]
+    else:
+        requests = [_request(host, path, s) for s in scenarios]
+
+    async def run():
+        latencies = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(_client(host, port, requests, deadline, latencies) for _ in range(clients))
+        )
+        return latencies
+
+    return asyncio.run(run())
+
+
+async def _fetch(host: str, port: int, path: str) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(_request(host, path, None))
+    body = await _read_response(reader)
+    writer.close()
+    return json.loads(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Навантажувальний тест service.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=64, help="з'єднань на процес")
+    parser.add_argument("--processes", type=int, default=1, help="процесів генератора")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=1024)
+    parser.add_argument("--max-delay-ms", type=float, default=1.0)
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="сценаріїв у запиті до /calc/batch (0 - /calc)")
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(
+        target=_run_server,
+        args=(args.host, args.port, args.max_batch, args.max_delay_ms / 1000),
+        daemon=True,
+    )
+    server.start()
+    try:
+        _wait_for_port(args.host, args.port)
+        path = "/calc/batch" if args.batch_size else "/calc"
+        job = (args.host, args.port, args.clients, args.duration, path, args.batch_size)
+        if args.processes > 1:
+            with multiprocessing.Pool(args.processes) as pool:
+                parts = pool.map(_load, [job] * args.processes)
+        else:
+            parts = [_load(job)]
+        latencies = sorted(t for part in parts for t in part)
+        stats = asyncio.run(_fetch(args.host, args.port, "/stats"))
+    finally:
+        server.terminate()
+        server.join()
+
+    if not latencies:
+        print("Жодного запиту не виконано")
+        return
+    n = len(latencies)
+    scenarios = n * (args.batch_size or 1)
+
+    def pct(q: float) -> float:
+        return latencies[min(int(q * n), n - 1)] * 1000
+
+    print(f"Маршрут {path}, з'єднань: {args.clients * args.processes}")
+    print(f"Запитів: {n}, {n / args.duration:.0f} запит/с, "
+          f"{scenarios / args.duration:.0f} сценаріїв/с")
+    print(f"Затримка, мс: P50 {pct(0.5):.2f}, P95 {pct(0.95):.2f}, "
+          f"P99 {pct(0.99):.2f}, середня {statistics.fmean(latencies) * 1000:.2f}")
+    if stats["batches"]:
+        print(f"Мікропакетів: {stats['batches']}, середній розмір "
+              f"{stats['mean_batch']:.1f}, найбільший {stats['largest_batch']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
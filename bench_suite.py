@@ -0,0 +1,415 @@
+# Набір бенчмарків моделі та шляху рендерингу app.py.
+#
+#   python bench_suite.py run --output baseline.json        # зберегти базу
+#   python bench_suite.py run --output current.json -k store
+#   python bench_suite.py compare baseline.json current.json --threshold 0.1
+#   python bench_suite.py run --baseline baseline.json       # запуск + порівняння
+#
+# Для кожного випадку береться медіана кількох повторів (кожен повтор -
+# стільки викликів, щоб тривати >= 0.2 с). compare позначає випадки, де
+# медіана зросла більше ніж на threshold, і завершується з кодом 1.
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import exact
+from extra_items import ExtraItemLedger
+from formulas import Formula, compile_formulas
+from jobs import JobRunner
+from logistics import Tariff, TariffTable
+from model_transaction_costs import (
+    EXTRA_BASES,
+    PARAM_FIELDS,
+    ExtraItem,
+    ModelParams,
+    ModelParamsBatch,
+    calc_extra,
+    calc_total,
+    calc_total_batch,
+)
+from scenario_store import ScenarioStore
+from sweep import Aggregate, run_sweep
+
+DEFAULT_THRESHOLD = 0.10
+
+
+@dataclass
+class Case:
+    name: str
+    # setup() повертає функцію без аргументів, яку треба виміряти; або,
+    # для випадків із власним вимірюванням (measured=True), - функцію,
+    # що повертає список тривалостей у секундах
+    setup: Callable[[], Callable]
+    measured: bool = False
+
+
+def _base_params(extra_items=()) -> ModelParams:
+    return ModelParams(
+        Q=10900,
+        avg_check=870,
+        p_loc=0.30,
+        p_int=0.70,
+        return_rate=0.061,
+        c_loc=45,
+        c_int=50,
+        c_ret_loc=15,
+        c_ret_int=20,
+        online_share=0.50,
+        pay_commission=0.0275,
+        n_new_customers=12308,
+        cac=52,
+        staff_fixed=500000,
+        staff_per_order=22,
+        extra_items=list(extra_items),
+    )
+
+
+def _extra_items(n: int) -> List[ExtraItem]:
+    rng = np.random.default_rng(n)
+    return [
+        ExtraItem(
+            name=f"item{i}",
+            kind="cost" if i % 3 else "revenue",
+            amount=float(rng.uniform(0, 100)),
+            basis=EXTRA_BASES[i % len(EXTRA_BASES)],
+            category=f"cat{i % 10}",
+        )
+        for i in range(n)
+    ]
+
+
+def _random_store(n: int) -> ScenarioStore:
+    rng = np.random.default_rng(n)
+    columns = {name: rng.uniform(0, 100, n) for name in PARAM_FIELDS}
+    columns["Q"] = rng.integers(0, 100000, n).astype(np.float64)
+    columns["p_int"] = 1.0 - columns["p_loc"].clip(0, 1)
+    batch = ModelParamsBatch.from_columns(columns, size=n)
+    store = ScenarioStore()
+    store.extend(batch, calc_total_batch(batch))
+    return store
+
+
+def _scalar_total():
+    params = _base_params()
+    return lambda: calc_total(params)
+
+
+# Власні статті для порівняння з вбудованими (formulas.py)
+_FORMULAS = (
+    Formula("packaging", "Q * 4.5"),
+    Formula("fx_fees", "payments * p_int * 0.015"),
+    Formula("insurance", "max(0, (logistics + packaging) * 0.002 - 1000)"),
+    Formula("cashback", "Q * online_share * avg_check * 0.01", "revenue"),
+)
+
+
+def _formulas_scalar():
+    params = _base_params()
+    formulas = compile_formulas(_FORMULAS)
+    return lambda: formulas.calc_total(params)
+
+
+def _batch_total(n: int, with_formulas: bool):
+    def setup():
+        batch = _random_store(n).batch()
+        if with_formulas:
+            formulas = compile_formulas(_FORMULAS)
+            return lambda: formulas.calc_total_batch(batch)
+        return lambda: calc_total_batch(batch)
+    return setup
+
+
+def _exact_total(n: int):
+    # реалістичні копійки й частки (випадкові значення _random_store
+    # виходять за межі int64 у точному режимі)
+    def setup():
+        fixed = exact.FixedBatch.from_batch(exact.random_batch(n))
+        return lambda: exact.calc_total_exact(fixed)
+    return setup
+
+
+def _exact_params(n: int):
+    # FixedBatch.from_params зі статтями на всі бази: перетворення статей
+    # кожного сценарію в цілі
+    def setup():
+        batch = exact.random_batch(n)
+        items = _extra_items(6)
+        params = []
+        for i in range(n):
+            p = batch.to_params(i)
+            p.extra_items = list(items)
+            params.append(p)
+        return lambda: exact.calc_total_exact(exact.FixedBatch.from_params(params))
+    return setup
+
+
+def _sweep_marketing():
+    # сітка лише за полями маркетингу: решта статей рахується один раз
+    params = _base_params()
+    axes = {"cac": np.linspace(0, 100, 1000), "n_new_customers": np.arange(1000)}
+    return lambda: run_sweep(params, axes, [Aggregate()])
+
+
+def _extra_list(n: int):
+    def setup():
+        params = _base_params(_extra_items(n))
+        return lambda: calc_extra(params)
+    return setup
+
+
+def _extra_ledger(n: int):
+    def setup():
+        params = _base_params()
+        params.extra_items = ExtraItemLedger(_extra_items(n))
+        return lambda: calc_extra(params)
+    return setup
+
+
+def _tariff_orders(n: int):
+    # 3 перевізники × 30 зон × 6 вагових категорій; назви - рядками, як у журналі
+    def setup():
+        rng = np.random.default_rng(n)
+        table = TariffTable(
+            Tariff(carrier, f"zone{zone:02d}", weight, 40.0 + zone + weight * (c + 1),
+                   30.0 + zone, 0.5)
+            for c, carrier in enumerate(("nova", "ukr", "meest"))
+            for zone in range(30)
+            for weight in (0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+        )
+        carrier = rng.choice(np.array(table.carriers), n)
+        zone = rng.choice(np.array(table.zones), n)
+        weight = rng.uniform(0.1, 30.0, n)
+        value = rng.uniform(0.0, 5000.0, n)
+        returned = rng.random(n) < 0.1
+        return lambda: table.order_costs(carrier, zone, weight, value, returned)
+    return setup
+
+
+def _job_dispatch(n: int):
+    # накладні витрати реєстру й черг: n порожніх завдань від 10 власників;
+    # власне вимірювання, щоб після нього зупинити потоки JobRunner
+    def setup():
+        def dispatch(runner: JobRunner):
+            jobs = [runner.submit(f"owner{i % 10}", "noop", lambda ctx: None) for i in range(n)]
+            for job in jobs:
+                while job.active:
+                    time.sleep(0.0001)
+
+        def run(repeats: int) -> List[float]:
+            runner = JobRunner(max_workers=2)
+            try:
+                timer = timeit.Timer(lambda: dispatch(runner))
+                number, _ = timer.autorange()
+                return [t / number for t in timer.repeat(repeat=repeats, number=number)]
+            finally:
+                runner.shutdown()
+        return run
+    return setup
+
+
+def _store_frames(n: int):
+    def setup():
+        store = _random_store(n)
+
+        def run():
+            # кеш таблиць скидається так само, як при додаванні сценарію
+            store._frames.clear()
+            store.comparison_frame()
+            store.plot_frame()
+        return run
+    return setup
+
+
+def _store_page(n: int):
+    def setup():
+        store = _random_store(n)
+
+        def run():
+            # як comparison_section: відсортована сторінка з 100 рядків
+            store._order_rows.clear()
+            rows = store.select({"Q": (1000.0, None)}, sort_by="total", ascending=False)
+            store.comparison_page(rows[:100])
+        return run
+    return setup
+
+
+def _app_rerun(n: int, fragment: bool):
+    def setup():
+        # Streamlit потрібен лише для цих випадків
+        import bench_app_rerun as bar
+        from streamlit.testing.v1 import AppTest
+
+        app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+        at = AppTest.from_file(app, default_timeout=600)
+        if n > 1000:
+            # великі сховища - одним пакетом, як з перебору сітки
+            store = _random_store(n)
+        else:
+            store = ScenarioStore()
+            for i in range(n):
+                params = bar.random_params(i)
+                store.append(params, calc_total(params))
+        at.session_state["scenarios"] = store
+        at.session_state["compare_clicked"] = True
+        at.session_state["show_chart"] = True
+        stamps: dict = {}
+        bar._install_timer(stamps)
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        fragment_id = bar._fragment_id(at, "chart_section") if fragment else None
+
+        def run(repeats: int) -> List[float]:
+            return [
+                bar.measure(at, stamps, 1, fragment_id) / 1000 for _ in range(repeats)
+            ]
+        return run
+    return setup
+
+
+CASES = [
+    Case("calc_total/scalar", _scalar_total),
+    Case("calc_total/formulas/scalar", _formulas_scalar),
+    Case("calc_total/batch/100000", _batch_total(100000, False)),
+    Case("calc_total/formulas/batch/100000", _batch_total(100000, True)),
+    Case("calc_total/exact/batch/100000", _exact_total(100000)),
+    Case("calc_total/exact/params/100000", _exact_params(100000)),
+    Case("sweep/marketing/1000000", _sweep_marketing),
+    Case("logistics/tariffs/1000000", _tariff_orders(1000000)),
+    Case("calc_extra/list/1", _extra_list(1)),
+    Case("calc_extra/list/100", _extra_list(100)),
+    Case("calc_extra/list/10000", _extra_list(10000)),
+    Case("calc_extra/ledger/10000", _extra_ledger(10000)),
+    Case("jobs/dispatch/1000", _job_dispatch(1000), measured=True),
+    Case("store/frames/10", _store_frames(10)),
+    Case("store/frames/1000", _store_frames(1000)),
+    Case("store/frames/100000", _store_frames(100000)),
+    Case("store/page/1000000", _store_page(1000000)),
+    Case("app/rerun/1000", _app_rerun(1000, fragment=False), measured=True),
+    Case("app/chart_fragment/1000", _app_rerun(1000, fragment=True), measured=True),
+    Case("app/rerun/100000", _app_rerun(100000, fragment=False), measured=True),
+    Case("app/chart_fragment/100000", _app_rerun(100000, fragment=True), measured=True),
+]
+
+
+def _time_case(case: Case, repeats: int) -> List[float]:
+    fn = case.setup()
+    if case.measured:
+        return fn(repeats)
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return [t / number for t in timer.repeat(repeat=repeats, number=number)]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(patterns: List[str], repeats: int) -> Dict[str, object]:
+    results = {}
+    for case in CASES:
+        if patterns and not any(fnmatch.fnmatch(case.name, f"*{p}*") for p in patterns):
+            continue
+        times = _time_case(case, repeats)
+        results[case.name] = {
+            "median": statistics.median(times),
+            "min": min(times),
+            "repeats": len(times),
+        }
+        print(f"{case.name:<32} {_format(results[case.name]['median']):>12}", flush=True)
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    # Повертає True, якщо є регресії
+    regressed = False
+    print(f"{'випадок':<32} {'база':>12} {'зараз':>12} {'зміна':>8}")
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>12} {_format(cur['median']):>12}")
+            continue
+        ratio = cur["median"] / base["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  РЕГРЕСІЯ"
+            regressed = True
+        elif ratio < 1 - threshold:
+            flag = "  швидше"
+        print(f"{name:<32} {_format(base['median']):>12} {_format(cur['median']):>12} "
+              f"{ratio - 1:>+8.1%}{flag}")
+    return regressed
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in (("с", 1.0), ("мс", 1e-3), ("мкс", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} нс"
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки моделі та app.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="виконати бенчмарки")
+    run_parser.add_argument("-k", dest="patterns", action="append", default=[],
+                            help="лише випадки, що містять підрядок (можна кілька)")
+    run_parser.add_argument("--repeats", type=int, default=5)
+    run_parser.add_argument("--output", help="зберегти результати в JSON")
+    run_parser.add_argument("--baseline", help="порівняти з базовим JSON")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    cmp_parser = sub.add_parser("compare", help="порівняти два файли результатів")
+    cmp_parser.add_argument("baseline")
+    cmp_parser.add_argument("current")
+    cmp_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        return int(compare(_load(args.baseline), _load(args.current), args.threshold))
+
+    current = run(args.patterns, args.repeats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(current, fh, ensure_ascii=False, indent=2)
+    if args.baseline:
+        print()
+        return int(compare(_load(args.baseline), current, args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# Калібрування ModelParams за історичними журналами замовлень і маркетингу.
+#
+# Кожен файл читається один раз блоками. Для файлу (розділу) накопичуються
+# зливні оцінювачі - кількість, середнє і дисперсія за Велфордом (злиття
+# формулою Чана), для маркетингу ще й коваріація витрат і кількості
+# клієнтів. Часткові оцінки з різних файлів рахуються паралельно й
+# зливаються, тож повторне калібрування за рік даних - це один лінійний
+# прохід без завантаження всього набору в пам'ять.
+import dataclasses
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ledger import DEFAULT_CHUNK_SIZE, LedgerSchema, parse_flags, read_chunks
+from model_transaction_costs import ModelParams, params_from_dict, params_to_dict
+
+Z_95 = 1.959963984540054
+
+
+@dataclass
+class RunningStats:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        mean = float(values.mean())
+        other = RunningStats(len(values), mean, float(((values - mean) ** 2).sum()))
+        merged = self.merge(other)
+        self.count, self.mean, self.m2 = merged.count, merged.mean, merged.m2
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        count = self.count + other.count
+        if count == 0:
+            return RunningStats()
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.count / count
+        m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+        return RunningStats(count, mean, m2)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def ci(self, z: float = Z_95) -> Tuple[float, float]:
+        # Довірчий інтервал для середнього (нормальне наближення)
+        if self.count == 0:
+            return (float("nan"), float("nan"))
+        half = z * np.sqrt(self.variance / self.count)
+        return (self.mean - half, self.mean + half)
+
+
+@dataclass
+class RunningCovariance:
+    # Спільні моменти двох величин (x, y), зливні так само, як RunningStats
+    count: int = 0
+    mean_x: float = 0.0
+    mean_y: float = 0.0
+    m2_x: float = 0.0
+    m2_y: float = 0.0
+    c_xy: float = 0.0
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> None:
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(x) == 0:
+            return
+        mx, my = float(x.mean()), float(y.mean())
+        other = RunningCovariance(
+            len(x), mx, my,
+            float(((x - mx) ** 2).sum()),
+            float(((y - my) ** 2).sum()),
+            float(((x - mx) * (y - my)).sum()),
+        )
+        merged = self.merge(other)
+        for f in dataclasses.fields(self):
+            setattr(self, f.name, getattr(merged, f.name))
+
+    def merge(self, other: "RunningCovariance") -> "RunningCovariance":
+        count = self.count + other.count
+        if count == 0:
+            return RunningCovariance()
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        w = self.count * other.count / count
+        return RunningCovariance(
+            count=count,
+            mean_x=self.mean_x + dx * other.count / count,
+            mean_y=self.mean_y + dy * other.count / count,
+            m2_x=self.m2_x + other.m2_x + dx * dx * w,
+            m2_y=self.m2_y + other.m2_y + dy * dy * w,
+            c_xy=self.c_xy + other.c_xy + dx * dy * w,
+        )
+
+    def ratio_ci(self, z: float = Z_95) -> Tuple[float, float, float]:
+        # Оцінка sum(x) / sum(y) та її інтервал (дельта-метод)
+        if self.count == 0 or self.mean_y == 0:
+            return (float("nan"), float("nan"), float("nan"))
+        ratio = self.mean_x / self.mean_y
+        if self.count < 2:
+            return (ratio, ratio, ratio)
+        n1 = self.count - 1
+        var = (self.m2_x / n1 - 2 * ratio * self.c_xy / n1
+               + ratio ** 2 * self.m2_y / n1) / (self.count * self.mean_y ** 2)
+        half = z * np.sqrt(max(var, 0.0))
+        return (ratio, ratio - half, ratio + half)
+
+
+@dataclass
+class OrderStats:
+    amount: RunningStats = field(default_factory=RunningStats)
+    local: RunningStats = field(default_factory=RunningStats)
+    returned: RunningStats = field(default_factory=RunningStats)
+    online: RunningStats = field(default_factory=RunningStats)
+
+    def update(self, chunk: pd.DataFrame, schema: LedgerSchema) -> None:
+        self.amount.update(chunk[schema.amount].to_numpy(dtype=np.float64))
+        self.local.update(chunk[schema.zone].astype(str).to_numpy() == schema.local_zone)
+        self.returned.update(parse_flags(chunk[schema.returned]))
+        self.online.update(
+            chunk[schema.payment].astype(str).to_numpy() == schema.online_payment
+        )
+
+    def merge(self, other: "OrderStats") -> "OrderStats":
+        return OrderStats(
+            *(getattr(self, f.name).merge(getattr(other, f.name))
+              for f in dataclasses.fields(self))
+        )
+
+
+@dataclass
+class MarketingSchema:
+    spend: str = "spend"
+    new_customers: str = "new_customers"
+
+
+@dataclass
+class CalibrationResult:
+    params: ModelParams
+    intervals: pd.DataFrame       # field, estimate, low, high, n
+
+
+def scan_orders(
+    path: str,
+    schema: Optional[LedgerSchema] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> OrderStats:
+    schema = schema or LedgerSchema()
+    stats = OrderStats()
+    for chunk in read_chunks(path, schema, chunk_size):
+        stats.update(chunk, schema)
+    return stats
+
+
+def scan_marketing(
+    path: str,
+    schema: Optional[MarketingSchema] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> RunningCovariance:
+    schema = schema or MarketingSchema()
+    stats = RunningCovariance()
+    for chunk in pd.read_csv(
+        path, usecols=[schema.spend, schema.new_customers], chunksize=chunk_size
+    ):
+        stats.update(chunk[schema.spend], chunk[schema.new_customers])
+    return stats
+
+
+def _scan(args):
+    kind, path, schema, chunk_size = args
+    if kind == "orders":
+        return kind, scan_orders(path, schema, chunk_size)
+    return kind, scan_marketing(path, schema, chunk_size)
+
+
+def calibrate(
+    order_files: Sequence[str],
+    base: ModelParams,
+    marketing_files: Sequence[str] = (),
+    order_schema: Optional[LedgerSchema] = None,
+    marketing_schema: Optional[MarketingSchema] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+) -> CalibrationResult:
+    # Оцінює з журналів Q, avg_check, p_loc/p_int, return_rate,
+    # online_share, а з маркетингових файлів - n_new_customers і cac.
+    # Тарифи (c_loc, pay_commission, staff_* тощо) беруться з base.
+    tasks = [("orders", path, order_schema, chunk_size) for path in order_files]
+    tasks += [("marketing", path, marketing_schema, chunk_size) for path in marketing_files]
+    if workers <= 1 or len(tasks) <= 1:
+        partials = [_scan(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_scan, tasks))
+
+    orders = OrderStats()
+    marketing = RunningCovariance()
+    for kind, stats in partials:
+        if kind == "orders":
+            orders = orders.merge(stats)
+        else:
+            marketing = marketing.merge(stats)
+
+    rows = []
+    values: Dict[str, float] = {}
+    if orders.amount.count:
+        values["Q"] = orders.amount.count
+        rows.append({"field": "Q", "estimate": orders.amount.count,
+                     "low": orders.amount.count, "high": orders.amount.count,
+                     "n": orders.amount.count})
+        for name, stats in (
+            ("avg_check", orders.amount),
+            ("p_loc", orders.local),
+            ("return_rate", orders.returned),
+            ("online_share", orders.online),
+        ):
+            low, high = stats.ci()
+            values[name] = stats.mean
+            rows.append({"field": name, "estimate": stats.mean,
+                         "low": low, "high": high, "n": stats.count})
+        values["p_int"] = 1.0 - values["p_loc"]
+        low, high = orders.local.ci()
+        rows.append({"field": "p_int", "estimate": values["p_int"],
+                     "low": 1.0 - high, "high": 1.0 - low, "n": orders.local.count})
+    if marketing.count:
+        new_customers = marketing.mean_y * marketing.count
+        cac, low, high = marketing.ratio_ci()
+        values["n_new_customers"] = int(round(new_customers))
+        values["cac"] = cac
+        rows.append({"field": "n_new_customers", "estimate": new_customers,
+                     "low": new_customers, "high": new_customers, "n": marketing.count})
+        rows.append({"field": "cac", "estimate": cac, "low": low, "high": high,
+                     "n": marketing.count})
+
+    params = dataclasses.replace(base, **values)
+    intervals = pd.DataFrame(rows, columns=["field", "estimate", "low", "high", "n"])
+    return CalibrationResult(params=params, intervals=intervals)
+
+
+def save_params(params: ModelParams, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(params_to_dict(params), fh, ensure_ascii=False, indent=2)
+
+
+def load_params(path: str) -> ModelParams:
+    with open(path, encoding="utf-8") as fh:
+        return params_from_dict(json.load(fh))
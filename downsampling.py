@@ -0,0 +1,40 @@
+# Зменшення кількості точок лінійного графіка зі збереженням форми.
+#
+# Largest-Triangle-Three-Buckets (Steinarsson, 2013): перша й остання
+# точки зберігаються, решта ділиться на threshold - 2 кошики, і з кожного
+# береться точка, що утворює найбільший трикутник з попередньою обраною
+# точкою та середнім наступного кошика. Піки й провали залишаються на
+# графіку, а в браузер іде не більше threshold точок.
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # Позиції обраних точок (зростаючі); x має бути впорядкованим
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # межі кошиків для точок 1 .. n-2
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # середні кошиків (для останнього "наступного" - остання точка)
+    counts = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts, y[-1])
+
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0] = 0
+    a = 0
+    for b in range(threshold - 2):
+        start, stop = edges[b], edges[b + 1]
+        bx = x[start:stop]
+        by = y[start:stop]
+        # подвоєна площа трикутника (a, точка кошика, середнє наступного)
+        area = np.abs(
+            (x[a] - avg_x[b + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[b + 1] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        picked[b + 1] = a
+    picked[-1] = n - 1
+    return picked
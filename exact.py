@@ -0,0 +1,440 @@
+# Точний режим: гроші в копійках (int64), частки й ставки - цілими числа
+# у мільйонних частках (RATE_SCALE).
+#
+# Звичайні calc_* працюють з float, і на мільйонах сценаріїв суми
+# розходяться з бухгалтерськими. Тут ті самі статті рахуються в цілих
+# числах numpy (векторизовано, як calc_total_batch), а округлення
+# відбувається лише в явно визначених місцях за правилами RoundingRules:
+#
+#   delivery_unit = round[unit](p_loc * c_loc + p_int * c_int)        грн/замовл.
+#   return_unit   = round[unit](p_loc * c_ret_loc + p_int * c_ret_int)
+#   logistics     = round[logistics](Q * delivery_unit + Q * return_rate * return_unit)
+#   turnover      = round[turnover](Q * online_share * avg_check)      онлайн-оборот
+#   payments      = round[payments](turnover * pay_commission)
+#   marketing     = n_new_customers * cac                              (точно)
+#   staff         = staff_fixed + staff_per_order * Q                  (точно)
+#   extra         = сума по базах нарахування round[extra](драйвер * сума статей)
+#
+# Вхідні значення переводяться в цілі один раз (FixedBatch.from_batch /
+# from_params); далі результат однозначно визначений цілими вхідними
+# даними і правилами. decimal_total рахує той самий результат через
+# decimal.Decimal; звірку обох способів виконує tests/test_exact.py
+# (великі вибірки - python exact.py -n N).
+import decimal
+from dataclasses import dataclass, fields
+from decimal import Decimal
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from model_transaction_costs import (
+    BASIS_CODES,
+    EXTRA_BASES,
+    EXTRA_KINDS,
+    KIND_CODES,
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ExtraItem,
+    ModelParams,
+    ModelParamsBatch,
+)
+
+KOPIYKAS = 100
+RATE_SCALE = 1_000_000
+
+MONEY_FIELDS = ("avg_check", "c_loc", "c_int", "c_ret_loc", "c_ret_int", "cac",
+                "staff_fixed", "staff_per_order", "extra_cost", "extra_revenue")
+RATE_FIELDS = ("p_loc", "p_int", "return_rate", "online_share", "pay_commission")
+COUNT_FIELDS = ("Q", "n_new_customers")
+
+# Режими округлення (назви як у decimal)
+ROUNDING_MODES = (
+    decimal.ROUND_HALF_UP,
+    decimal.ROUND_HALF_EVEN,
+    decimal.ROUND_DOWN,
+    decimal.ROUND_UP,
+)
+
+# Найбільше проміжне значення; більші добутки - OverflowError замість
+# тихого переповнення int64
+_LIMIT = 2.0 ** 62
+
+
+@dataclass(frozen=True)
+class Rounding:
+    mode: str = decimal.ROUND_HALF_UP
+    step: int = 1               # крок у копійках (100 - до гривні)
+
+    def __post_init__(self):
+        if self.mode not in ROUNDING_MODES:
+            raise ValueError(f"Невідомий режим округлення: {self.mode}")
+        if self.step < 1:
+            raise ValueError("Крок округлення має бути не менше 1 копійки")
+
+
+@dataclass(frozen=True)
+class RoundingRules:
+    unit: Rounding = Rounding()         # вартість доставки / повернення на замовлення
+    logistics: Rounding = Rounding()
+    turnover: Rounding = Rounding()     # онлайн-оборот
+    payments: Rounding = Rounding()
+    extra: Rounding = Rounding()        # кожна база нарахування окремо
+
+
+DEFAULT_ROUNDING = RoundingRules()
+
+
+def to_fixed(values, scale: int) -> np.ndarray:
+    # float -> найближче ціле в одиницях 1 / scale
+    scaled = np.rint(np.asarray(values, dtype=np.float64) * scale)
+    if np.abs(scaled).max(initial=0.0) >= _LIMIT:
+        raise OverflowError("Значення завелике для точного режиму")
+    return scaled.astype(np.int64)
+
+
+def _product(*values) -> np.ndarray:
+    # Цілий добуток з перевіркою меж: добуток найбільших модулів множників
+    # (з запасом, зате без проміжних масивів float)
+    bound = 1.0
+    for v in values:
+        bound *= float(np.abs(v).max(initial=0))
+    if bound >= _LIMIT:
+        raise OverflowError("Проміжний добуток виходить за межі int64")
+    result = np.asarray(values[0], dtype=np.int64)
+    for v in values[1:]:
+        result = result * v
+    return result
+
+
+def round_div(numerator, denominator: int, rule: Rounding) -> np.ndarray:
+    # round(numerator / denominator) до кроку rule.step за режимом rule.mode
+    divisor = denominator * rule.step
+    numerator = np.asarray(numerator, dtype=np.int64)
+    negative = numerator.min(initial=0) < 0
+    # округлення за модулем; для невід'ємних (звичайний випадок) - одне
+    # ціле ділення без divmod і знаку
+    n = np.abs(numerator) if negative else numerator
+    if rule.mode == decimal.ROUND_HALF_UP:
+        q = (n + divisor // 2) // divisor
+    elif rule.mode == decimal.ROUND_HALF_EVEN:
+        q, r = np.divmod(n, divisor)
+        q = q + ((2 * r > divisor) | ((2 * r == divisor) & (q % 2 == 1)))
+    elif rule.mode == decimal.ROUND_UP:
+        q = (n + (divisor - 1)) // divisor
+    else:
+        q = n // divisor
+    q = q * rule.step
+    return np.sign(numerator) * q if negative else q
+
+
+@dataclass
+class FixedBatch:
+    # Поля ModelParamsBatch цілими: гроші - копійки, частки - RATE_SCALE,
+    # кількості - штуки. extra_cost / extra_revenue - зведені суми статей.
+    Q: np.ndarray
+    avg_check: np.ndarray
+    p_loc: np.ndarray
+    p_int: np.ndarray
+    return_rate: np.ndarray
+    c_loc: np.ndarray
+    c_int: np.ndarray
+    c_ret_loc: np.ndarray
+    c_ret_int: np.ndarray
+    online_share: np.ndarray
+    pay_commission: np.ndarray
+    n_new_customers: np.ndarray
+    cac: np.ndarray
+    staff_fixed: np.ndarray
+    staff_per_order: np.ndarray
+    extra_cost: np.ndarray
+    extra_revenue: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.Q)
+
+    @classmethod
+    def from_batch(cls, batch: ModelParamsBatch) -> "FixedBatch":
+        return cls(**{f.name: _convert(f.name, getattr(batch, f.name)) for f in fields(cls)})
+
+    @classmethod
+    def from_params(
+        cls, params: Sequence[ModelParams], rules: RoundingRules = DEFAULT_ROUNDING
+    ) -> "FixedBatch":
+        # Статті extra_items рахуються точно (extra_totals_batch) для всіх
+        # сценаріїв одразу
+        columns = {
+            name: _convert(name, [getattr(p, name) for p in params]) for name in PARAM_FIELDS
+        }
+        columns["extra_cost"] = np.zeros(len(params), dtype=np.int64)
+        columns["extra_revenue"] = np.zeros(len(params), dtype=np.int64)
+        fixed = cls(**columns)
+        if any(len(p.extra_items) for p in params):
+            amounts = item_amounts([p.extra_items for p in params])
+            fixed.extra_cost, fixed.extra_revenue = extra_totals_batch(fixed, amounts, rules)
+        return fixed
+
+
+def _convert(name: str, values) -> np.ndarray:
+    if name in MONEY_FIELDS:
+        return to_fixed(values, KOPIYKAS)
+    if name in RATE_FIELDS:
+        return to_fixed(values, RATE_SCALE)
+    return to_fixed(values, 1)
+
+
+def _item_amounts(items) -> np.ndarray:
+    # Суми статей (бази × kind): копійки; для percent_of_revenue - відсотки
+    # у RATE_SCALE
+    return item_amounts([items])[0]
+
+
+def item_amounts(catalogs: Sequence[Sequence[ExtraItem]]) -> np.ndarray:
+    # _item_amounts кожного сценарію: (сценарії × бази × kind). Статті всіх
+    # сценаріїв збираються в масиви й переводяться в цілі одним викликом
+    # to_fixed на масштаб, а не по одній
+    rows, bases, kinds, values = [], [], [], []
+    for i, items in enumerate(catalogs):
+        for item in items:
+            kind = KIND_CODES.get(item.kind)
+            if kind is None:
+                continue
+            basis = BASIS_CODES.get(item.basis)
+            if basis is None:
+                raise ValueError(f"Невідома база нарахування: {item.basis}")
+            rows.append(i)
+            bases.append(basis)
+            kinds.append(kind)
+            values.append(item.amount)
+    amounts = np.zeros((len(catalogs), len(EXTRA_BASES), len(EXTRA_KINDS)), dtype=np.int64)
+    if not rows:
+        return amounts
+    bases = np.array(bases)
+    values = np.array(values, dtype=np.float64)
+    percent = bases == BASIS_CODES["percent_of_revenue"]
+    fixed = np.where(
+        percent, to_fixed(np.where(percent, values, 0.0), RATE_SCALE),
+        to_fixed(np.where(percent, 0.0, values), KOPIYKAS),
+    )
+    np.add.at(amounts, (np.array(rows), bases, np.array(kinds)), fixed)
+    return amounts
+
+
+def extra_totals_batch(
+    fixed: FixedBatch, amounts: np.ndarray, rules: RoundingRules = DEFAULT_ROUNDING
+):
+    # (extra_cost, extra_revenue) усіх сценаріїв у копійках; amounts -
+    # item_amounts (або одна таблиця бази × kind, спільна для всіх)
+    amounts = np.broadcast_to(amounts, (len(fixed), len(EXTRA_BASES), len(EXTRA_KINDS)))
+    flat, per_order, per_return, percent = (
+        amounts[:, BASIS_CODES[basis]] for basis in EXTRA_BASES
+    )
+    q = fixed.Q[:, None]
+    totals = (
+        flat
+        + _product(per_order, q)
+        + round_div(_product(per_return, q, fixed.return_rate[:, None]), RATE_SCALE, rules.extra)
+        + round_div(_product(percent, q, fixed.avg_check[:, None]), 100 * RATE_SCALE, rules.extra)
+    )
+    return (
+        np.ascontiguousarray(totals[:, KIND_CODES["cost"]]),
+        np.ascontiguousarray(totals[:, KIND_CODES["revenue"]]),
+    )
+
+
+def extra_totals(fixed: FixedBatch, i: int, items, rules: RoundingRules = DEFAULT_ROUNDING):
+    # (extra_cost, extra_revenue) сценарію i в копійках
+    row = FixedBatch(**{f.name: getattr(fixed, f.name)[i:i + 1] for f in fields(FixedBatch)})
+    cost, revenue = extra_totals_batch(row, _item_amounts(items), rules)
+    return int(cost[0]), int(revenue[0])
+
+
+def calc_total_exact(
+    fixed: FixedBatch, rules: RoundingRules = DEFAULT_ROUNDING
+) -> Dict[str, np.ndarray]:
+    # Статті RESULT_FIELDS у копійках (int64)
+    delivery_unit = round_div(
+        _product(fixed.p_loc, fixed.c_loc) + _product(fixed.p_int, fixed.c_int),
+        RATE_SCALE, rules.unit,
+    )
+    return_unit = round_div(
+        _product(fixed.p_loc, fixed.c_ret_loc) + _product(fixed.p_int, fixed.c_ret_int),
+        RATE_SCALE, rules.unit,
+    )
+    logistics = round_div(
+        _product(fixed.Q, delivery_unit, RATE_SCALE)
+        + _product(fixed.Q, fixed.return_rate, return_unit),
+        RATE_SCALE, rules.logistics,
+    )
+    turnover = round_div(
+        _product(fixed.Q, fixed.online_share, fixed.avg_check), RATE_SCALE, rules.turnover
+    )
+    payments = round_div(_product(turnover, fixed.pay_commission), RATE_SCALE, rules.payments)
+    marketing = _product(fixed.n_new_customers, fixed.cac)
+    staff = fixed.staff_fixed + _product(fixed.staff_per_order, fixed.Q)
+    extra_net = fixed.extra_cost - fixed.extra_revenue
+    return {
+        "logistics": logistics,
+        "payments": payments,
+        "marketing": marketing,
+        "staff": staff,
+        "extra_cost": fixed.extra_cost,
+        "extra_revenue": fixed.extra_revenue,
+        "extra_net": extra_net,
+        "total": logistics + payments + marketing + staff + extra_net,
+    }
+
+
+def calc_total_kopiykas(
+    params: ModelParams, rules: RoundingRules = DEFAULT_ROUNDING
+) -> Dict[str, int]:
+    result = calc_total_exact(FixedBatch.from_params([params], rules), rules)
+    return {name: int(values[0]) for name, values in result.items()}
+
+
+def to_hryvnias(result: Dict[str, object]) -> Dict[str, object]:
+    # Копійки -> гривні (float) для показу поруч зі звичайним calc_total
+    return {name: np.asarray(values) / KOPIYKAS for name, values in result.items()}
+
+
+# --- ЕТАЛОН НА DECIMAL ---
+
+
+def _quantize(value: Decimal, rule: Rounding) -> Decimal:
+    step = Decimal(rule.step)
+    return (value / step).quantize(Decimal(1), rounding=rule.mode) * step
+
+
+def decimal_total(
+    fixed: FixedBatch, i: int, rules: RoundingRules = DEFAULT_ROUNDING
+) -> Dict[str, int]:
+    # Той самий розрахунок для сценарію i у decimal.Decimal (повільно;
+    # для звірки). Гроші - в копійках, частки - дробами.
+    with decimal.localcontext() as ctx:
+        ctx.prec = 60
+        money = {name: Decimal(int(getattr(fixed, name)[i])) for name in MONEY_FIELDS}
+        rate = {name: Decimal(int(getattr(fixed, name)[i])) / RATE_SCALE for name in RATE_FIELDS}
+        q = Decimal(int(fixed.Q[i]))
+        delivery_unit = _quantize(
+            rate["p_loc"] * money["c_loc"] + rate["p_int"] * money["c_int"], rules.unit
+        )
+        return_unit = _quantize(
+            rate["p_loc"] * money["c_ret_loc"] + rate["p_int"] * money["c_ret_int"], rules.unit
+        )
+        logistics = _quantize(
+            q * delivery_unit + q * rate["return_rate"] * return_unit, rules.logistics
+        )
+        turnover = _quantize(q * rate["online_share"] * money["avg_check"], rules.turnover)
+        payments = _quantize(turnover * rate["pay_commission"], rules.payments)
+        marketing = Decimal(int(fixed.n_new_customers[i])) * money["cac"]
+        staff = money["staff_fixed"] + money["staff_per_order"] * q
+        extra_net = money["extra_cost"] - money["extra_revenue"]
+        result = {
+            "logistics": logistics,
+            "payments": payments,
+            "marketing": marketing,
+            "staff": staff,
+            "extra_cost": money["extra_cost"],
+            "extra_revenue": money["extra_revenue"],
+            "extra_net": extra_net,
+            "total": logistics + payments + marketing + staff + extra_net,
+        }
+    return {name: int(value) for name, value in result.items()}
+
+
+def decimal_extra_totals(
+    fixed: FixedBatch, i: int, items, rules: RoundingRules = DEFAULT_ROUNDING
+):
+    # Еталон для extra_totals
+    table = _item_amounts(items)
+    with decimal.localcontext() as ctx:
+        ctx.prec = 60
+        q = Decimal(int(fixed.Q[i]))
+        rr = Decimal(int(fixed.return_rate[i])) / RATE_SCALE
+        check = Decimal(int(fixed.avg_check[i]))
+        totals = []
+        for kind in range(len(EXTRA_KINDS)):
+            flat, per_order, per_return, percent = (Decimal(int(v)) for v in table[:, kind])
+            totals.append(int(
+                flat
+                + per_order * q
+                + _quantize(per_return * q * rr, rules.extra)
+                + _quantize(percent / RATE_SCALE * q * check / 100, rules.extra)
+            ))
+    return totals[KIND_CODES["cost"]], totals[KIND_CODES["revenue"]]
+
+
+def reconcile(
+    fixed: FixedBatch, rules: RoundingRules = DEFAULT_ROUNDING, rows=None
+) -> List[int]:
+    # Сценарії (з rows або всі), де calc_total_exact не збігається з decimal_total
+    result = calc_total_exact(fixed, rules)
+    rows = range(len(fixed)) if rows is None else rows
+    mismatched = []
+    for i in rows:
+        reference = decimal_total(fixed, i, rules)
+        if any(int(result[name][i]) != reference[name] for name in RESULT_FIELDS):
+            mismatched.append(i)
+    return mismatched
+
+
+def random_batch(n: int, seed: int = 0) -> ModelParamsBatch:
+    # Сценарії з дробовими частками й копійками, що дають "половинні" випадки
+    rng = np.random.default_rng(seed)
+    p_loc = rng.integers(0, 1001, n) / 1000
+    columns = {
+        "Q": rng.integers(1, 200_000, n),
+        "avg_check": rng.integers(10_000, 500_000, n) / 100,
+        "p_loc": p_loc,
+        "p_int": 1 - p_loc,
+        "return_rate": rng.integers(0, 200_000, n) / RATE_SCALE,
+        "c_loc": rng.integers(1_000, 20_000, n) / 100,
+        "c_int": rng.integers(1_000, 30_000, n) / 100,
+        "c_ret_loc": rng.integers(500, 10_000, n) / 100,
+        "c_ret_int": rng.integers(500, 15_000, n) / 100,
+        "online_share": rng.integers(0, 1001, n) / 1000,
+        "pay_commission": rng.integers(0, 50_000, n) / RATE_SCALE,
+        "n_new_customers": rng.integers(0, 50_000, n),
+        "cac": rng.integers(0, 20_000, n) / 100,
+        "staff_fixed": rng.integers(0, 100_000_000, n) / 100,
+        "staff_per_order": rng.integers(0, 5_000, n) / 100,
+        "extra_cost": rng.integers(0, 10_000_000, n) / 100,
+        "extra_revenue": rng.integers(0, 1_000_000, n) / 100,
+    }
+    return ModelParamsBatch.from_columns(columns, size=n)
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Звірка точного режиму з decimal.Decimal")
+    parser.add_argument("-n", type=int, default=100_000, help="кількість сценаріїв")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fixed = FixedBatch.from_batch(random_batch(args.n, args.seed))
+    rng = np.random.default_rng(args.seed)
+    items = [
+        ExtraItem(f"item{k}", EXTRA_KINDS[k % 2], int(rng.integers(1, 10**6)) / 100, basis)
+        for k, basis in enumerate(EXTRA_BASES * 2)
+        if basis != "percent_of_revenue"
+    ] + [
+        ExtraItem(f"fee{k}", kind, int(rng.integers(1, 10**6)) / 10**5, "percent_of_revenue")
+        for k, kind in enumerate(EXTRA_KINDS)
+    ]
+    failed = 0
+    for mode in ROUNDING_MODES:
+        for step in (1, 100):
+            rules = RoundingRules(*(Rounding(mode, step) for _ in fields(RoundingRules)))
+            mismatched = reconcile(fixed, rules)
+            # статті extra_items - на частині сценаріїв (розрахунок поелементний)
+            for i in range(min(len(fixed), 1000)):
+                if extra_totals(fixed, i, items, rules) != decimal_extra_totals(
+                        fixed, i, items, rules):
+                    mismatched.append(i)
+            failed += len(mismatched)
+            print(f"{mode:16} крок {step:3}: розбіжностей {len(mismatched)} з {len(fixed)}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# Каталог додаткових показників на масивах numpy.
+#
+# Статті зберігаються колонками: коди бази нарахування і типу (int8),
+# суми (float64), коди категорій (int32), ознака чинності. Для кожної
+# категорії підтримується матриця сум (бази × kind), яка оновлюється при
+# додаванні чи видаленні статті, тож підсумки не потребують проходу по
+# каталогу. Підсумки для багатьох сценаріїв зі спільним каталогом -
+# один матричний добуток драйверів (сценарії × бази) на ці суми.
+#
+# Каталог можна передати в ModelParams.extra_items замість списку
+# ExtraItem: calc_extra бере готові суми через coefficients().
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from model_transaction_costs import (
+    BASIS_CODES,
+    EXTRA_BASES,
+    EXTRA_KINDS,
+    KIND_CODES,
+    ExtraItem,
+    ModelParams,
+    ModelParamsBatch,
+    apply_extra_items,
+    extra_drivers,
+)
+
+# Після стількох видалень (відносно кількості чинних статей) суми
+# перераховуються заново, щоб не накопичувалась похибка віднімань
+_RECOMPUTE_RATIO = 1.0
+
+
+def _codes(values: Iterable[str], mapping: Dict[str, int], what: str) -> np.ndarray:
+    try:
+        return np.fromiter((mapping[v] for v in values), dtype=np.int8)
+    except KeyError as e:
+        raise ValueError(f"Невідомий {what}: {e.args[0]}") from None
+
+
+class ExtraItemLedger:
+    def __init__(self, items: Iterable[ExtraItem] = (), capacity: int = 64):
+        self._size = 0          # зайняті рядки, включно з видаленими
+        self._alive_count = 0
+        self._capacity = capacity
+        self._names = np.empty(capacity, dtype=object)
+        self._basis = np.empty(capacity, dtype=np.int8)
+        self._kind = np.empty(capacity, dtype=np.int8)
+        self._amount = np.empty(capacity, dtype=np.float64)
+        self._category = np.empty(capacity, dtype=np.int32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._removed = 0
+        self._categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        # категорія -> (бази × kind)
+        self._aggregates = np.zeros((0, len(EXTRA_BASES), len(EXTRA_KINDS)))
+        self._coefficients = np.zeros((len(EXTRA_BASES), len(EXTRA_KINDS)))
+        items = list(items)
+        if items:
+            self.extend(
+                [item.name for item in items],
+                [item.kind for item in items],
+                [item.amount for item in items],
+                [item.basis for item in items],
+                [item.category for item in items],
+            )
+
+    def __len__(self) -> int:
+        return self._alive_count
+
+    def __iter__(self) -> Iterator[ExtraItem]:
+        for i in np.flatnonzero(self._alive[:self._size]):
+            yield self._item(i)
+
+    def __getitem__(self, item_id: int) -> ExtraItem:
+        if not (0 <= item_id < self._size and self._alive[item_id]):
+            raise KeyError(f"Статті {item_id} немає в каталозі")
+        return self._item(item_id)
+
+    def _item(self, i: int) -> ExtraItem:
+        return ExtraItem(
+            name=self._names[i],
+            kind=EXTRA_KINDS[self._kind[i]],
+            amount=self._amount[i].item(),
+            basis=EXTRA_BASES[self._basis[i]],
+            category=self._categories[self._category[i]],
+        )
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self._categories)
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, 2 * self._capacity)
+        for name in ("_names", "_basis", "_kind", "_amount", "_category"):
+            setattr(self, name, np.resize(getattr(self, name), capacity))
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+        self._capacity = capacity
+
+    def _category_code(self, name: str) -> int:
+        code = self._category_codes.get(name)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(name)
+            self._category_codes[name] = code
+            self._aggregates = np.concatenate(
+                [self._aggregates, np.zeros((1,) + self._aggregates.shape[1:])]
+            )
+        return code
+
+    def add(self, item: ExtraItem) -> int:
+        # Додає статтю і повертає її номер у каталозі
+        return int(self.extend(
+            [item.name], [item.kind], [item.amount], [item.basis], [item.category]
+        )[0])
+
+    def extend(
+        self,
+        names: Sequence[str],
+        kinds: Sequence[str],
+        amounts: Sequence[float],
+        bases: Optional[Sequence[str]] = None,
+        categories: Optional[Sequence[str]] = None,
+    ) -> np.ndarray:
+        # Пакетне додавання колонками; повертає номери нових статей
+        n = len(names)
+        kind = _codes(kinds, KIND_CODES, "тип показника")
+        basis = (_codes(bases, BASIS_CODES, "базис нарахування") if bases is not None
+                 else np.zeros(n, dtype=np.int8))
+        amount = np.asarray(amounts, dtype=np.float64)
+        if categories is None:
+            categories = [""] * n
+        category = np.fromiter(
+            (self._category_code(c) for c in categories), dtype=np.int32, count=n
+        )
+
+        start = self._size
+        self._grow(start + n)
+        stop = start + n
+        self._names[start:stop] = list(names)
+        self._basis[start:stop] = basis
+        self._kind[start:stop] = kind
+        self._amount[start:stop] = amount
+        self._category[start:stop] = category
+        self._alive[start:stop] = True
+        self._size = stop
+        self._alive_count += n
+
+        np.add.at(self._aggregates, (category, basis, kind), amount)
+        np.add.at(self._coefficients, (basis, kind), amount)
+        return np.arange(start, stop)
+
+    def remove(self, item_id: int) -> None:
+        self[item_id]  # перевірка наявності
+        basis, kind = self._basis[item_id], self._kind[item_id]
+        amount = self._amount[item_id]
+        self._aggregates[self._category[item_id], basis, kind] -= amount
+        self._coefficients[basis, kind] -= amount
+        self._alive[item_id] = False
+        self._alive_count -= 1
+        self._removed += 1
+        if self._removed > self._alive_count * _RECOMPUTE_RATIO:
+            self._recompute()
+
+    def _recompute(self) -> None:
+        # Номери статей не змінюються, тому видалені рядки лишаються на місці
+        self._removed = 0
+        alive = self._alive[:self._size]
+        self._aggregates[:] = 0.0
+        self._coefficients[:] = 0.0
+        index = (self._category[:self._size][alive], self._basis[:self._size][alive],
+                 self._kind[:self._size][alive])
+        np.add.at(self._aggregates, index, self._amount[:self._size][alive])
+        np.add.at(self._coefficients, index[1:], self._amount[:self._size][alive])
+
+    def coefficients(self) -> np.ndarray:
+        # Суми amount (бази × kind) по всьому каталогу
+        return self._coefficients.copy()
+
+    def category_coefficients(self) -> np.ndarray:
+        # Суми amount (категорії × бази × kind)
+        return self._aggregates.copy()
+
+    def totals(self, params) -> Dict[str, object]:
+        # extra_cost / extra_revenue / extra_net для ModelParams (числа) або
+        # ModelParamsBatch (масиви) - як у calc_extra
+        values = extra_drivers(params) @ self._coefficients
+        cost = values[..., KIND_CODES["cost"]]
+        revenue = values[..., KIND_CODES["revenue"]]
+        if values.ndim == 1:
+            cost, revenue = float(cost), float(revenue)
+        return {"extra_cost": cost, "extra_revenue": revenue, "extra_net": cost - revenue}
+
+    def category_totals(self, params) -> np.ndarray:
+        # Суми за категоріями: (категорії × kind) для ModelParams або
+        # (сценарії × категорії × kind) для пакета - один матричний добуток
+        drivers = extra_drivers(params)
+        n_categories = len(self._categories)
+        flat = self._aggregates.transpose(1, 0, 2).reshape(len(EXTRA_BASES), -1)
+        values = drivers @ flat
+        return values.reshape(drivers.shape[:-1] + (n_categories, len(EXTRA_KINDS)))
+
+    def category_frame(self, params: ModelParams) -> pd.DataFrame:
+        values = self.category_totals(params)
+        frame = pd.DataFrame(
+            values, index=pd.Index(self._categories, name="category"), columns=EXTRA_KINDS
+        )
+        frame["net"] = frame["cost"] - frame["revenue"]
+        return frame
+
+    def apply(self, batch: ModelParamsBatch) -> ModelParamsBatch:
+        # Пакет з extra_cost / extra_revenue за цим каталогом
+        return apply_extra_items(batch, self)
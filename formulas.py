@@ -0,0 +1,333 @@
+# Власні статті витрат, задані формулами.
+#
+# Формула - арифметичний вираз над полями ModelParams, вбудованими
+# статтями (logistics, payments, marketing, staff, extra_cost,
+# extra_revenue) та іншими власними статтями:
+#
+#   packaging = Q * 4.5
+#   fx_fees   = payments * p_int * 0.015
+#   insurance = max(0, (logistics + packaging) * 0.002 - 1000)
+#
+# Набір формул розбирається й перевіряється один раз (дозволені лише
+# числа, імена, + - * / ** та min / max / abs; показник степеня - лише
+# число не більше MAX_EXPONENT за модулем; циклічні залежності -
+# помилка), сортується топологічно і компілюється в одну функцію Python з
+# лінійним кодом. Як і calc_logistics та інші, вона використовує лише
+# арифметику, тому однаково працює зі скалярами ModelParams і з масивами
+# ModelParamsBatch. Числа й поля в ядрі - float (а не цілі Python
+# довільної довжини), тож обчислення завжди обмежене в часі.
+# Скомпільовані набори кешуються за вмістом формул.
+#
+# Статті kind="cost" додаються до extra_cost, kind="revenue" - до
+# extra_revenue, тож total, сховище сценаріїв і таблиці порівняння
+# враховують їх без змін. Значення кожної статті - окремий ключ результату.
+import ast
+import copy
+import functools
+import hashlib
+import keyword
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from model_transaction_costs import (
+    EXTRA_KINDS,
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ModelParams,
+    ModelParamsBatch,
+    calc_total,
+    calc_total_batch,
+)
+
+# Вбудовані статті, на які можна посилатися у формулах (extra_net і
+# total змінюються самими власними статтями, тому недоступні)
+BUILTIN_COMPONENTS = ("logistics", "payments", "marketing", "staff",
+                      "extra_cost", "extra_revenue")
+
+# Функції формул -> векторизовані відповідники numpy
+FUNCTIONS = {
+    "min": np.minimum,
+    "max": np.maximum,
+    "abs": np.abs,
+}
+_SCALAR_FUNCTIONS = {"min": min, "max": max, "abs": abs}
+
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)
+# Найбільший дозволений показник степеня (за модулем)
+MAX_EXPONENT = 10
+_UNARY_OPS = (ast.UAdd, ast.USub)
+_RESERVED = set(PARAM_FIELDS) | set(RESULT_FIELDS) | set(FUNCTIONS) | {"extra_items"}
+
+
+class FormulaError(ValueError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Formula:
+    name: str
+    expression: str
+    kind: str = "cost"      # "cost" або "revenue", як у ExtraItem
+
+
+def _parse(formula: Formula) -> Tuple[ast.expr, List[str]]:
+    # Повертає перевірене дерево виразу та імена, на які він посилається
+    try:
+        tree = ast.parse(formula.expression.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise FormulaError(f"{formula.name}: синтаксична помилка ({e.msg})") from None
+    names: List[str] = []
+
+    def check(node: ast.AST) -> None:
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _BIN_OPS):
+            if isinstance(node.op, ast.Pow):
+                _check_exponent(formula, node.right)
+            check(node.left)
+            check(node.right)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, _UNARY_OPS):
+            check(node.operand)
+        elif isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            pass
+        elif isinstance(node, ast.Name):
+            if node.id in FUNCTIONS:
+                raise FormulaError(f"{formula.name}: {node.id} - функція, а не значення")
+            if node.id not in names:
+                names.append(node.id)
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+              and node.func.id in FUNCTIONS and not node.keywords):
+            expected = 1 if node.func.id == "abs" else 2
+            if len(node.args) < expected or (expected == 1 and len(node.args) > 1):
+                raise FormulaError(
+                    f"{formula.name}: неправильна кількість аргументів {node.func.id}"
+                )
+            for arg in node.args:
+                check(arg)
+        else:
+            snippet = ast.get_source_segment(formula.expression.strip(), node)
+            raise FormulaError(
+                f"{formula.name}: недозволений вираз {snippet or type(node).__name__}"
+            )
+
+    check(tree)
+    return tree, names
+
+
+def _check_exponent(formula: Formula, node: ast.expr) -> None:
+    # Показник - числова стала (можливо, зі знаком) до MAX_EXPONENT
+    value = node
+    sign = 1
+    if isinstance(value, ast.UnaryOp) and isinstance(value.op, _UNARY_OPS):
+        sign = -1 if isinstance(value.op, ast.USub) else 1
+        value = value.operand
+    if not (isinstance(value, ast.Constant) and type(value.value) in (int, float)):
+        raise FormulaError(f"{formula.name}: показник степеня має бути числом")
+    if abs(sign * value.value) > MAX_EXPONENT:
+        raise FormulaError(
+            f"{formula.name}: показник степеня більший за {MAX_EXPONENT} за модулем"
+        )
+
+
+def _validate_name(formula: Formula) -> None:
+    name = formula.name
+    if not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_"):
+        raise FormulaError(f"Некоректна назва статті: {name!r}")
+    if name in _RESERVED:
+        raise FormulaError(f"Назва {name!r} зайнята полем або вбудованою статтею")
+    if formula.kind not in EXTRA_KINDS:
+        raise FormulaError(f"{name}: невідомий тип {formula.kind!r}")
+
+
+def _order(formulas: Sequence[Formula], deps: Dict[str, List[str]]) -> List[str]:
+    # Топологічне сортування (пошук у глибину); цикл - FormulaError зі шляхом
+    order: List[str] = []
+    state: Dict[str, int] = {}      # 1 - у поточному шляху, 2 - готово
+    path: List[str] = []
+
+    def visit(name: str) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            cycle = path[path.index(name):] + [name]
+            raise FormulaError(f"Циклічна залежність: {' -> '.join(cycle)}")
+        state[name] = 1
+        path.append(name)
+        for dep in deps[name]:
+            if dep in deps:
+                visit(dep)
+        path.pop()
+        state[name] = 2
+        order.append(name)
+
+    for formula in formulas:
+        visit(formula.name)
+    return order
+
+
+class FormulaSet:
+    def __init__(self, formulas: Sequence[Formula]):
+        self.formulas = tuple(formulas)
+        by_name: Dict[str, Formula] = {}
+        for formula in self.formulas:
+            _validate_name(formula)
+            if formula.name in by_name:
+                raise FormulaError(f"Стаття {formula.name!r} визначена двічі")
+            by_name[formula.name] = formula
+
+        trees: Dict[str, ast.expr] = {}
+        deps: Dict[str, List[str]] = {}
+        for formula in self.formulas:
+            trees[formula.name], deps[formula.name] = _parse(formula)
+            for dep in deps[formula.name]:
+                if (dep not in by_name and dep not in PARAM_FIELDS
+                        and dep not in BUILTIN_COMPONENTS):
+                    raise FormulaError(f"{formula.name}: невідоме ім'я {dep!r}")
+        self.order = _order(self.formulas, deps)
+        self.kinds = {f.name: f.kind for f in self.formulas}
+        self.dependencies = {name: tuple(deps[name]) for name in self.order}
+        # поля ModelParams і вбудовані статті, від яких залежить набір
+        self.inputs = tuple(sorted(
+            {dep for names in deps.values() for dep in names} - set(by_name)
+        ))
+        self.key = hashlib.blake2b(
+            repr([(f.name, f.expression, f.kind) for f in self.formulas]).encode(),
+            digest_size=16,
+        ).hexdigest()
+        self._scalar = self._compile(trees, deps, vectorized=False)
+        self._vector = self._compile(trees, deps, vectorized=True)
+
+    def __len__(self) -> int:
+        return len(self.formulas)
+
+    def _compile(self, trees, deps, vectorized: bool) -> Callable:
+        # def _kernel(_p, _base):
+        #     Q = _p.Q
+        #     payments = _base["payments"]
+        #     packaging = Q * 4.5
+        #     return (packaging, ...), packaging + ..., 0.0
+        # Другий і третій елементи - прирости extra_cost / extra_revenue.
+        # Скалярне ядро викликає вбудовані min / max / abs, векторне - numpy.
+        used = {dep for names in deps.values() for dep in names}
+        # скалярні входи - float: Q та інші цілі поля не повинні давати
+        # цілу арифметику Python необмеженої довжини
+        wrap = "{}" if vectorized else "_float({})"
+        lines = ["def _kernel(_p, _base):"]
+        lines += [f"    {name} = " + wrap.format(f"_p.{name}")
+                  for name in PARAM_FIELDS if name in used]
+        lines += [f"    {name} = " + wrap.format(f"_base[{name!r}]")
+                  for name in BUILTIN_COMPONENTS if name in used]
+        for name in self.order:
+            tree = _float_constants(copy.deepcopy(trees[name]))
+            if vectorized:
+                tree = _rename_calls(tree)
+            lines.append(f"    {name} = {ast.unparse(tree)}")
+        values = "".join(name + ", " for name in self.order)
+        cost = " + ".join(n for n in self.order if self.kinds[n] == "cost") or "0.0"
+        revenue = " + ".join(n for n in self.order if self.kinds[n] == "revenue") or "0.0"
+        lines.append(f"    return ({values}), {cost}, {revenue}")
+        namespace = {"__builtins__": {} if vectorized else dict(_SCALAR_FUNCTIONS)}
+        if vectorized:
+            namespace.update({f"_{name}": fn for name, fn in FUNCTIONS.items()})
+        else:
+            namespace["_float"] = float
+        exec(compile("\n".join(lines), f"<formulas {self.key[:8]}>", "exec"), namespace)
+        return namespace["_kernel"]
+
+    def components(self, params, base: Dict[str, object]) -> Dict[str, object]:
+        # Значення власних статей; base - результат calc_total(_batch)
+        kernel = self._scalar if isinstance(params, ModelParams) else self._vector
+        return dict(zip(self.order, _run(kernel, params, base)[0]))
+
+    @staticmethod
+    def _apply(kernel, params, base: Dict[str, object]) -> Dict[str, object]:
+        values, cost, revenue = _run(kernel, params, base)
+        result = dict(base)
+        result["extra_cost"] = base["extra_cost"] + cost
+        result["extra_revenue"] = base["extra_revenue"] + revenue
+        result["extra_net"] = result["extra_cost"] - result["extra_revenue"]
+        result["total"] = base["total"] + (cost - revenue)
+        return result, values
+
+    def extend(self, params, base: Dict[str, object]) -> Dict[str, object]:
+        # Додає власні статті до готового результату calc_total (для
+        # ModelParams) або calc_total_batch (для ModelParamsBatch)
+        if isinstance(params, ModelParams):
+            result, values = self._apply(self._scalar, params, base)
+            result.update(zip(self.order, values))
+            return result
+        result, values = self._apply(self._vector, params, base)
+        shape = np.shape(result["total"])
+        for name, value in zip(self.order, values):
+            # стала формула дає скаляр - розширюємо до довжини пакета
+            result[name] = value if np.ndim(value) else np.full(shape, value, dtype=np.float64)
+        return result
+
+    def calc_total(self, params: ModelParams) -> Dict[str, float]:
+        return self.extend(params, calc_total(params))
+
+    def calc_total_batch(self, batch: ModelParamsBatch) -> Dict[str, np.ndarray]:
+        return self.extend(batch, calc_total_batch(batch))
+
+
+def _run(kernel, params, base):
+    # Скалярне ядро на float піднімає виняток там, де numpy дає inf / nan
+    try:
+        return kernel(params, base)
+    except ZeroDivisionError:
+        raise FormulaError("Ділення на нуль у формулі") from None
+    except OverflowError:
+        raise FormulaError("Переповнення у формулі (завелике значення)") from None
+
+
+def _float_constants(tree: ast.expr) -> ast.expr:
+    # 4 -> 4.0: ціла стала не повинна вмикати цілу арифметику Python
+    class Floats(ast.NodeTransformer):
+        def visit_Constant(self, node: ast.Constant) -> ast.expr:
+            if type(node.value) is int:
+                return ast.copy_location(ast.Constant(float(node.value)), node)
+            return node
+
+    return Floats().visit(tree)
+
+
+def _rename_calls(tree: ast.expr) -> ast.expr:
+    # min(a, b, c) -> _min(_min(a, b), c): ufunc numpy приймає два аргументи
+    class Rename(ast.NodeTransformer):
+        def visit_Call(self, node: ast.Call) -> ast.expr:
+            self.generic_visit(node)
+            func = ast.Name(f"_{node.func.id}", ast.Load())
+            call = ast.Call(func, node.args[:2], [])
+            for arg in node.args[2:]:
+                call = ast.Call(func, [call, arg], [])
+            return call
+
+    return Rename().visit(tree)
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_cached(formulas: Tuple[Formula, ...]) -> FormulaSet:
+    return FormulaSet(formulas)
+
+
+def compile_formulas(formulas: Sequence[Formula]) -> Optional[FormulaSet]:
+    # Скомпільований набір (з кешу) або None, якщо формул немає
+    formulas = tuple(formulas)
+    if not formulas:
+        return None
+    return _compile_cached(formulas)
+
+
+def evaluate(params: ModelParams, formulas: Optional[FormulaSet] = None) -> Dict[str, float]:
+    # calc_total з власними статтями (або без них)
+    if formulas is None:
+        return calc_total(params)
+    return formulas.calc_total(params)
+
+
+def evaluate_batch(
+    batch: ModelParamsBatch, formulas: Optional[FormulaSet] = None
+) -> Dict[str, np.ndarray]:
+    if formulas is None:
+        return calc_total_batch(batch)
+    return formulas.calc_total_batch(batch)
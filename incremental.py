@@ -0,0 +1,207 @@
+# Інкрементальний перерахунок статей витрат за графом залежностей.
+#
+# Похідні сценарії зазвичай відрізняються від базового кількома полями
+# (інший CAC, інші фіксовані витрати на персонал). IncrementalEvaluator
+# пам'ятає статті базового сценарію і за COMPONENT_FIELDS перераховує лише
+# ті, що залежать від змінених полів:
+#
+#   ev = IncrementalEvaluator(base)
+#   ev.evaluate({"cac": 60})              # лише marketing
+#   ev.evaluate_batch(batch, ["Q"])       # logistics, payments, staff (+ extra)
+#
+# У пакетах (перебір сітки, Монте-Карло) незмінні статті рахуються один
+# раз для базового сценарію й розширюються до довжини пакета без
+# копіювання (np.broadcast_to). Лічильники recomputed / reused (по одному
+# на статтю за виклик) показують, скільки статей перераховано, а скільки
+# взято з базового сценарію.
+import dataclasses
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional, Set
+
+import numpy as np
+
+from formulas import BUILTIN_COMPONENTS, FormulaSet
+from model_transaction_costs import (
+    BASIS_CODES,
+    BASIS_FIELDS,
+    COMPONENT_FIELDS,
+    EXTRA_BASES,
+    PARAM_FIELDS,
+    ModelParams,
+    ModelParamsBatch,
+    calc_extra,
+    calc_logistics,
+    calc_marketing,
+    calc_payments,
+    calc_staff,
+    extra_coefficients,
+)
+
+COMPONENTS = tuple(COMPONENT_FIELDS)
+
+# Псевдостаття для власних статей (formulas.py): ядро рахує їх разом
+FORMULAS = "formulas"
+
+_FUNCTIONS = {
+    "logistics": calc_logistics,
+    "payments": calc_payments,
+    "marketing": calc_marketing,
+    "staff": calc_staff,
+}
+
+# Статті результату, з яких беруться вбудовані змінні формул
+_RESULT_COMPONENT = {
+    "logistics": "logistics",
+    "payments": "payments",
+    "marketing": "marketing",
+    "staff": "staff",
+    "extra_cost": "extra",
+    "extra_revenue": "extra",
+}
+
+
+def extra_fields(items) -> FrozenSet[str]:
+    # Поля, від яких залежать суми статей: лише драйвери баз, що
+    # справді використовуються (фіксовані суми не залежать ні від чого)
+    fields = {"extra_items"}
+    if len(items):
+        table = extra_coefficients(items)
+        for basis in EXTRA_BASES:
+            if table[BASIS_CODES[basis]].any():
+                fields.update(BASIS_FIELDS[basis])
+    return frozenset(fields)
+
+
+class IncrementalEvaluator:
+    def __init__(self, base: ModelParams, formulas: Optional[FormulaSet] = None):
+        self.base = base
+        self.formulas = formulas
+        self.recomputed: Counter = Counter()
+        self.reused: Counter = Counter()
+
+        self.dependencies: Dict[str, FrozenSet[str]] = {
+            name: frozenset(COMPONENT_FIELDS[name]) for name in COMPONENTS
+        }
+        self.dependencies["extra"] = extra_fields(base.extra_items)
+        if formulas is not None:
+            fields: Set[str] = set()
+            for name in formulas.inputs:
+                if name in BUILTIN_COMPONENTS:
+                    fields |= self.dependencies[_RESULT_COMPONENT[name]]
+                else:
+                    fields.add(name)
+            self.dependencies[FORMULAS] = frozenset(fields)
+
+        self._values = {name: self._compute(name, base) for name in COMPONENTS}
+        self.result = self._assemble(base, self._values, None)
+        # внесок власних статей базового сценарію: (значення, +cost, +revenue)
+        self._formula_values: Dict[str, float] = {}
+        self._formula_cost = self._formula_revenue = 0.0
+        if formulas is not None:
+            self._formula_values = {name: self.result[name] for name in formulas.order}
+            for name, value in self._formula_values.items():
+                if formulas.kinds[name] == "cost":
+                    self._formula_cost += value
+                else:
+                    self._formula_revenue += value
+
+    def affected(self, changed: Iterable[str]) -> Set[str]:
+        # Статті (і FORMULAS), які залежать хоча б від одного зміненого поля
+        changed = set(changed)
+        unknown = changed - set(PARAM_FIELDS) - {"extra_items", "extra_cost", "extra_revenue"}
+        if unknown:
+            raise ValueError(f"Невідомі поля ModelParams: {', '.join(sorted(unknown))}")
+        if changed & {"extra_cost", "extra_revenue"}:
+            # зведені суми пакета замість статей
+            changed.add("extra_items")
+        return {name for name, fields in self.dependencies.items() if fields & changed}
+
+    @staticmethod
+    def _compute(name: str, params):
+        if name != "extra":
+            return _FUNCTIONS[name](params)
+        if isinstance(params, ModelParamsBatch):
+            return params.extra_cost, params.extra_revenue
+        extra = calc_extra(params)
+        return extra["extra_cost"], extra["extra_revenue"]
+
+    def _assemble(self, params, values, affected: Optional[Set[str]]) -> Dict[str, object]:
+        extra_cost, extra_revenue = values["extra"]
+        extra_net = extra_cost - extra_revenue
+        result = {
+            "logistics": values["logistics"],
+            "payments": values["payments"],
+            "marketing": values["marketing"],
+            "staff": values["staff"],
+            "extra_cost": extra_cost,
+            "extra_revenue": extra_revenue,
+            "extra_net": extra_net,
+            "total": (values["logistics"] + values["payments"] + values["marketing"]
+                      + values["staff"] + extra_net),
+        }
+        if self.formulas is None:
+            return result
+        if affected is None or FORMULAS in affected:
+            return self.formulas.extend(params, result)
+        result["extra_cost"] = extra_cost + self._formula_cost
+        result["extra_revenue"] = extra_revenue + self._formula_revenue
+        result["extra_net"] = result["extra_cost"] - result["extra_revenue"]
+        result["total"] = result["total"] + (self._formula_cost - self._formula_revenue)
+        result.update(self._formula_values)
+        return result
+
+    def _count(self, affected: Set[str]) -> None:
+        names = COMPONENTS + ((FORMULAS,) if self.formulas is not None else ())
+        for name in names:
+            if name in affected:
+                self.recomputed[name] += 1
+            else:
+                self.reused[name] += 1
+
+    def evaluate(self, changes: Mapping[str, object]) -> Dict[str, float]:
+        # Результат calc_total для базового сценарію зі зміненими полями
+        affected = self.affected(changes)
+        self._count(affected)
+        if not affected:
+            return dict(self.result)
+        params = dataclasses.replace(self.base, **changes)
+        values = {
+            name: self._compute(name, params) if name in affected else self._values[name]
+            for name in COMPONENTS
+        }
+        return self._assemble(params, values, affected)
+
+    def evaluate_params(self, params: ModelParams) -> Dict[str, float]:
+        # Те саме для готового сценарію: змінені поля визначаються порівнянням
+        changes = {
+            name: getattr(params, name) for name in PARAM_FIELDS
+            if getattr(params, name) != getattr(self.base, name)
+        }
+        if list(params.extra_items) != list(self.base.extra_items):
+            changes["extra_items"] = params.extra_items
+        return self.evaluate(changes)
+
+    def evaluate_batch(
+        self, batch: ModelParamsBatch, changed: Iterable[str]
+    ) -> Dict[str, np.ndarray]:
+        # Результат calc_total_batch для пакета, у якому від базового
+        # сценарію відрізняються лише поля changed (решта колонок пакета
+        # не читається). Додаткові показники змінених сценаріїв беруться з
+        # batch.extra_cost / extra_revenue (apply_extra_items).
+        affected = self.affected(changed)
+        self._count(affected)
+        values = {
+            name: self._compute(name, batch) if name in affected else self._values[name]
+            for name in COMPONENTS
+        }
+        result = self._assemble(batch, values, affected)
+        n = len(batch)
+        for name, value in result.items():
+            if np.ndim(value) == 0:
+                result[name] = np.broadcast_to(np.float64(value), (n,))
+        return result
+
+    def reset_counts(self) -> None:
+        self.recomputed.clear()
+        self.reused.clear()
+
@@ -0,0 +1,240 @@
+# Фонові завдання для app.py.
+#
+# Важкі обчислення (наприклад, Монте-Карло на мільйон вибірок) не можна
+# виконувати в потоці скрипта Streamlit: сторінка блокується, а
+# перезапуск скрипта обриває розрахунок. JobRunner виконує завдання в
+# пулі робочих потоків (numpy звільняє GIL у векторних операціях), а
+# реєстр завдань живе в самому JobRunner, а не в st.session_state, тож
+# після перезавантаження сторінки завдання можна знайти за власником.
+#
+# Кожен власник (сесія користувача) має власну чергу; вільний потік бере
+# завдання з черг по колу, тому користувач із десятком завдань не
+# затримує інших більше ніж на одне завдання. Кількість потоків -
+# max_workers або змінна BAGSHOP_JOB_WORKERS.
+#
+# Функція завдання отримує JobContext першим аргументом і періодично
+# викликає ctx.progress(частка, повідомлення, проміжний результат);
+# якщо завдання скасовано, progress піднімає JobCancelled.
+#
+#   runner = JobRunner(max_workers=2)
+#   job = runner.submit("user-1", "Монте-Карло", fn, params)
+#   runner.get(job.id).progress, runner.cancel(job.id)
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+DEFAULT_WORKERS = 2
+# Скільки завершених завдань кожного власника зберігається в реєстрі
+DEFAULT_HISTORY = 10
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass(eq=False)
+class Job:
+    id: str
+    owner: str
+    name: str
+    fn: Callable = field(repr=False)
+    args: tuple = field(default=(), repr=False)
+    kwargs: Dict[str, Any] = field(default_factory=dict, repr=False)
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = ""
+    partial: Any = field(default=None, repr=False)
+    result: Any = field(default=None, repr=False)
+    error: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    cancel_requested: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobContext:
+    # Те, що бачить функція завдання: звіт про хід і перевірка скасування
+    def __init__(self, job: Job):
+        self._job = job
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job.cancel_requested.is_set()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise JobCancelled(self._job.id)
+
+    def progress(self, fraction: float, message: str = "", partial: Any = None) -> None:
+        self.check()
+        job = self._job
+        job.progress = min(max(float(fraction), 0.0), 1.0)
+        if message:
+            job.message = message
+        if partial is not None:
+            job.partial = partial
+
+
+def default_workers() -> int:
+    value = os.environ.get("BAGSHOP_JOB_WORKERS")
+    if not value:
+        return DEFAULT_WORKERS
+    workers = int(value)
+    if workers <= 0:
+        raise ValueError("BAGSHOP_JOB_WORKERS має бути додатним")
+    return workers
+
+
+class JobRunner:
+    def __init__(self, max_workers: Optional[int] = None, history: int = DEFAULT_HISTORY):
+        self.max_workers = max_workers or default_workers()
+        if self.max_workers <= 0:
+            raise ValueError("max_workers має бути додатним")
+        self.history = history
+        self._cond = threading.Condition()
+        self._jobs: Dict[str, Job] = OrderedDict()
+        # черги власників і порядок обходу власників, у яких є черга
+        self._queues: Dict[str, Deque[Job]] = {}
+        self._turns: Deque[str] = deque()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"bagshop-job-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, owner: str, name: str, fn: Callable, *args, **kwargs) -> Job:
+        # fn(ctx, *args, **kwargs); результат fn стає job.result
+        job = Job(str(next(_ids)), owner, name, fn, args, kwargs)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("JobRunner зупинено")
+            self._jobs[job.id] = job
+            queue = self._queues.get(owner)
+            if queue is None:
+                queue = self._queues[owner] = deque()
+                self._turns.append(owner)
+            queue.append(job)
+            self._cond.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, owner: str) -> List[Job]:
+        # Завдання власника, новіші першими
+        with self._cond:
+            return [job for job in reversed(self._jobs.values()) if job.owner == owner]
+
+    def cancel(self, job_id: str) -> bool:
+        # Завдання в черзі знімається одразу; виконуване зупиниться на
+        # найближчому ctx.progress / ctx.check
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.cancel_requested.set()
+            if job.status == QUEUED:
+                queue = self._queues[job.owner]
+                queue.remove(job)
+                if not queue:
+                    del self._queues[job.owner]
+                    self._turns.remove(job.owner)
+                self._finish(job, CANCELLED)
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, cancel: bool = True, wait: bool = True) -> None:
+        with self._cond:
+            self._closed = True
+            if cancel:
+                for job in list(self._jobs.values()):
+                    if job.active:
+                        job.cancel_requested.set()
+                        if job.status == QUEUED:
+                            self._finish(job, CANCELLED)
+                self._queues.clear()
+                self._turns.clear()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _next(self) -> Optional[Job]:
+        # Наступне завдання по колу власників (викликається під self._cond)
+        while not self._turns:
+            if self._closed:
+                return None
+            self._cond.wait()
+        owner = self._turns.popleft()
+        queue = self._queues[owner]
+        job = queue.popleft()
+        if queue:
+            self._turns.append(owner)
+        else:
+            del self._queues[owner]
+        job.status = RUNNING
+        job.started = time.time()
+        return job
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next()
+            if job is None:
+                return
+            try:
+                result = job.fn(JobContext(job), *job.args, **job.kwargs)
+            except JobCancelled:
+                status = CANCELLED
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                status = FAILED
+            else:
+                job.result = result
+                job.progress = 1.0
+                status = DONE
+            with self._cond:
+                self._finish(job, status)
+
+    def _finish(self, job: Job, status: str) -> None:
+        # Викликається під self._cond; старі завершені завдання власника
+        # видаляються з реєстру
+        job.status = status
+        job.finished = time.time()
+        job.fn = job.args = job.kwargs = None
+        finished = [
+            j for j in self._jobs.values() if j.owner == job.owner and not j.active
+        ]
+        for old in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[old.id]
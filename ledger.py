@@ -0,0 +1,194 @@
+# Фактичні трансакційні витрати за журналом замовлень (CSV / Parquet).
+#
+# Журнал читається блоками, тож пам'ять обмежена розміром блоку. Для
+# кожного блоку рахуються лише лічильники й суми (кількість локальних /
+# міжобласних доставок і повернень, сума онлайн-оплат тощо); вони
+# додаються між блоками, а вартість застосовується до підсумків за тими ж
+# правилами, що й у calc_logistics / calc_payments / calc_staff.
+# Блоки можна обробляти паралельно в пулі процесів.
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from model_transaction_costs import (
+    KIND_CODES,
+    ModelParams,
+    calc_marketing,
+    calc_total,
+    extra_coefficients,
+)
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+_TRUE_VALUES = ("1", "true", "yes", "y", "так", "t")
+
+
+@dataclass
+class LedgerSchema:
+    # Назви колонок журналу і значення, що позначають локальну доставку
+    # та онлайн-оплату
+    zone: str = "zone"
+    payment: str = "payment"
+    amount: str = "amount"
+    returned: str = "returned"
+    local_zone: str = "loc"
+    online_payment: str = "online"
+
+
+@dataclass
+class LedgerTotals:
+    n_orders: int = 0
+    n_loc: int = 0
+    n_int: int = 0
+    n_ret_loc: int = 0
+    n_ret_int: int = 0
+    n_online: int = 0
+    amount_total: float = 0.0
+    amount_online: float = 0.0
+
+    def merge(self, other: "LedgerTotals") -> "LedgerTotals":
+        return LedgerTotals(
+            *(getattr(self, f.name) + getattr(other, f.name) for f in fields(self))
+        )
+
+
+def parse_flags(values: pd.Series) -> np.ndarray:
+    if values.dtype == bool:
+        return values.to_numpy()
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return values.fillna(0).to_numpy() != 0
+    return values.astype(str).str.strip().str.lower().isin(_TRUE_VALUES).to_numpy()
+
+
+def summarize_chunk(chunk: pd.DataFrame, schema: LedgerSchema) -> LedgerTotals:
+    local = (chunk[schema.zone].astype(str).to_numpy() == schema.local_zone)
+    online = (chunk[schema.payment].astype(str).to_numpy() == schema.online_payment)
+    returned = parse_flags(chunk[schema.returned])
+    amount = chunk[schema.amount].to_numpy(dtype=np.float64)
+    n = len(chunk)
+    n_loc = int(np.count_nonzero(local))
+    n_ret_loc = int(np.count_nonzero(returned & local))
+    return LedgerTotals(
+        n_orders=n,
+        n_loc=n_loc,
+        n_int=n - n_loc,
+        n_ret_loc=n_ret_loc,
+        n_ret_int=int(np.count_nonzero(returned)) - n_ret_loc,
+        n_online=int(np.count_nonzero(online)),
+        amount_total=float(amount.sum()),
+        amount_online=float(amount[online].sum()),
+    )
+
+
+def read_chunks(
+    path: str,
+    schema: LedgerSchema,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    # CSV читається pandas блоками; Parquet - пакетами через pyarrow
+    columns = [schema.zone, schema.payment, schema.amount, schema.returned]
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Для читання Parquet потрібен пакет pyarrow") from e
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            path,
+            usecols=columns,
+            chunksize=chunk_size,
+            dtype={schema.zone: str, schema.payment: str},
+        )
+
+
+def _summarize(args) -> LedgerTotals:
+    return summarize_chunk(*args)
+
+
+def scan_ledger(
+    path: str,
+    schema: Optional[LedgerSchema] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+) -> LedgerTotals:
+    # Один прохід по журналу. При workers > 1 блоки обробляються в пулі
+    # процесів; у польоті не більше 2 * workers блоків.
+    schema = schema or LedgerSchema()
+    totals = LedgerTotals()
+    chunks = read_chunks(path, schema, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            totals = totals.merge(summarize_chunk(chunk, schema))
+        return totals
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(_summarize, (chunk, schema)))
+            if len(pending) >= 2 * workers:
+                totals = totals.merge(pending.pop(0).result())
+        for future in pending:
+            totals = totals.merge(future.result())
+    return totals
+
+
+def ledger_costs(totals: LedgerTotals, params: ModelParams) -> Dict[str, float]:
+    # Ті самі статті, що й у calc_total, але за фактичними замовленнями.
+    # Маркетинг і фіксовані витрати на персонал у журналі не відображаються -
+    # вони беруться з params. Додаткові показники на замовлення, повернення
+    # чи % виручки рахуються за фактичними кількостями й сумами.
+    logistics = (
+        totals.n_loc * params.c_loc
+        + totals.n_int * params.c_int
+        + totals.n_ret_loc * params.c_ret_loc
+        + totals.n_ret_int * params.c_ret_int
+    )
+    payments = totals.amount_online * params.pay_commission
+    marketing = calc_marketing(params)
+    staff = params.staff_fixed + params.staff_per_order * totals.n_orders
+    drivers = np.array([
+        1.0,
+        totals.n_orders,
+        totals.n_ret_loc + totals.n_ret_int,
+        totals.amount_total / 100.0,
+    ])
+    extra = drivers @ extra_coefficients(params.extra_items)
+    extra_cost = float(extra[KIND_CODES["cost"]])
+    extra_revenue = float(extra[KIND_CODES["revenue"]])
+    extra_net = extra_cost - extra_revenue
+
+    total = logistics + payments + marketing + staff + extra_net
+
+    return {
+        "logistics": logistics,
+        "payments": payments,
+        "marketing": marketing,
+        "staff": staff,
+        "extra_cost": extra_cost,
+        "extra_revenue": extra_revenue,
+        "extra_net": extra_net,
+        "total": total,
+    }
+
+
+def compare_with_model(
+    path: str,
+    params: ModelParams,
+    schema: Optional[LedgerSchema] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+) -> pd.DataFrame:
+    # Фактичні й модельні витрати поруч (модель - calc_total(params))
+    actual = ledger_costs(scan_ledger(path, schema, chunk_size, workers), params)
+    modeled = calc_total(params)
+    frame = pd.DataFrame({"actual": actual, "modeled": modeled})
+    frame["diff"] = frame["actual"] - frame["modeled"]
+    return frame
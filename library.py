@@ -0,0 +1,586 @@
+# Постійна бібліотека сценаріїв на диску (спільна для аналітиків).
+#
+#   <path>/library.sqlite       - метадані: ключ, назва, теги, час, total,
+#                                 розташування значень, статті (JSON)
+#   <path>/segments/NNNNNN.npy  - матриця float64 (LIBRARY_COLUMNS × сценарії)
+#
+# Ключ сценарію - params_key (хеш полів ModelParams і додаткових
+# показників), тому однаковий сценарій рахується і зберігається один раз.
+# Для результату з власними статтями (formulas.py) до ключа додаються їх
+# значення (scenario_key), а самі значення зберігаються разом зі
+# сценарієм - той самий сценарій з формулами і без них не зливаються.
+# Масовий імпорт пише окремий сегмент; окремі збереження (save) лежать у
+# SQLite як BLOB рядка значень, доки compact() не збере їх у сегмент.
+# Сегменти відкриваються через np.load(mmap_mode="r") і зберігаються по
+# колонках, тож завантаження мільйона сценаріїв у ScenarioStore - це
+# копіювання колонок без розбору рядків у Python.
+#
+#   python library.py import scenarios.csv --library scenario_library --tags Q4
+#   python library.py export results.parquet --library scenario_library
+#   python library.py search --text київ --limit 20
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_transaction_costs import (
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ExtraItem,
+    ModelParams,
+    ModelParamsBatch,
+    batch_keys,
+    calc_total,
+    calc_total_batch,
+    params_from_dict,
+    params_key,
+    params_to_dict,
+)
+from scenario_store import ScenarioStore
+
+DEFAULT_PATH = "scenario_library"
+
+# Колонки сегмента: поля, зведені суми статей (вхід пакета) і результати
+LIBRARY_COLUMNS = PARAM_FIELDS + ("items_cost", "items_revenue") + RESULT_FIELDS
+_COLUMN = {name: i for i, name in enumerate(LIBRARY_COLUMNS)}
+
+# Ліміт параметрів одного запиту SQLite (ключі в WHERE key IN (...))
+_MAX_PARAMS = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    key         TEXT PRIMARY KEY,
+    name        TEXT NOT NULL DEFAULT '',
+    tags        TEXT NOT NULL DEFAULT '',
+    created     TEXT NOT NULL,
+    total       REAL NOT NULL,
+    segment     INTEGER,          -- NULL: значення в row_values
+    row         INTEGER,
+    row_values  BLOB,
+    extra_items TEXT,             -- JSON статей; NULL - лише зведені суми
+    components  TEXT              -- JSON значень власних статей (formulas.py)
+);
+-- рядки, які load() читає окремо від сегментів
+CREATE INDEX IF NOT EXISTS scenarios_loose ON scenarios (segment) WHERE segment IS NULL;
+CREATE INDEX IF NOT EXISTS scenarios_items ON scenarios (segment, row)
+    WHERE extra_items IS NOT NULL;
+CREATE TABLE IF NOT EXISTS segments (
+    id   INTEGER PRIMARY KEY,
+    rows INTEGER NOT NULL
+);
+"""
+
+
+@dataclass
+class LibraryBatch:
+    # Сценарії з бібліотеки у вигляді, готовому для ScenarioStore.extend
+    keys: Optional[List[str]]
+    batch: ModelParamsBatch
+    result: Dict[str, np.ndarray]
+    extra_items: List[Optional[list]]
+    components: List[Optional[Dict[str, float]]]
+
+    def __len__(self) -> int:
+        return len(self.batch)
+
+
+def result_components(result: Dict[str, float]) -> Dict[str, float]:
+    # Значення власних статей - ключі результату поза RESULT_FIELDS
+    return {name: float(value) for name, value in result.items() if name not in RESULT_FIELDS}
+
+
+def scenario_key(params: ModelParams, result: Optional[Dict[str, float]] = None) -> str:
+    # params_key; якщо результат має власні статті - разом з їх значеннями
+    key = params_key(params)
+    components = result_components(result or {})
+    if not components:
+        return key
+    text = json.dumps(sorted(components.items()), ensure_ascii=False)
+    return hashlib.blake2b((key + text).encode(), digest_size=16).hexdigest()
+
+
+def _tags(tags: Iterable[str]) -> str:
+    # Теги зберігаються як ",a,b," - пошук тегу: LIKE '%,a,%'
+    clean = sorted({t.strip() for t in tags if t and t.strip()})
+    return "," + ",".join(clean) + "," if clean else ""
+
+
+def _matrix(batch: ModelParamsBatch, result: Dict[str, np.ndarray]) -> np.ndarray:
+    n = len(batch)
+    columns = [getattr(batch, name) for name in PARAM_FIELDS]
+    columns += [batch.extra_cost, batch.extra_revenue]
+    columns += [np.broadcast_to(result[name], (n,)) for name in RESULT_FIELDS]
+    return np.stack(columns)
+
+
+def _unpack(matrix: np.ndarray) -> Tuple[ModelParamsBatch, Dict[str, np.ndarray]]:
+    # matrix - (LIBRARY_COLUMNS × сценарії); колонки сегмента - суцільні
+    # рядки, тож from_columns не копіює mmap-масив
+    n = matrix.shape[1]
+    columns = {name: matrix[_COLUMN[name]] for name in PARAM_FIELDS}
+    columns["extra_cost"] = matrix[_COLUMN["items_cost"]]
+    columns["extra_revenue"] = matrix[_COLUMN["items_revenue"]]
+    batch = ModelParamsBatch.from_columns(columns, size=n)
+    result = {name: matrix[_COLUMN[name]] for name in RESULT_FIELDS}
+    return batch, result
+
+
+class ScenarioLibrary:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._segments_dir = os.path.join(path, "segments")
+        os.makedirs(self._segments_dir, exist_ok=True)
+        # одне з'єднання на бібліотеку; Streamlit викликає з різних потоків
+        self._db = sqlite3.connect(
+            os.path.join(path, "library.sqlite"), check_same_thread=False
+        )
+        # WAL: читачі не блокуються записом; великий кеш - для масових вставок
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute("PRAGMA cache_size = -262144")
+        self._db.executescript(_SCHEMA)
+        # бібліотеки, створені до появи колонки components
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(scenarios)")}
+        if "components" not in columns:
+            with self._db:
+                self._db.execute("ALTER TABLE scenarios ADD COLUMN components TEXT")
+        self._lock = threading.RLock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scenarios").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM scenarios WHERE key = ?", (key,))
+            return row.fetchone() is not None
+
+    # --- запис ---
+
+    def save(
+        self,
+        params: ModelParams,
+        result: Optional[Dict[str, float]] = None,
+        name: str = "",
+        tags: Sequence[str] = (),
+    ) -> str:
+        # Зберігає сценарій і повертає його ключ. Якщо такий сценарій уже
+        # є, оновлюються лише назва і теги (коли їх передано). Власні
+        # статті результату (formulas.py) входять у ключ і зберігаються.
+        if result is None:
+            result = calc_total(params)
+        key = scenario_key(params, result)
+        with self._lock, self._db:
+            if key in self:
+                if name or tags:
+                    self._db.execute(
+                        "UPDATE scenarios SET name = ?, tags = ? WHERE key = ?",
+                        (name, _tags(tags), key),
+                    )
+                return key
+            values = [float(getattr(params, f)) for f in PARAM_FIELDS]
+            summary = params_to_dict(params)["extra_items"]
+            batch = ModelParamsBatch.from_params([params])
+            values += [float(batch.extra_cost[0]), float(batch.extra_revenue[0])]
+            values += [float(result[f]) for f in RESULT_FIELDS]
+            components = result_components(result)
+            self._db.execute(
+                "INSERT INTO scenarios (key, name, tags, created, total, row_values,"
+                " extra_items, components) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, name, _tags(tags), _now(), float(result["total"]),
+                 np.asarray(values, dtype=np.float64).tobytes(),
+                 json.dumps(summary, ensure_ascii=False) if summary else None,
+                 json.dumps(components, ensure_ascii=False) if components else None),
+            )
+        return key
+
+    def import_batch(
+        self,
+        batch: ModelParamsBatch,
+        result: Optional[Dict[str, np.ndarray]] = None,
+        tags: Sequence[str] = (),
+        names: Optional[Sequence[str]] = None,
+        extra_items: Optional[Sequence[Optional[str]]] = None,
+    ) -> int:
+        # Масовий імпорт одним сегментом; повертає кількість нових
+        # сценаріїв (наявні в бібліотеці й повтори в пакеті пропускаються).
+        # extra_items - JSON статей кожного рядка (або None)
+        keys = batch_keys(batch)
+        if extra_items is not None:
+            # рядки з повним списком статей - ключ як у save()
+            parsed: Dict[str, list] = {}
+            for i, text in enumerate(extra_items):
+                if text is not None:
+                    params = batch.to_params(i)
+                    params.extra_items = _parsed_items(text, parsed)
+                    keys[i] = params_key(params)
+        with self._lock:
+            # перший рядок кожного ключа; наявні в бібліотеці шукаються лише
+            # серед ключів пакета (за первинним ключем), а не читаються всі
+            fresh: Dict[str, int] = {}
+            for i, key in enumerate(keys):
+                fresh.setdefault(key, i)
+            for key in self._existing(list(fresh)):
+                del fresh[key]
+            if not fresh:
+                return 0
+            rows = np.fromiter(fresh.values(), np.int64, len(fresh))
+            if result is None:
+                result = calc_total_batch(batch)
+            matrix = _matrix(batch, result)[:, rows]
+
+            with self._db:
+                segment = self._db.execute(
+                    "INSERT INTO segments (rows) VALUES (?)", (len(rows),)
+                ).lastrowid
+                _save_segment(self._segment_path(segment), matrix)
+                created = _now()
+                tag_text = _tags(tags)
+                totals = matrix[_COLUMN["total"]].tolist()
+                records = [
+                    (key, names[i] if names is not None else "", tag_text, created,
+                     totals[j], segment, j,
+                     extra_items[i] if extra_items is not None else None)
+                    for j, (key, i) in enumerate(fresh.items())
+                ]
+                # вставка за зростанням ключа - послідовний запис у B-дерево
+                records.sort()
+                self._db.executemany(
+                    "INSERT INTO scenarios (key, name, tags, created, total, segment, row, extra_items)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    records,
+                )
+        return len(rows)
+
+    def import_file(self, path: str, chunk_size: int = 100_000, tags: Sequence[str] = ()) -> int:
+        # CSV / JSONL у форматі batch_runner.py (колонка extra_items - JSON)
+        from batch_runner import parse_chunk, read_raw_chunks
+
+        added = 0
+        for header, data, _, _ in read_raw_chunks(path, chunk_size):
+            batch, frame = parse_chunk(header, data)
+            items = None
+            if "extra_items" in frame:
+                items = [_items_json(v) for v in frame["extra_items"].tolist()]
+            names = frame["name"].fillna("").astype(str).tolist() if "name" in frame else None
+            added += self.import_batch(batch, tags=tags, names=names, extra_items=items)
+        return added
+
+    def compact(self) -> int:
+        # Переносить окремо збережені сценарії в новий сегмент
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, row_values FROM scenarios WHERE segment IS NULL ORDER BY rowid"
+            ).fetchall()
+            if not rows:
+                return 0
+            matrix = np.stack([np.frombuffer(blob, dtype=np.float64) for _, blob in rows], axis=1)
+            with self._db:
+                segment = self._db.execute(
+                    "INSERT INTO segments (rows) VALUES (?)", (len(rows),)
+                ).lastrowid
+                _save_segment(self._segment_path(segment), matrix)
+                self._db.executemany(
+                    "UPDATE scenarios SET segment = ?, row = ?, row_values = NULL WHERE key = ?",
+                    ((segment, j, key) for j, (key, _) in enumerate(rows)),
+                )
+        return len(rows)
+
+    # --- читання ---
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self._segments_dir, f"{segment:06d}.npy")
+
+    def _segment(self, segment: int) -> np.ndarray:
+        return np.load(self._segment_path(segment), mmap_mode="r")
+
+    def get(self, key: str) -> Tuple[ModelParams, Dict[str, float]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT segment, row, row_values, extra_items, components FROM scenarios"
+                " WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        segment, index, blob, items, components = row
+        if segment is None:
+            values = np.frombuffer(blob, dtype=np.float64)
+        else:
+            values = np.array(self._segment(segment)[:, index])
+        batch, result = _unpack(values[:, None])
+        params = batch.to_params(0)
+        if items is not None:
+            data = params_to_dict(params)
+            data["extra_items"] = json.loads(items)
+            params = params_from_dict(data)
+        result = {name: float(values[0]) for name, values in result.items()}
+        if components is not None:
+            result.update(json.loads(components))
+        return params, result
+
+    def load(self, keys: Optional[Sequence[str]] = None) -> LibraryBatch:
+        # Усі сценарії (keys=None: сегменти за порядком, потім окремі
+        # збереження) або лише вказані ключі в їх порядку
+        with self._lock:
+            if keys is None:
+                return self._load_all()
+            return self._load_keys(list(keys))
+
+    def _load_all(self) -> LibraryBatch:
+        segments = [s for (s,) in self._db.execute("SELECT id FROM segments ORDER BY id")]
+        parts = [self._segment(s) for s in segments]
+        loose = self._db.execute(
+            "SELECT row_values, extra_items, components FROM scenarios"
+            " WHERE segment IS NULL ORDER BY rowid"
+        ).fetchall()
+        if loose:
+            parts.append(np.stack([np.frombuffer(b, dtype=np.float64) for b, _, _ in loose], axis=1))
+        if not parts:
+            matrix = np.empty((len(LIBRARY_COLUMNS), 0))
+        elif len(parts) == 1:
+            matrix = parts[0]
+        else:
+            matrix = np.concatenate(parts, axis=1)
+        offsets = dict(zip(segments, np.cumsum([0] + [p.shape[1] for p in parts])))
+        loose_start = sum(p.shape[1] for p in parts) - len(loose)
+
+        items: List[Optional[list]] = [None] * matrix.shape[1]
+        components: List[Optional[Dict[str, float]]] = [None] * matrix.shape[1]
+        # один запит для всіх рядків сегментів зі статтями; однаковий JSON
+        # (спільний каталог імпорту) розбирається один раз, і рядки
+        # отримують той самий список
+        parsed: Dict[str, list] = {}
+        for segment, row, text, values in self._db.execute(
+            "SELECT segment, row, extra_items, components FROM scenarios"
+            " WHERE segment IS NOT NULL"
+            " AND (extra_items IS NOT NULL OR components IS NOT NULL)"
+        ):
+            j = offsets[segment] + row
+            if text is not None:
+                items[j] = _parsed_items(text, parsed)
+            if values is not None:
+                components[j] = json.loads(values)
+        for j, (_, text, values) in enumerate(loose):
+            if text is not None:
+                items[loose_start + j] = _parsed_items(text, parsed)
+            components[loose_start + j] = _components(values)
+        batch, result = _unpack(matrix)
+        return LibraryBatch(None, batch, result, items, components)
+
+    def _existing(self, keys: List[str]) -> List[str]:
+        # Ключі з keys, які вже є в бібліотеці
+        found: List[str] = []
+        for start in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[start:start + _MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            found += [key for (key,) in self._db.execute(
+                f"SELECT key FROM scenarios WHERE key IN ({marks})", chunk
+            )]
+        return found
+
+    def _load_keys(self, keys: List[str]) -> LibraryBatch:
+        found = {}
+        for start in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[start:start + _MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            for row in self._db.execute(
+                f"SELECT key, segment, row, row_values, extra_items, components FROM scenarios"
+                f" WHERE key IN ({marks})",
+                chunk,
+            ):
+                found[row[0]] = row[1:]
+        missing = [k for k in keys if k not in found]
+        if missing:
+            raise KeyError(f"Немає в бібліотеці: {', '.join(missing[:5])}")
+        matrix = np.empty((len(LIBRARY_COLUMNS), len(keys)))
+        items: List[Optional[list]] = []
+        components: List[Optional[Dict[str, float]]] = []
+        parsed: Dict[str, list] = {}
+        by_segment: Dict[int, Tuple[List[int], List[int]]] = {}
+        for j, key in enumerate(keys):
+            segment, row, blob, text, values = found[key]
+            if segment is None:
+                matrix[:, j] = np.frombuffer(blob, dtype=np.float64)
+            else:
+                positions, rows = by_segment.setdefault(segment, ([], []))
+                positions.append(j)
+                rows.append(row)
+            items.append(_parsed_items(text, parsed) if text is not None else None)
+            components.append(_components(values))
+        for segment, (positions, rows) in by_segment.items():
+            matrix[:, positions] = self._segment(segment)[:, rows]
+        batch, result = _unpack(matrix)
+        return LibraryBatch(keys, batch, result, items, components)
+
+    def to_store(
+        self, keys: Optional[Sequence[str]] = None, store: Optional[ScenarioStore] = None
+    ) -> ScenarioStore:
+        # Додає сценарії бібліотеки до сховища (нове, якщо store не задано)
+        loaded = self.load(keys)
+        store = store if store is not None else ScenarioStore(max(64, len(loaded)))
+        if len(loaded):
+            store.extend(loaded.batch, loaded.result, loaded.extra_items, loaded.components)
+        return store
+
+    def keys(self) -> List[str]:
+        # Ключі в порядку load() без аргументів
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, segment, row FROM scenarios ORDER BY rowid"
+            ).fetchall()
+        # окремі збереження - в кінці, у порядку додавання (сортування стабільне)
+        rows.sort(key=lambda r: (r[1] is None, r[1] or 0, r[2] or 0))
+        return [key for key, _, _ in rows]
+
+    def search(
+        self,
+        text: str = "",
+        tags: Sequence[str] = (),
+        total_min: Optional[float] = None,
+        total_max: Optional[float] = None,
+        limit: Optional[int] = 100,
+    ) -> pd.DataFrame:
+        # Пошук за підрядком назви чи тегів, тегами та діапазоном total;
+        # найновіші - першими
+        # % і _ у введеному тексті - звичайні символи, а не шаблони LIKE
+        where, args = [], []
+        if text:
+            where.append("(name LIKE ? ESCAPE '\\' OR tags LIKE ? ESCAPE '\\')")
+            args += [f"%{_like(text)}%", f"%{_like(text)}%"]
+        for tag in tags:
+            where.append("tags LIKE ? ESCAPE '\\'")
+            args.append(f"%,{_like(tag.strip())},%")
+        if total_min is not None:
+            where.append("total >= ?")
+            args.append(total_min)
+        if total_max is not None:
+            where.append("total <= ?")
+            args.append(total_max)
+        sql = "SELECT key, name, tags, created, total FROM scenarios"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY rowid DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        frame = pd.DataFrame(rows, columns=["key", "name", "tags", "created", "total"])
+        frame["tags"] = frame["tags"].str.strip(",")
+        return frame
+
+    def export(self, path: str, keys: Optional[Sequence[str]] = None) -> int:
+        # CSV / JSONL (формат batch_runner.py) або Parquet з результатами
+        loaded = self.load(keys)
+        frame = pd.DataFrame({"key": self.keys() if keys is None else list(keys)})
+        for name in PARAM_FIELDS:
+            frame[name] = getattr(loaded.batch, name)
+        # статті: збережені - як є, зведені суми - двома статтями
+        batch = loaded.batch
+        summarized = (batch.extra_cost != 0) | (batch.extra_revenue != 0)
+        texts = np.full(len(loaded), "[]", dtype=object)
+        for i, items in enumerate(loaded.extra_items):
+            if items is not None:
+                texts[i] = json.dumps([asdict(item) for item in items], ensure_ascii=False)
+            elif summarized[i]:
+                texts[i] = json.dumps(
+                    params_to_dict(batch.to_params(i))["extra_items"], ensure_ascii=False
+                )
+        frame["extra_items"] = texts
+        for name in RESULT_FIELDS:
+            frame[name] = loaded.result[name]
+        ext = os.path.splitext(path)[1].lower()
+        if ext in (".parquet", ".pq"):
+            frame.to_parquet(path, index=False)
+        elif ext in (".jsonl", ".ndjson"):
+            frame.to_json(path, orient="records", lines=True, force_ascii=False)
+        else:
+            frame.to_csv(path, index=False)
+        return len(frame)
+
+
+def _items(text: str) -> list:
+    return [ExtraItem(**item) for item in json.loads(text)]
+
+
+def _parsed_items(text: str, parsed: Dict[str, list]) -> list:
+    items = parsed.get(text)
+    if items is None:
+        items = parsed[text] = _items(text)
+    return items
+
+
+def _like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _components(text: Optional[str]) -> Optional[Dict[str, float]]:
+    return json.loads(text) if text is not None else None
+
+
+def _items_json(value) -> Optional[str]:
+    # Колонка extra_items вхідного файлу: JSON-рядок (CSV) або список (JSONL)
+    if isinstance(value, str):
+        value = json.loads(value) if value.strip() else []
+    if not isinstance(value, list) or not value:
+        return None
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _save_segment(path: str, matrix: np.ndarray) -> None:
+    # Атомарний запис: сегмент з'являється лише повністю записаним
+    with open(path + ".tmp", "wb") as fh:
+        np.save(fh, np.ascontiguousarray(matrix, dtype=np.float64))
+    os.replace(path + ".tmp", path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бібліотека сценаріїв")
+    parser.add_argument("--library", default=os.environ.get("BAGSHOP_LIBRARY", DEFAULT_PATH))
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="імпорт CSV / JSONL")
+    imp.add_argument("input")
+    imp.add_argument("--tags", default="", help="теги через кому")
+    imp.add_argument("--chunk-size", type=int, default=100_000)
+    exp = sub.add_parser("export", help="експорт у CSV / JSONL / Parquet")
+    exp.add_argument("output")
+    find = sub.add_parser("search", help="пошук за назвою / тегами")
+    find.add_argument("--text", default="")
+    find.add_argument("--tags", default="")
+    find.add_argument("--limit", type=int, default=20)
+    sub.add_parser("compact", help="зібрати окремі збереження в сегмент")
+    args = parser.parse_args()
+
+    library = ScenarioLibrary(args.library)
+    if args.command == "import":
+        added = library.import_file(args.input, args.chunk_size, args.tags.split(","))
+        print(f"Додано {added} нових сценаріїв (усього {len(library)})", file=sys.stderr)
+    elif args.command == "export":
+        print(f"Експортовано {library.export(args.output)} сценаріїв", file=sys.stderr)
+    elif args.command == "search":
+        tags = [t for t in args.tags.split(",") if t.strip()]
+        print(library.search(args.text, tags, limit=args.limit).to_string(index=False))
+    else:
+        print(f"Перенесено в сегмент: {library.compact()}", file=sys.stderr)
+    library.close()
+
+
+if __name__ == "__main__":
+    main()
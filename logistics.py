@@ -0,0 +1,304 @@
+# Логістика для мережі з багатьма зонами й перевізниками.
+#
+# calc_logistics рахує два класи доставки (локальні / міжобласні). Тут
+# те саме узагальнено на N зон:
+#
+#   logistics = Q * sum(share_z * delivery_z)
+#             + Q * return_rate * sum(share_z * returns_z)
+#
+# ZoneLogistics містить вектор часток зон і вартості доставки й повернення
+# по зонах (для пакета сценаріїв - матриці сценарії × зони). Двозонна
+# модель ModelParams - окремий випадок (ZoneLogistics.from_params) і дає
+# той самий результат, що й calc_logistics.
+#
+# Вартість по зонах береться з тарифної сітки перевізників (TariffTable):
+# ціна залежить від перевізника, зони, вагової категорії та оголошеної
+# вартості (відсоток за страхування). Сітка один раз перетворюється на
+# щільну таблицю (перевізник × зона) × вагова межа, а пошук тарифу для
+# мільйонів відправлень - два np.searchsorted (назви, вага) та індексування
+# масивів без словників і циклів по рядках.
+#
+# batch_runner.py --zones zones.json рахує логістику всіх сценаріїв файлу
+# за зонною моделлю з JSON (load_zone_logistics): вартість по зонах задана
+# явно або береться з тарифної сітки перевізників.
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_transaction_costs import ModelParams, ModelParamsBatch, calc_total, calc_total_batch
+
+# Зони двозонної моделі ModelParams
+TWO_ZONES = ("loc", "int")
+
+# Допустиме відхилення суми часток зон / перевізників від 1
+_SHARE_TOLERANCE = 1e-6
+
+TARIFF_COLUMNS = ("carrier", "zone", "weight_to", "price", "return_price", "value_percent")
+
+
+@dataclass(frozen=True, slots=True)
+class Tariff:
+    # Ціна відправлення вагою до weight_to кг (включно) у зону zone;
+    # value_percent - % від оголошеної вартості понад ціну
+    carrier: str
+    zone: str
+    weight_to: float
+    price: float
+    return_price: float = 0.0
+    value_percent: float = 0.0
+
+
+def _codes(values, names: np.ndarray, what: str) -> np.ndarray:
+    # Коди назв за відсортованим масивом names (двійковий пошук)
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        codes = values.astype(np.intp)
+        bad = (codes < 0) | (codes >= len(names))
+    else:
+        values = values.astype(str)
+        codes = np.searchsorted(names, values)
+        bad = (codes >= len(names)) | (names[np.minimum(codes, len(names) - 1)] != values)
+    if bad.any():
+        raise ValueError(f"Невідомий {what}: {np.asarray(values)[bad].flat[0]}")
+    return codes
+
+
+class TariffTable:
+    def __init__(self, tariffs: Iterable[Tariff]):
+        tariffs = list(tariffs)
+        if not tariffs:
+            raise ValueError("Тарифна сітка порожня")
+        self.tariffs = tuple(tariffs)
+        self.carriers = tuple(sorted({t.carrier for t in tariffs}))
+        self.zones = tuple(sorted({t.zone for t in tariffs}))
+        self._carrier_names = np.array(self.carriers)
+        self._zone_names = np.array(self.zones)
+        # спільні вагові межі всіх перевізників і зон
+        self.bounds = np.unique(np.array([t.weight_to for t in tariffs], dtype=np.float64))
+
+        cells = len(self.carriers) * len(self.zones)
+        shape = (cells, len(self.bounds))
+        self._price = np.full(shape, np.nan)
+        self._return_price = np.full(shape, np.nan)
+        self._value_share = np.full(shape, np.nan)
+
+        by_cell: Dict[int, list] = {}
+        for t in tariffs:
+            cell = self.carriers.index(t.carrier) * len(self.zones) + self.zones.index(t.zone)
+            by_cell.setdefault(cell, []).append(t)
+        for cell, rows in by_cell.items():
+            rows.sort(key=lambda t: t.weight_to)
+            limits = np.array([t.weight_to for t in rows])
+            if (np.diff(limits) == 0).any():
+                raise ValueError(
+                    f"Дубльована вагова межа: {rows[0].carrier} / {rows[0].zone}"
+                )
+            # спільна межа b -> перша категорія клітинки, що її покриває;
+            # межі понад найбільшу категорію лишаються NaN (тарифу немає)
+            pos = np.searchsorted(limits, self.bounds)
+            covered = pos < len(rows)
+            picked = pos[covered]
+            self._price[cell, covered] = np.array([t.price for t in rows])[picked]
+            self._return_price[cell, covered] = np.array([t.return_price for t in rows])[picked]
+            self._value_share[cell, covered] = (
+                np.array([t.value_percent for t in rows])[picked] / 100.0
+            )
+
+    def __len__(self) -> int:
+        return len(self.tariffs)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "TariffTable":
+        # Колонки TARIFF_COLUMNS; return_price і value_percent - необов'язкові
+        missing = [c for c in TARIFF_COLUMNS[:4] if c not in frame.columns]
+        if missing:
+            raise ValueError(f"Відсутні колонки тарифів: {', '.join(missing)}")
+        columns = {
+            name: frame[name].tolist() if name in frame.columns else [0.0] * len(frame)
+            for name in TARIFF_COLUMNS
+        }
+        return cls(
+            Tariff(str(c), str(z), float(w), float(p), float(r), float(v))
+            for c, z, w, p, r, v in zip(*(columns[name] for name in TARIFF_COLUMNS))
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "TariffTable":
+        return cls.from_frame(pd.read_csv(path, dtype={"carrier": str, "zone": str}))
+
+    def rates(
+        self, carrier, zone, weight, declared_value=0.0
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Вартість доставки й повернення для кожного відправлення. carrier і
+        # zone - назви або коди (позиції в self.carriers / self.zones);
+        # усі аргументи - скаляри або масиви однієї довжини.
+        cell = (_codes(carrier, self._carrier_names, "перевізник") * len(self.zones)
+                + _codes(zone, self._zone_names, "зона"))
+        weight = np.asarray(weight, dtype=np.float64)
+        bracket = np.searchsorted(self.bounds, weight)
+        if (bracket >= len(self.bounds)).any():
+            raise ValueError(
+                f"Вага {weight.max():g} кг перевищує найбільшу категорію {self.bounds[-1]:g} кг"
+            )
+        flat = cell * len(self.bounds) + bracket
+        price = self._price.ravel()[flat]
+        if np.isnan(price).any():
+            # cell і weight можуть бути скалярами при масиві іншого аргументу
+            missing = np.flatnonzero(np.isnan(np.ravel(price)))[0]
+            cells = np.broadcast_to(cell, np.shape(flat)).ravel()
+            weights = np.broadcast_to(weight, np.shape(flat)).ravel()
+            c, z = divmod(int(cells[missing]), len(self.zones))
+            raise ValueError(
+                f"Немає тарифу {self.carriers[c]} / {self.zones[z]} для ваги "
+                f"{weights[missing]:g} кг"
+            )
+        delivery = price + self._value_share.ravel()[flat] * declared_value
+        return delivery, self._return_price.ravel()[flat]
+
+    def order_costs(self, carrier, zone, weight, declared_value=0.0, returned=False) -> np.ndarray:
+        # Фактична вартість логістики кожного замовлення (з поверненням, якщо returned)
+        delivery, returns = self.rates(carrier, zone, weight, declared_value)
+        return delivery + np.asarray(returned, dtype=bool) * returns
+
+    def zone_costs(
+        self,
+        carrier_shares: Mapping[str, float],
+        weight,
+        declared_value=0.0,
+        zones: Optional[Sequence[str]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Середня вартість доставки й повернення по зонах для типового
+        # відправлення: carrier_shares - частки перевізників, weight /
+        # declared_value - скаляри або вибірка відправлень (усереднюється)
+        zones = self.zones if zones is None else tuple(zones)
+        weight = np.atleast_1d(np.asarray(weight, dtype=np.float64))
+        value = np.broadcast_to(np.asarray(declared_value, dtype=np.float64), weight.shape)
+        zone_codes = _codes(zones, self._zone_names, "зона")
+        delivery = np.zeros(len(zones))
+        returns = np.zeros(len(zones))
+        for carrier, share in carrier_shares.items():
+            if not share:
+                continue
+            # (зони × відправлення) одним пошуком
+            d, r = self.rates(
+                carrier, zone_codes[:, None], weight[None, :], value[None, :]
+            )
+            delivery += share * d.mean(axis=1)
+            returns += share * r.mean(axis=1)
+        return delivery, returns
+
+    def logistics(
+        self,
+        zone_shares: Mapping[str, float],
+        carrier_shares: Mapping[str, float],
+        weight,
+        declared_value=0.0,
+    ) -> "ZoneLogistics":
+        zones = tuple(zone_shares)
+        delivery, returns = self.zone_costs(carrier_shares, weight, declared_value, zones)
+        return ZoneLogistics(zones, np.array([zone_shares[z] for z in zones]), delivery, returns)
+
+
+@dataclass
+class ZoneLogistics:
+    # shares / delivery / returns - вектори за зонами або матриці
+    # (сценарії × зони) для пакета
+    zones: Tuple[str, ...]
+    shares: np.ndarray
+    delivery: np.ndarray
+    returns: np.ndarray
+
+    def __post_init__(self):
+        self.zones = tuple(self.zones)
+        for name in ("shares", "delivery", "returns"):
+            values = np.asarray(getattr(self, name), dtype=np.float64)
+            if values.shape[-1:] != (len(self.zones),):
+                raise ValueError(f"{name}: очікується {len(self.zones)} значень на зону")
+            setattr(self, name, values)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object], base_dir: str = ".") -> "ZoneLogistics":
+        # {"zones": {зона: частка}, "delivery": {зона: грн}, "returns": {...}}
+        # або {"zones": ..., "tariffs": "tariffs.csv", "carriers": {перевізник:
+        # частка}, "weight": кг, "declared_value": грн}; відносний шлях
+        # tariffs - від base_dir
+        zone_shares = _shares(data.get("zones"), "zones")
+        zones = tuple(zone_shares)
+        if "tariffs" in data:
+            table = TariffTable.from_csv(os.path.join(base_dir, str(data["tariffs"])))
+            return table.logistics(
+                zone_shares,
+                _shares(data.get("carriers"), "carriers"),
+                data.get("weight", 0.0),
+                data.get("declared_value", 0.0),
+            )
+        costs = {}
+        for name in ("delivery", "returns"):
+            values = data.get(name)
+            if not isinstance(values, Mapping):
+                raise ValueError(f"{name}: очікується словник вартості за зонами")
+            missing = [z for z in zones if z not in values]
+            if missing:
+                raise ValueError(f"{name}: немає вартості для зон {', '.join(missing)}")
+            costs[name] = np.array([float(values[z]) for z in zones])
+        return cls(zones, np.array(list(zone_shares.values())), costs["delivery"],
+                   costs["returns"])
+
+    @classmethod
+    def from_params(cls, params) -> "ZoneLogistics":
+        # Двозонна модель ModelParams / ModelParamsBatch
+        return cls(
+            TWO_ZONES,
+            np.stack([np.asarray(params.p_loc, dtype=np.float64), params.p_int], axis=-1),
+            np.stack([np.asarray(params.c_loc, dtype=np.float64), params.c_int], axis=-1),
+            np.stack([np.asarray(params.c_ret_loc, dtype=np.float64), params.c_ret_int], axis=-1),
+        )
+
+    def average_costs(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Середня вартість доставки й повернення одного замовлення
+        return (
+            (self.shares * self.delivery).sum(axis=-1),
+            (self.shares * self.returns).sum(axis=-1),
+        )
+
+    def calc(self, params):
+        # Стаття logistics для ModelParams або ModelParamsBatch (береться
+        # лише Q і return_rate; частки й вартість - з цієї моделі)
+        delivery, returns = self.average_costs()
+        value = params.Q * delivery + params.Q * params.return_rate * returns
+        return float(value) if isinstance(params, ModelParams) else value
+
+    def calc_total(self, params: ModelParams) -> Dict[str, float]:
+        return self._replace(calc_total(params), params)
+
+    def calc_total_batch(self, batch: ModelParamsBatch) -> Dict[str, np.ndarray]:
+        return self._replace(calc_total_batch(batch), batch)
+
+    def _replace(self, result: Dict[str, object], params) -> Dict[str, object]:
+        # Результат calc_total з логістикою цієї моделі; total - у тому ж
+        # порядку додавання, що й у calc_total
+        result["logistics"] = logistics = self.calc(params)
+        result["total"] = (logistics + result["payments"] + result["marketing"]
+                           + result["staff"] + result["extra_net"])
+        return result
+
+
+def _shares(values, what: str) -> Dict[str, float]:
+    if not isinstance(values, Mapping) or not values:
+        raise ValueError(f"{what}: очікується словник часток")
+    shares = {str(name): float(share) for name, share in values.items()}
+    total = sum(shares.values())
+    if min(shares.values()) < 0 or abs(total - 1.0) > _SHARE_TOLERANCE:
+        raise ValueError(f"{what}: частки мають бути невід'ємними й у сумі давати 1")
+    return shares
+
+
+def load_zone_logistics(path: str) -> ZoneLogistics:
+    # Зонна модель з JSON-файлу (формат - ZoneLogistics.from_dict)
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    return ZoneLogistics.from_dict(data, os.path.dirname(os.path.abspath(path)))
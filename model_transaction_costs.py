@@ -1,17 +1,37 @@
-from dataclasses import dataclass, field
-from typing import List, Dict
+import dataclasses
+import hashlib
+from dataclasses import dataclass, field, fields
+from typing import List, Dict, Mapping, Optional, Sequence
 
+import numpy as np
 
-@dataclass
+from profiling import instrument
+
+
+# База нарахування додаткового показника: сума статті = amount * драйвер
+#   "flat"               - грн за період (драйвер 1)
+#   "per_order"          - грн за замовлення (Q)
+#   "per_return"         - грн за повернення (Q * return_rate)
+#   "percent_of_revenue" - % від виручки (Q * avg_check / 100)
+EXTRA_BASES = ("flat", "per_order", "per_return", "percent_of_revenue")
+EXTRA_KINDS = ("cost", "revenue")
+
+BASIS_CODES = {name: code for code, name in enumerate(EXTRA_BASES)}
+KIND_CODES = {name: code for code, name in enumerate(EXTRA_KINDS)}
+
+
+@dataclass(frozen=True, slots=True)
 class ExtraItem:
     # kind = "cost"    -> додається до витрат
     # kind = "revenue" -> віднімається від витрат
     name: str
     kind: str        # "cost" або "revenue"
-    amount: float    # сума в грн
+    amount: float    # сума в грн (або % для "percent_of_revenue")
+    basis: str = "flat"
+    category: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelParams:
     Q: int
     avg_check: float
@@ -31,6 +51,231 @@ class ModelParams:
     extra_items: List[ExtraItem] = field(default_factory=list)
 
 
+# Числові поля ModelParams (усе, крім extra_items) у порядку оголошення
+PARAM_FIELDS = tuple(f.name for f in fields(ModelParams) if f.name != "extra_items")
+
+# Ключі результату calc_total / calc_total_batch
+RESULT_FIELDS = (
+    "logistics",
+    "payments",
+    "marketing",
+    "staff",
+    "extra_cost",
+    "extra_revenue",
+    "extra_net",
+    "total",
+)
+
+
+@dataclass
+class ModelParamsBatch:
+    # Колонкове представлення багатьох сценаріїв: кожне поле ModelParams -
+    # масив numpy однакової довжини. Додаткові показники зведені до сум
+    # extra_cost / extra_revenue для кожного сценарію.
+    Q: np.ndarray
+    avg_check: np.ndarray
+    p_loc: np.ndarray
+    p_int: np.ndarray
+    return_rate: np.ndarray
+    c_loc: np.ndarray
+    c_int: np.ndarray
+    c_ret_loc: np.ndarray
+    c_ret_int: np.ndarray
+    online_share: np.ndarray
+    pay_commission: np.ndarray
+    n_new_customers: np.ndarray
+    cac: np.ndarray
+    staff_fixed: np.ndarray
+    staff_per_order: np.ndarray
+    extra_cost: np.ndarray
+    extra_revenue: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.Q)
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Mapping[str, object],
+        size: Optional[int] = None,
+    ) -> "ModelParamsBatch":
+        # columns - будь-яке відображення "поле -> масив/скаляр"
+        # (dict, pandas.DataFrame). Скаляри розширюються до довжини пакета.
+        missing = [name for name in PARAM_FIELDS if name not in columns]
+        if missing:
+            raise ValueError(f"Відсутні поля ModelParams: {', '.join(missing)}")
+        names = PARAM_FIELDS + ("extra_cost", "extra_revenue")
+        values = [
+            np.asarray(columns[name] if name in columns else 0.0, dtype=np.float64)
+            for name in names
+        ]
+        shape = np.broadcast_shapes(
+            *(v.shape for v in values), (size,) if size is not None else (1,)
+        )
+        return cls(
+            *(np.ascontiguousarray(np.broadcast_to(v, shape)).reshape(-1) for v in values)
+        )
+
+    @classmethod
+    def from_params(cls, params: Sequence[ModelParams]) -> "ModelParamsBatch":
+        columns = {
+            name: np.fromiter((getattr(p, name) for p in params), np.float64, len(params))
+            for name in PARAM_FIELDS
+        }
+        extras = [calc_extra(p) for p in params]
+        columns["extra_cost"] = np.fromiter(
+            (e["extra_cost"] for e in extras), np.float64, len(params)
+        )
+        columns["extra_revenue"] = np.fromiter(
+            (e["extra_revenue"] for e in extras), np.float64, len(params)
+        )
+        return cls.from_columns(columns, size=len(params))
+
+    def to_params(self, i: int) -> ModelParams:
+        # Сценарій i як звичайний ModelParams (додаткові показники - двома
+        # зведеними статтями, якщо вони ненульові)
+        values = {name: getattr(self, name)[i].item() for name in PARAM_FIELDS}
+        for name in ("Q", "n_new_customers"):
+            if values[name].is_integer():
+                values[name] = int(values[name])
+        items = []
+        if self.extra_cost[i] != 0:
+            items.append(ExtraItem("extra_cost", "cost", self.extra_cost[i].item()))
+        if self.extra_revenue[i] != 0:
+            items.append(ExtraItem("extra_revenue", "revenue", self.extra_revenue[i].item()))
+        return ModelParams(**values, extra_items=items)
+
+
+def params_to_dict(params: ModelParams) -> Dict[str, object]:
+    # Звичайний словник (для JSON): extra_items - список словників
+    data = {name: getattr(params, name) for name in PARAM_FIELDS}
+    data["extra_items"] = [
+        {f.name: getattr(item, f.name) for f in fields(ExtraItem)}
+        for item in params.extra_items
+    ]
+    return data
+
+
+def params_from_dict(data: Mapping[str, object]) -> ModelParams:
+    # Зворотне до params_to_dict; відсутні чи зайві поля - ValueError
+    missing = [name for name in PARAM_FIELDS if name not in data]
+    if missing:
+        raise ValueError(f"Відсутні поля ModelParams: {', '.join(missing)}")
+    unknown = set(data) - set(PARAM_FIELDS) - {"extra_items"}
+    if unknown:
+        raise ValueError(f"Невідомі поля ModelParams: {', '.join(sorted(unknown))}")
+    try:
+        items = [ExtraItem(**item) for item in data.get("extra_items") or ()]
+    except TypeError as e:
+        raise ValueError(f"Некоректний додатковий показник: {e}") from None
+    return ModelParams(
+        **{name: data[name] for name in PARAM_FIELDS}, extra_items=items
+    )
+
+
+def _item_bytes(item: ExtraItem) -> bytes:
+    # Категорія - частина вмісту (за нею групуються агрегати статей); без
+    # категорії байти ті самі, що й до її появи, тож ключі наявних
+    # бібліотек не змінюються
+    fields = (item.name, item.kind, float(item.amount), item.basis)
+    if item.category:
+        fields += (item.category,)
+    return repr(fields).encode()
+
+
+def params_key(params: ModelParams) -> str:
+    # Хеш вмісту сценарію: однакові параметри і додаткові показники дають
+    # однаковий ключ (Q=10900 і Q=10900.0 не розрізняються)
+    values = np.array([getattr(params, name) for name in PARAM_FIELDS], dtype=np.float64)
+    h = hashlib.blake2b(values.tobytes(), digest_size=16)
+    for item in params.extra_items:
+        h.update(_item_bytes(item))
+    return h.hexdigest()
+
+
+def batch_keys(batch: "ModelParamsBatch") -> List[str]:
+    # params_key для кожного сценарію пакета, як для batch.to_params(i)
+    # (додаткові показники - зведеними статтями), без створення ModelParams
+    matrix = np.column_stack([getattr(batch, name) for name in PARAM_FIELDS])
+    keys = []
+    blake2b = hashlib.blake2b
+    for row, cost, revenue in zip(matrix, batch.extra_cost.tolist(), batch.extra_revenue.tolist()):
+        h = blake2b(row.tobytes(), digest_size=16)
+        if cost:
+            h.update(_item_bytes(ExtraItem("extra_cost", "cost", cost)))
+        if revenue:
+            h.update(_item_bytes(ExtraItem("extra_revenue", "revenue", revenue)))
+        keys.append(h.hexdigest())
+    return keys
+
+
+def extra_drivers(params) -> np.ndarray:
+    # Драйвери баз EXTRA_BASES; для пакета - матриця (сценарії × бази)
+    q = np.asarray(params.Q, dtype=np.float64)
+    return np.stack(
+        [
+            np.ones_like(q),
+            q,
+            q * params.return_rate,
+            q * params.avg_check / 100.0,
+        ],
+        axis=-1,
+    )
+
+
+def extra_coefficients(items) -> np.ndarray:
+    # Матриця (бази × kind) сум amount. Каталог з готовими агрегатами
+    # (extra_items.ExtraItemLedger) повертає її без проходу по статтях.
+    coefficients = getattr(items, "coefficients", None)
+    if coefficients is not None:
+        return coefficients()
+    table = np.zeros((len(EXTRA_BASES), len(EXTRA_KINDS)))
+    for item in items:
+        kind = KIND_CODES.get(item.kind)
+        if kind is None:
+            continue
+        basis = BASIS_CODES.get(item.basis)
+        if basis is None:
+            raise ValueError(f"Невідома база нарахування: {item.basis}")
+        table[basis, kind] += item.amount
+    return table
+
+
+def apply_extra_items(batch: "ModelParamsBatch", items) -> "ModelParamsBatch":
+    # extra_cost / extra_revenue пакета за спільним каталогом статей:
+    # один матричний добуток (сценарії × бази) @ (бази × kind)
+    if not len(items):
+        return batch
+    totals = extra_drivers(batch) @ extra_coefficients(items)
+    return dataclasses.replace(
+        batch,
+        extra_cost=np.ascontiguousarray(totals[..., KIND_CODES["cost"]]),
+        extra_revenue=np.ascontiguousarray(totals[..., KIND_CODES["revenue"]]),
+    )
+
+
+# Поля ModelParams, від яких залежить кожна стаття (для інкрементального
+# перерахунку в incremental.py). Для "extra" - поля драйверів баз
+# нарахування; які з них потрібні насправді, залежить від статей.
+COMPONENT_FIELDS: Dict[str, tuple] = {
+    "logistics": ("Q", "p_loc", "p_int", "return_rate",
+                  "c_loc", "c_int", "c_ret_loc", "c_ret_int"),
+    "payments": ("Q", "online_share", "avg_check", "pay_commission"),
+    "marketing": ("n_new_customers", "cac"),
+    "staff": ("staff_fixed", "staff_per_order", "Q"),
+    "extra": ("extra_items", "Q", "return_rate", "avg_check"),
+}
+
+# Поля драйверів кожної бази нарахування (див. extra_drivers)
+BASIS_FIELDS: Dict[str, tuple] = {
+    "flat": (),
+    "per_order": ("Q",),
+    "per_return": ("Q", "return_rate"),
+    "percent_of_revenue": ("Q", "avg_check"),
+}
+
+
+@instrument
 def calc_logistics(params: ModelParams) -> float:
     delivery = params.Q * (params.p_loc * params.c_loc +
                            params.p_int * params.c_int)
@@ -39,27 +284,30 @@ def calc_logistics(params: ModelParams) -> float:
     return delivery + returns
 
 
+@instrument
 def calc_payments(params: ModelParams) -> float:
     q_online = params.Q * params.online_share
     return q_online * params.avg_check * params.pay_commission
 
 
+@instrument
 def calc_marketing(params: ModelParams) -> float:
     return params.n_new_customers * params.cac
 
 
+@instrument
 def calc_staff(params: ModelParams) -> float:
     return params.staff_fixed + params.staff_per_order * params.Q
 
 
+@instrument
 def calc_extra(params: ModelParams) -> Dict[str, float]:
     total_cost = 0.0
     total_revenue = 0.0
-    for item in params.extra_items:
-        if item.kind == "cost":
-            total_cost += item.amount
-        elif item.kind == "revenue":
-            total_revenue += item.amount
+    if len(params.extra_items):
+        totals = extra_drivers(params) @ extra_coefficients(params.extra_items)
+        total_cost = float(totals[KIND_CODES["cost"]])
+        total_revenue = float(totals[KIND_CODES["revenue"]])
     net = total_cost - total_revenue
     return {
         "extra_cost": total_cost,
@@ -68,6 +316,7 @@ def calc_extra(params: ModelParams) -> Dict[str, float]:
     }
 
 
+@instrument
 def calc_total(params: ModelParams) -> Dict[str, float]:
     logistics = calc_logistics(params)
     payments = calc_payments(params)
@@ -87,3 +336,69 @@ def calc_total(params: ModelParams) -> Dict[str, float]:
         "extra_net": extra["extra_net"],
         "total": total,
     }
+
+
+@instrument
+def calc_total_batch(batch: ModelParamsBatch) -> Dict[str, np.ndarray]:
+    # Ті самі формули, що й у calc_total, але над цілими масивами:
+    # calc_logistics / calc_payments / calc_marketing / calc_staff
+    # використовують лише арифметику, тому працюють і з numpy.
+    logistics = calc_logistics(batch)
+    payments = calc_payments(batch)
+    marketing = calc_marketing(batch)
+    staff = calc_staff(batch)
+    extra_net = batch.extra_cost - batch.extra_revenue
+
+    total = logistics + payments + marketing + staff + extra_net
+
+    return {
+        "logistics": logistics,
+        "payments": payments,
+        "marketing": marketing,
+        "staff": staff,
+        "extra_cost": batch.extra_cost,
+        "extra_revenue": batch.extra_revenue,
+        "extra_net": extra_net,
+        "total": total,
+    }
+
+
+def calc_total_gradient(params: ModelParams) -> Dict[str, float]:
+    # Частинні похідні total за кожним числовим полем ModelParams.
+    # Модель мультилінійна, тому похідні - прості добутки інших полів.
+    # Працює як для ModelParams, так і для ModelParamsBatch.
+    avg_ret_cost = params.p_loc * params.c_ret_loc + params.p_int * params.c_ret_int
+    q_ret = params.Q * params.return_rate
+    # Додаткові показники на замовлення / повернення / % виручки
+    # (у ModelParamsBatch статей немає - лише зведені суми)
+    per_order = per_return = per_revenue = 0.0
+    items = getattr(params, "extra_items", ())
+    if len(items):
+        table = extra_coefficients(items)
+        net = table[:, KIND_CODES["cost"]] - table[:, KIND_CODES["revenue"]]
+        per_order = net[BASIS_CODES["per_order"]]
+        per_return = net[BASIS_CODES["per_return"]]
+        per_revenue = net[BASIS_CODES["percent_of_revenue"]] / 100.0
+    return {
+        "Q": (params.p_loc * params.c_loc + params.p_int * params.c_int
+              + params.return_rate * avg_ret_cost
+              + params.online_share * params.avg_check * params.pay_commission
+              + params.staff_per_order
+              + per_order + per_return * params.return_rate
+              + per_revenue * params.avg_check),
+        "avg_check": (params.Q * params.online_share * params.pay_commission
+                      + per_revenue * params.Q),
+        "p_loc": params.Q * params.c_loc + q_ret * params.c_ret_loc,
+        "p_int": params.Q * params.c_int + q_ret * params.c_ret_int,
+        "return_rate": params.Q * avg_ret_cost + per_return * params.Q,
+        "c_loc": params.Q * params.p_loc,
+        "c_int": params.Q * params.p_int,
+        "c_ret_loc": q_ret * params.p_loc,
+        "c_ret_int": q_ret * params.p_int,
+        "online_share": params.Q * params.avg_check * params.pay_commission,
+        "pay_commission": params.Q * params.online_share * params.avg_check,
+        "n_new_customers": params.cac,
+        "cac": params.n_new_customers,
+        "staff_fixed": 1.0,
+        "staff_per_order": params.Q,
+    }
@@ -0,0 +1,206 @@
+# Монте-Карло оцінка невизначеності загальних трансакційних витрат.
+#
+# Невизначені поля ModelParams задаються розподілами. Вибірки генеруються
+# векторизовано блоками, блоки розподіляються між процесами. Кожен блок має
+# власне зерно з SeedSequence.spawn, тому результат відтворюваний і не
+# залежить від кількості процесів.
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_transaction_costs import (
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ModelParams,
+    ModelParamsBatch,
+    apply_extra_items,
+)
+from incremental import IncrementalEvaluator
+
+# Поля-частки, які після вибірки обрізаються до [0, 1]
+SHARE_FIELDS = ("p_loc", "p_int", "return_rate", "online_share", "pay_commission")
+
+
+@dataclass
+class Normal:
+    mean: float
+    std: float
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.normal(self.mean, self.std, n)
+
+
+@dataclass
+class Triangular:
+    left: float
+    mode: float
+    right: float
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        if self.left == self.right:
+            return np.full(n, float(self.mode))
+        return rng.triangular(self.left, self.mode, self.right, n)
+
+
+@dataclass
+class Uniform:
+    low: float
+    high: float
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.uniform(self.low, self.high, n)
+
+
+@dataclass
+class Empirical:
+    # Вибірка з поверненням із спостережених значень
+    values: Sequence[float]
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.choice(np.asarray(self.values, dtype=np.float64), n)
+
+
+@dataclass
+class MonteCarloResult:
+    n_samples: int
+    percentiles: pd.DataFrame     # метрика x перцентиль
+    tails: pd.DataFrame           # VaR / CVaR (верхній хвіст витрат)
+    histograms: Dict[str, Tuple[np.ndarray, np.ndarray]]  # метрика -> (counts, edges)
+    mean: pd.Series
+    std: pd.Series
+
+
+def _simulate_block(
+    base: ModelParams,
+    distributions: Mapping[str, object],
+    seed: np.random.SeedSequence,
+    n: int,
+    metrics: Sequence[str],
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    columns = {name: getattr(base, name) for name in PARAM_FIELDS}
+    for name, dist in distributions.items():
+        columns[name] = dist.sample(rng, n)
+    if "p_loc" in distributions and "p_int" not in distributions:
+        columns["p_int"] = 1.0 - columns["p_loc"]
+    for name in SHARE_FIELDS:
+        if name in distributions or name == "p_int":
+            columns[name] = np.clip(columns[name], 0.0, 1.0)
+    batch = ModelParamsBatch.from_columns(columns, size=n)
+    # статті, що не залежать від невизначених полів, рахуються один раз
+    changed = list(distributions)
+    if "p_loc" in distributions:
+        changed.append("p_int")
+    evaluator = IncrementalEvaluator(base)
+    result = evaluator.evaluate_batch(apply_extra_items(batch, base.extra_items), changed)
+    return np.stack([result[m] for m in metrics])
+
+
+def _run_block(args) -> np.ndarray:
+    return _simulate_block(*args)
+
+
+def simulate(
+    base: ModelParams,
+    distributions: Mapping[str, object],
+    n_samples: int = 1_000_000,
+    block_size: int = 100_000,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    percentiles: Sequence[float] = (1, 5, 25, 50, 75, 95, 99),
+    tail_levels: Sequence[float] = (0.95, 0.99),
+    bins: int = 50,
+    metrics: Sequence[str] = RESULT_FIELDS,
+    progress: Optional[Callable[[int, int, List[np.ndarray]], None]] = None,
+) -> MonteCarloResult:
+    # distributions: {"return_rate": Triangular(0.04, 0.061, 0.09), ...}
+    # workers=1 - без пулу процесів (наприклад, всередині Streamlit)
+    # progress(готово блоків, усього блоків, готові блоки) - після кожного
+    # блоку; виняток із progress перериває симуляцію
+    unknown = [name for name in distributions if name not in PARAM_FIELDS]
+    if unknown:
+        raise ValueError(f"Невідомі поля ModelParams: {', '.join(unknown)}")
+    if n_samples <= 0:
+        raise ValueError("n_samples має бути додатним")
+
+    sizes = [block_size] * (n_samples // block_size)
+    if n_samples % block_size:
+        sizes.append(n_samples % block_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (base, dict(distributions), s, n, tuple(metrics))
+        for s, n in zip(seeds, sizes)
+    ]
+
+    blocks: List[np.ndarray] = []
+    if workers == 1 or len(tasks) == 1:
+        for t in tasks:
+            blocks.append(_run_block(t))
+            if progress is not None:
+                progress(len(blocks), len(tasks), blocks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for block in pool.map(_run_block, tasks):
+                blocks.append(block)
+                if progress is not None:
+                    progress(len(blocks), len(tasks), blocks)
+    samples = np.concatenate(blocks, axis=1)
+
+    return summarize(samples, metrics, percentiles, tail_levels, bins)
+
+
+def summarize(
+    samples: np.ndarray,
+    metrics: Sequence[str],
+    percentiles: Sequence[float] = (1, 5, 25, 50, 75, 95, 99),
+    tail_levels: Sequence[float] = (0.95, 0.99),
+    bins: int = 50,
+) -> MonteCarloResult:
+    # samples: масив (метрики x вибірки)
+    metrics = list(metrics)
+    pct = np.percentile(samples, percentiles, axis=1).T
+    percentile_df = pd.DataFrame(
+        pct,
+        index=pd.Index(metrics, name="metric"),
+        columns=[f"P{p:g}" for p in percentiles],
+    )
+
+    tail_rows: List[Dict[str, float]] = []
+    for m, values in zip(metrics, samples):
+        row: Dict[str, float] = {"metric": m}
+        for level in tail_levels:
+            var = np.quantile(values, level)
+            row[f"VaR{level * 100:g}"] = var
+            row[f"CVaR{level * 100:g}"] = values[values >= var].mean()
+        tail_rows.append(row)
+    tails = pd.DataFrame(tail_rows).set_index("metric")
+
+    histograms = {
+        m: np.histogram(values, bins=bins) for m, values in zip(metrics, samples)
+    }
+
+    return MonteCarloResult(
+        n_samples=samples.shape[1],
+        percentiles=percentile_df,
+        tails=tails,
+        histograms=histograms,
+        mean=pd.Series(samples.mean(axis=1), index=metrics),
+        std=pd.Series(samples.std(axis=1), index=metrics),
+    )
+
+
+def relative_triangular(
+    base: ModelParams, spread: Mapping[str, float]
+) -> Dict[str, Triangular]:
+    # Трикутні розподіли навколо поточних значень: ±spread[name] (частка)
+    return {
+        name: Triangular(
+            getattr(base, name) * (1 - s),
+            getattr(base, name),
+            getattr(base, name) * (1 + s),
+        )
+        for name, s in spread.items()
+    }
@@ -0,0 +1,332 @@
+# Пошук сценарію з мінімальними трансакційними витратами.
+#
+# total мультилінійний за полями ModelParams: при фіксованих інших полях він
+# лінійний за кожним окремим полем. Тому оптимізація зводиться до
+# послідовності задач лінійного програмування (метод Франка-Вулфа):
+# на кожному кроці лінеаризуємо total аналітичним градієнтом, знаходимо
+# вершину многогранника обмежень симплекс-методом і робимо точний пошук
+# по відрізку (total уздовж відрізка - многочлен степеня не вище 4).
+# Якщо total лінійний за вільними полями, відповідь дає перша ж задача ЛП.
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_transaction_costs import (
+    PARAM_FIELDS,
+    ModelParams,
+    ModelParamsBatch,
+    apply_extra_items,
+    calc_total,
+    calc_total_batch,
+    calc_total_gradient,
+)
+
+# Допустимі межі полів (як у формі введення app.py)
+DEFAULT_BOUNDS: Dict[str, Tuple[float, float]] = {
+    "Q": (0.0, 100000.0),
+    "avg_check": (0.0, 10000.0),
+    "p_loc": (0.0, 1.0),
+    "p_int": (0.0, 1.0),
+    "return_rate": (0.0, 1.0),
+    "c_loc": (0.0, 500.0),
+    "c_int": (0.0, 500.0),
+    "c_ret_loc": (0.0, 200.0),
+    "c_ret_int": (0.0, 200.0),
+    "online_share": (0.0, 1.0),
+    "pay_commission": (0.0, 0.10),
+    "n_new_customers": (0.0, 50000.0),
+    "cac": (0.0, 200.0),
+    "staff_fixed": (0.0, 10000000.0),
+    "staff_per_order": (0.0, 200.0),
+}
+
+_EPS = 1e-9
+
+
+@dataclass
+class LinearConstraint:
+    # sum(coeffs[name] * params.name) <op> rhs, op: "<=", ">=" або "=="
+    coeffs: Dict[str, float]
+    op: str
+    rhs: float
+
+
+@dataclass
+class OptimizationResult:
+    params: ModelParams
+    result: Dict[str, float]
+    x: Dict[str, float]
+    iterations: int
+    success: bool
+    message: str = ""
+    history: List[float] = field(default_factory=list)
+
+
+class InfeasibleError(ValueError):
+    pass
+
+
+def min_orders(q_min: float) -> LinearConstraint:
+    return LinearConstraint({"Q": 1.0}, ">=", q_min)
+
+
+def marketing_budget(
+    base: ModelParams, budget: float, free: Sequence[str]
+) -> LinearConstraint:
+    # n_new_customers * cac <= budget. Обмеження лінійне, лише коли вільне
+    # не більше одного з двох полів.
+    if "n_new_customers" in free and "cac" in free:
+        raise ValueError(
+            "Бюджет маркетингу білінійний, якщо вільні і n_new_customers, і cac; "
+            "зафіксуйте одне з цих полів"
+        )
+    if "n_new_customers" in free:
+        return LinearConstraint({"n_new_customers": base.cac}, "<=", budget)
+    return LinearConstraint({"cac": base.n_new_customers}, "<=", budget)
+
+
+def _simplex(
+    c: np.ndarray,
+    a_ub: np.ndarray,
+    b_ub: np.ndarray,
+    a_eq: np.ndarray,
+    b_eq: np.ndarray,
+) -> np.ndarray:
+    # Двофазний табличний симплекс-метод з правилом Бленда:
+    # min c @ z, a_ub @ z <= b_ub, a_eq @ z == b_eq, z >= 0.
+    # Розмірності малі (десятки змінних), тому щільна таблиця достатня.
+    m_ub, n = a_ub.shape
+    m = m_ub + a_eq.shape[0]
+    n_cols = n + m_ub + m
+    a = np.zeros((m, n_cols))
+    a[:m_ub, :n] = a_ub
+    a[:m_ub, n:n + m_ub] = np.eye(m_ub)
+    a[m_ub:, :n] = a_eq
+    b = np.concatenate([b_ub, b_eq]).astype(np.float64)
+    negative = b < 0
+    a[negative] *= -1
+    b[negative] *= -1
+    a[:, n + m_ub:] = np.eye(m)
+    basis = list(range(n + m_ub, n_cols))
+
+    def pivot(row: int, col: int) -> None:
+        b[row] /= a[row, col]
+        a[row] /= a[row, col]
+        for i in range(m):
+            if i != row and a[i, col] != 0:
+                b[i] -= a[i, col] * b[row]
+                a[i] -= a[i, col] * a[row]
+        basis[row] = col
+
+    def run(cost: np.ndarray, allowed: int) -> None:
+        while True:
+            reduced = cost[:allowed] - cost[basis] @ a[:, :allowed]
+            entering = np.flatnonzero(reduced < -_EPS)
+            if len(entering) == 0:
+                return
+            col = entering[0]
+            rows = np.flatnonzero(a[:, col] > _EPS)
+            if len(rows) == 0:
+                raise ValueError("Задача необмежена: задайте межі для вільних полів")
+            ratios = b[rows] / a[rows, col]
+            best = rows[ratios <= ratios.min() + _EPS]
+            row = min(best, key=lambda i: basis[i])
+            pivot(row, col)
+
+    phase1 = np.zeros(n_cols)
+    phase1[n + m_ub:] = 1.0
+    run(phase1, n_cols)
+    if phase1[basis] @ b > 1e-7 * max(1.0, np.abs(b).max(initial=0.0)):
+        raise InfeasibleError("Обмеження несумісні")
+    for row, var in enumerate(basis):
+        if var >= n + m_ub:
+            candidates = np.flatnonzero(np.abs(a[row, :n + m_ub]) > _EPS)
+            if len(candidates):
+                pivot(row, candidates[0])
+
+    phase2 = np.zeros(n_cols)
+    phase2[:n] = c
+    run(phase2, n + m_ub)
+
+    z = np.zeros(n_cols)
+    z[basis] = b
+    return z[:n]
+
+
+class _Problem:
+    def __init__(
+        self,
+        base: ModelParams,
+        free: Sequence[str],
+        bounds: Mapping[str, Tuple[float, float]],
+        constraints: Sequence[LinearConstraint],
+        couple_p_int: bool,
+    ):
+        free = list(dict.fromkeys(free))
+        unknown = [name for name in free if name not in PARAM_FIELDS]
+        if unknown:
+            raise ValueError(f"Невідомі поля ModelParams: {', '.join(unknown)}")
+        constraints = list(constraints)
+        # як і в app.py: p_int = 1 - p_loc
+        if couple_p_int and "p_loc" in free and "p_int" not in free:
+            free.append("p_int")
+            constraints.append(LinearConstraint({"p_loc": 1.0, "p_int": 1.0}, "==", 1.0))
+        self.base = base
+        self.free = free
+        self.lo = np.array([bounds.get(n, DEFAULT_BOUNDS[n])[0] for n in free])
+        self.hi = np.array([bounds.get(n, DEFAULT_BOUNDS[n])[1] for n in free])
+
+        # Обмеження в змінних z = x - lo >= 0; фіксовані поля - у праву частину
+        ub_rows, ub_rhs, eq_rows, eq_rhs = [], [], [], []
+        for con in constraints:
+            row = np.zeros(len(free))
+            rhs = con.rhs
+            for name, coef in con.coeffs.items():
+                if name in free:
+                    row[free.index(name)] = coef
+                else:
+                    rhs -= coef * getattr(base, name)
+            rhs -= row @ self.lo
+            if con.op == "<=":
+                ub_rows.append(row)
+                ub_rhs.append(rhs)
+            elif con.op == ">=":
+                ub_rows.append(-row)
+                ub_rhs.append(-rhs)
+            elif con.op == "==":
+                eq_rows.append(row)
+                eq_rhs.append(rhs)
+            else:
+                raise ValueError(f"Невідомий оператор обмеження: {con.op}")
+        for i in range(len(free)):
+            row = np.zeros(len(free))
+            row[i] = 1.0
+            ub_rows.append(row)
+            ub_rhs.append(self.hi[i] - self.lo[i])
+        k = len(free)
+        self.a_ub = np.array(ub_rows).reshape(-1, k)
+        self.b_ub = np.array(ub_rhs, dtype=np.float64)
+        self.a_eq = np.array(eq_rows).reshape(-1, k)
+        self.b_eq = np.array(eq_rhs, dtype=np.float64)
+
+        self._columns = {name: getattr(base, name) for name in PARAM_FIELDS}
+
+    def params(self, x: np.ndarray) -> ModelParams:
+        return dataclasses.replace(
+            self.base, **{name: float(v) for name, v in zip(self.free, x)}
+        )
+
+    def totals(self, xs: np.ndarray) -> np.ndarray:
+        columns = dict(self._columns)
+        for i, name in enumerate(self.free):
+            columns[name] = xs[:, i]
+        batch = ModelParamsBatch.from_columns(columns, size=len(xs))
+        return calc_total_batch(apply_extra_items(batch, self.base.extra_items))["total"]
+
+    def gradient(self, x: np.ndarray) -> np.ndarray:
+        grad = calc_total_gradient(self.params(x))
+        return np.array([grad[name] for name in self.free], dtype=np.float64)
+
+    def vertex(self, direction: np.ndarray) -> np.ndarray:
+        z = _simplex(direction, self.a_ub, self.b_ub, self.a_eq, self.b_eq)
+        return np.clip(self.lo + z, self.lo, self.hi)
+
+    def line_search(self, x: np.ndarray, y: np.ndarray) -> Tuple[float, float]:
+        # total(x + t (y - x)) - многочлен степеня <= 4: відновлюємо його за
+        # п'ятьма точками і перевіряємо корені похідної та кінці відрізка
+        nodes = np.linspace(0.0, 1.0, 5)
+        values = self.totals(x + nodes[:, None] * (y - x))
+        poly = np.polyfit(nodes, values, 4)
+        roots = np.roots(np.polyder(poly))
+        roots = roots[np.isreal(roots)].real
+        candidates = np.concatenate([[0.0, 1.0], roots[(roots > 0) & (roots < 1)]])
+        totals = self.totals(x + candidates[:, None] * (y - x))
+        best = int(np.argmin(totals))
+        return float(candidates[best]), float(totals[best])
+
+
+def optimize(
+    base: ModelParams,
+    free: Sequence[str],
+    bounds: Optional[Mapping[str, Tuple[float, float]]] = None,
+    constraints: Sequence[LinearConstraint] = (),
+    couple_p_int: bool = True,
+    max_iter: int = 100,
+    tol: float = 1e-9,
+) -> OptimizationResult:
+    # Мінімізує calc_total(...)["total"] за полями free; інші поля - з base.
+    # bounds: {"Q": (5000, 20000), ...}; за замовчуванням DEFAULT_BOUNDS.
+    problem = _Problem(base, free, bounds or {}, constraints, couple_p_int)
+    if not problem.free:
+        result = calc_total(base)
+        return OptimizationResult(base, result, {}, 0, True, "Немає вільних полів")
+
+    # Початкова допустима точка - вершина для лінеаризації в base
+    x0 = np.array([getattr(base, name) for name in problem.free], dtype=np.float64)
+    x = problem.vertex(problem.gradient(np.clip(x0, problem.lo, problem.hi)))
+    f = float(problem.totals(x[None, :])[0])
+    history = [f]
+    message = "Досягнуто max_iter"
+    success = False
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        grad = problem.gradient(x)
+        y = problem.vertex(grad)
+        gap = grad @ (x - y)
+        if gap <= tol * (1.0 + abs(f)):
+            message = "Оптимум знайдено"
+            success = True
+            break
+        t, f_new = problem.line_search(x, y)
+        if t == 0.0 or f_new >= f - tol * (1.0 + abs(f)):
+            message = "Локальний оптимум (подальше покращення неможливе)"
+            success = True
+            break
+        x = x + t * (y - x)
+        f = f_new
+        history.append(f)
+
+    params = problem.params(x)
+    return OptimizationResult(
+        params=params,
+        result=calc_total(params),
+        x=dict(zip(problem.free, x.tolist())),
+        iterations=iterations,
+        success=success,
+        message=message,
+        history=history,
+    )
+
+
+def pareto_front(
+    base: ModelParams,
+    free: Sequence[str],
+    q_values: Sequence[float],
+    bounds: Optional[Mapping[str, Tuple[float, float]]] = None,
+    constraints: Sequence[LinearConstraint] = (),
+    couple_p_int: bool = True,
+) -> pd.DataFrame:
+    # Мінімальні витрати для кожного обсягу замовлень Q (Q фіксується,
+    # решта вільних полів оптимізуються). Залишаються лише недоміновані
+    # точки: більший Q при не більших витратах.
+    free = [name for name in free if name != "Q"]
+    rows = []
+    for q in q_values:
+        point = dataclasses.replace(base, Q=q)
+        try:
+            opt = optimize(point, free, bounds, constraints, couple_p_int)
+        except InfeasibleError:
+            continue
+        row = {"Q": float(q), **opt.x}
+        row.update(opt.result)
+        row["cost_per_order"] = opt.result["total"] / q if q else np.nan
+        rows.append(row)
+    frame = pd.DataFrame(rows)
+    if frame.empty:
+        return frame
+    frame = frame.sort_values("Q", ascending=False, ignore_index=True)
+    frontier = frame["total"] < frame["total"].cummin().shift(fill_value=np.inf)
+    return frame[frontier].sort_values("Q", ignore_index=True)
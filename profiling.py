@@ -0,0 +1,202 @@
+# Вимірювання гарячих шляхів моделі та app.py (вмикається за потреби).
+#
+# Змінна середовища BAGSHOP_PROFILE визначає режим під час імпорту:
+#   не задана / "0" - вимкнено: @instrument повертає функцію без змін,
+#                     section() - спільний порожній контекст
+#   "1"             - кількість викликів і тривалість
+#   "alloc"         - те саме плюс пікове виділення пам'яті (tracemalloc;
+#                     помітно сповільнює роботу)
+#
+#   BAGSHOP_PROFILE=1 streamlit run app.py
+#
+# Метрики накопичуються в процесі й експортуються у текстовому форматі
+# Prometheus (prometheus_text / write_prometheus, маршрут /metrics у
+# service.py) або як таблиця (snapshot) для панелі в app.py.
+import contextlib
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+_MODE = os.environ.get("BAGSHOP_PROFILE", "").strip().lower()
+_ENABLED = _MODE not in ("", "0", "false", "no")
+_ALLOCATIONS = _MODE == "alloc"
+
+_NULL = contextlib.nullcontext()
+
+
+@dataclass
+class Metric:
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    alloc_bytes: int = 0        # сума пікових виділень за виклики
+    max_alloc_bytes: int = 0
+
+
+_metrics: Dict[str, Metric] = {}
+_lock = threading.Lock()
+# стек вкладених вимірювань пам'яті: [початок, найбільший пік усередині]
+_frames = threading.local()
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def enable(allocations: bool = False) -> None:
+    # Має бути викликано до імпорту модулів з @instrument
+    global _ENABLED, _ALLOCATIONS
+    _ENABLED, _ALLOCATIONS = True, allocations
+
+
+def _record(name: str, seconds: float, alloc: int) -> None:
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Metric()
+        metric.calls += 1
+        metric.seconds += seconds
+        metric.max_seconds = max(metric.max_seconds, seconds)
+        metric.alloc_bytes += alloc
+        metric.max_alloc_bytes = max(metric.max_alloc_bytes, alloc)
+
+
+def _alloc_start() -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    stack = getattr(_frames, "stack", None)
+    if stack is None:
+        stack = _frames.stack = []
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        # reset_peak нижче зітре пік зовнішнього вимірювання - зберігаємо його
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    stack.append([current, current])
+
+
+def _alloc_stop() -> int:
+    stack = _frames.stack
+    start, inner_peak = stack.pop()
+    peak = max(inner_peak, tracemalloc.get_traced_memory()[1])
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    return peak - start
+
+
+@contextlib.contextmanager
+def _measure(name: str):
+    allocations = _ALLOCATIONS
+    if allocations:
+        _alloc_start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _record(name, seconds, _alloc_stop() if allocations else 0)
+
+
+def section(name: str):
+    # with section("app.chart"): ... ; без профілювання - порожній контекст
+    if not _ENABLED:
+        return _NULL
+    return _measure(name)
+
+
+def begin(name: str):
+    # Для ділянок, які незручно обгортати в with: token = begin(...); end(token)
+    if not _ENABLED:
+        return None
+    measure = _measure(name)
+    measure.__enter__()
+    return measure
+
+
+def end(token) -> None:
+    if token is not None:
+        token.__exit__(None, None, None)
+
+
+def instrument(fn: Optional[Callable] = None, *, name: Optional[str] = None):
+    # Декоратор; якщо профілювання вимкнене під час імпорту, функція
+    # повертається без обгортки, тож накладних витрат немає зовсім
+    if fn is None:
+        return functools.partial(instrument, name=name)
+    if not _ENABLED:
+        return fn
+    metric_name = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _measure(metric_name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def reset() -> None:
+    with _lock:
+        _metrics.clear()
+
+
+def snapshot():
+    # pandas.DataFrame з метриками, впорядкований за сумарним часом
+    import pandas as pd
+
+    with _lock:
+        rows = [
+            {
+                "name": name,
+                "calls": m.calls,
+                "seconds": m.seconds,
+                "mean_seconds": m.seconds / m.calls if m.calls else 0.0,
+                "max_seconds": m.max_seconds,
+                "alloc_bytes": m.alloc_bytes,
+                "max_alloc_bytes": m.max_alloc_bytes,
+            }
+            for name, m in _metrics.items()
+        ]
+    columns = ["name", "calls", "seconds", "mean_seconds", "max_seconds",
+               "alloc_bytes", "max_alloc_bytes"]
+    frame = pd.DataFrame(rows, columns=columns)
+    return frame.sort_values("seconds", ascending=False, ignore_index=True)
+
+
+_PROMETHEUS = (
+    ("bagshop_calls_total", "counter", "Кількість викликів", "calls"),
+    ("bagshop_seconds_total", "counter", "Сумарний час виконання, с", "seconds"),
+    ("bagshop_seconds_max", "gauge", "Найдовший виклик, с", "max_seconds"),
+    ("bagshop_alloc_bytes_total", "counter", "Сума пікових виділень пам'яті, байт",
+     "alloc_bytes"),
+    ("bagshop_alloc_bytes_max", "gauge", "Найбільше пікове виділення, байт",
+     "max_alloc_bytes"),
+)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    with _lock:
+        items = sorted(_metrics.items())
+        lines: List[str] = []
+        for metric, kind, help_text, attr in _PROMETHEUS:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, m in items:
+                lines.append(f'{metric}{{name="{_label(name)}"}} {getattr(m, attr)}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str) -> None:
+    # Атомарний запис (для textfile collector у node_exporter)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(prometheus_text())
+    os.replace(tmp, path)
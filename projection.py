@@ -0,0 +1,284 @@
+# Прогноз витрат на кілька періодів (місяці або квартали).
+#
+# ModelParams описує один період. Для прогнозу параметри кожного
+# сценарію розгортаються в масиви форми (сценарії × періоди): Q зростає
+# на заданий відсоток за період, return_rate множиться на сезонний
+# профіль, staff_fixed переходить на новий рівень, коли Q періоду
+# досягає порогу. Витрати рахуються тими самими calc_* за один
+# векторизований прохід по всій матриці.
+#
+# Додаткові показники з базою per_order / per_return / percent_of_revenue
+# залежать від Q, return_rate і avg_check періоду, тому для кожного
+# періоду перераховуються за каталогом статей сценарію:
+# extra_drivers(періоди) @ extra_coefficients(статті). Власні статті
+# (formulas.py) обчислюються набором формул сценарію на параметрах і
+# статтях кожного періоду. Сценарії, чиї суми додаткових показників не
+# пояснюються каталогом і формулами (лише зведені суми, бібліотека без
+# формул), переносять ці суми в кожен період без змін і позначаються в
+# Projection.approximate.
+import math
+from dataclasses import dataclass, fields
+from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from formulas import FormulaSet
+from model_transaction_costs import (
+    EXTRA_BASES,
+    EXTRA_KINDS,
+    KIND_CODES,
+    RESULT_FIELDS,
+    ModelParams,
+    ModelParamsBatch,
+    calc_total_batch,
+    extra_coefficients,
+    extra_drivers,
+)
+
+# Відносна похибка, за якої суми пакета вважаються поясненими каталогом
+_RESIDUAL_RTOL = 1e-9
+
+# Довжина сезонного циклу в періодах
+_SEASON_LENGTH = {"month": 12, "quarter": 4}
+_PANDAS_FREQ = {"month": "M", "quarter": "Q"}
+
+
+@dataclass(frozen=True)
+class StaffStep:
+    # Якщо Q періоду >= threshold, staff_fixed цього періоду = staff_fixed
+    threshold: float
+    staff_fixed: float
+
+
+@dataclass(frozen=True)
+class ProjectionSpec:
+    periods: int = 12
+    period: str = "month"                     # "month" або "quarter"
+    q_growth: float = 0.0                     # приріст Q за період (частка)
+    return_seasonality: Sequence[float] = ()  # множники return_rate по сезону
+    staff_steps: Sequence[StaffStep] = ()
+    start: Optional[str] = None               # перший період, напр. "2025-01"
+
+
+@dataclass
+class Projection:
+    periods: pd.Index
+    params: ModelParamsBatch            # поля - масиви (сценарії × періоди)
+    per_period: Dict[str, np.ndarray]   # ключі RESULT_FIELDS, (сценарії × періоди)
+    # сценарії, частина додаткових показників яких не перераховується по
+    # періодах (сталі суми базового періоду)
+    approximate: np.ndarray
+
+    def __len__(self) -> int:
+        return self.params.Q.shape[0]
+
+    def cumulative(self) -> Dict[str, np.ndarray]:
+        return {name: np.cumsum(values, axis=1) for name, values in self.per_period.items()}
+
+    def totals(self) -> Dict[str, np.ndarray]:
+        # Сума за весь горизонт для кожного сценарію
+        return {name: values.sum(axis=1) for name, values in self.per_period.items()}
+
+    def frame(self, scenario: int = 0, cumulative: bool = False) -> pd.DataFrame:
+        # Статті витрат одного сценарію по періодах
+        data = self.cumulative() if cumulative else self.per_period
+        return pd.DataFrame(
+            {name: data[name][scenario] for name in RESULT_FIELDS}, index=self.periods
+        )
+
+    def metric_frame(
+        self,
+        metric: str = "total",
+        cumulative: bool = False,
+        names: Optional[Sequence] = None,
+    ) -> pd.DataFrame:
+        # Одна метрика: рядки - періоди, колонки - сценарії
+        values = self.per_period[metric]
+        if cumulative:
+            values = np.cumsum(values, axis=1)
+        columns = list(names) if names is not None else list(range(1, len(self) + 1))
+        return pd.DataFrame(values.T, index=self.periods, columns=columns)
+
+
+def seasonal_profile(amplitude: float, peak: int = 0, length: int = 12) -> np.ndarray:
+    # Косинусний профіль 1 ± amplitude з максимумом у періоді peak
+    t = np.arange(length)
+    return 1.0 + amplitude * np.cos(2 * math.pi * (t - peak) / length)
+
+
+def period_index(spec: ProjectionSpec) -> pd.Index:
+    if spec.period not in _SEASON_LENGTH:
+        raise ValueError(f"Невідомий період: {spec.period}")
+    if spec.start is not None:
+        return pd.period_range(spec.start, periods=spec.periods, freq=_PANDAS_FREQ[spec.period])
+    return pd.RangeIndex(1, spec.periods + 1, name="Період")
+
+
+def catalog_coefficients(
+    catalogs: Sequence[Optional[Sequence]], n: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Коефіцієнти extra_coefficients для кожного сценарію (сценарії × бази
+    # × kind) і маска сценаріїв, для яких каталог відомий (None - лише
+    # зведені суми extra_cost / extra_revenue пакета). Спільний каталог
+    # (той самий об'єкт) обробляється один раз.
+    if len(catalogs) != n:
+        raise ValueError(f"Очікується {n} каталогів статей, отримано {len(catalogs)}")
+    coefficients = np.zeros((n, len(EXTRA_BASES), len(EXTRA_KINDS)))
+    known = np.zeros(n, dtype=bool)
+    cache: Dict[int, np.ndarray] = {}
+    for i, items in enumerate(catalogs):
+        if items is None:
+            continue
+        table = cache.get(id(items))
+        if table is None:
+            table = cache[id(items)] = extra_coefficients(items)
+        coefficients[i] = table
+        known[i] = True
+    return coefficients, known
+
+
+def expand(
+    batch: ModelParamsBatch,
+    spec: ProjectionSpec,
+    overrides: Optional[Mapping[str, object]] = None,
+    extra_items: Optional[Sequence[Optional[Sequence]]] = None,
+    formulas: Optional[Sequence[Optional[FormulaSet]]] = None,
+) -> ModelParamsBatch:
+    # Розгортає пакет сценаріїв у параметри (сценарії × періоди).
+    # overrides - явні значення полів по періодах: масиви форми (періоди,)
+    # або (сценарії × періоди); мають пріоритет над spec.
+    # extra_items - каталоги статей сценаріїв: extra_cost / extra_revenue
+    # перераховуються для кожного періоду; без каталогу (None) лишаються
+    # сумами базового періоду, як і те, що понад каталог. formulas - набори
+    # формул сценаріїв: для сценарію з каталогом і набором суми пакета
+    # містять власні статті, тож у розгорнутих параметрах лишаються тільки
+    # статті каталогу (власні статті додає project).
+    return _expand(batch, spec, overrides, extra_items, formulas)[0]
+
+
+def _expand(
+    batch: ModelParamsBatch,
+    spec: ProjectionSpec,
+    overrides: Optional[Mapping[str, object]],
+    extra_items: Optional[Sequence[Optional[Sequence]]],
+    formulas: Optional[Sequence[Optional[FormulaSet]]],
+) -> Tuple[ModelParamsBatch, np.ndarray, np.ndarray]:
+    # Розгорнуті параметри, маска наближених сценаріїв і маска сценаріїв,
+    # власні статті яких треба обчислити по періодах
+    n, p = len(batch), spec.periods
+    shape = (n, p)
+    t = np.arange(p)
+    columns = {
+        f.name: np.broadcast_to(getattr(batch, f.name)[:, None], shape)
+        for f in fields(batch)
+    }
+
+    columns["Q"] = batch.Q[:, None] * (1.0 + spec.q_growth) ** t
+
+    if len(spec.return_seasonality):
+        season = np.asarray(spec.return_seasonality, dtype=np.float64)
+        factors = season[t % len(season)]
+        columns["return_rate"] = np.clip(batch.return_rate[:, None] * factors, 0.0, 1.0)
+
+    if spec.staff_steps:
+        steps = sorted(spec.staff_steps, key=lambda s: s.threshold)
+        thresholds = np.array([s.threshold for s in steps], dtype=np.float64)
+        levels = np.array([s.staff_fixed for s in steps], dtype=np.float64)
+        # номер останнього досягнутого порогу (0 - жодного)
+        step = np.searchsorted(thresholds, columns["Q"], side="right")
+        reached = levels[np.maximum(step - 1, 0)]
+        columns["staff_fixed"] = np.where(step > 0, reached, batch.staff_fixed[:, None])
+
+    for name, values in (overrides or {}).items():
+        if name not in columns:
+            raise ValueError(f"Невідоме поле: {name}")
+        columns[name] = np.broadcast_to(np.asarray(values, dtype=np.float64), shape)
+
+    expanded = ModelParamsBatch(**{name: np.ascontiguousarray(v) for name, v in columns.items()})
+    approximate = np.zeros(n, dtype=bool)
+    if extra_items is not None:
+        coefficients, known = catalog_coefficients(extra_items, n)
+    else:
+        coefficients, known = None, np.zeros(n, dtype=bool)
+    # власні статті сценаріїв з каталогом і набором формул додає project
+    evaluated = known & _formula_mask(formulas, n)
+    base = np.zeros((n, len(EXTRA_KINDS)))
+    if known.any():
+        # (сценарії × періоди × бази) @ (сценарії × бази × kind)
+        totals = np.einsum("npb,nbk->npk", extra_drivers(expanded), coefficients)
+        base = np.einsum("nb,nbk->nk", extra_drivers(batch), coefficients)
+    for name, kind in (("extra_cost", "cost"), ("extra_revenue", "revenue")):
+        if name in (overrides or {}):
+            continue
+        k = KIND_CODES[kind]
+        values = getattr(batch, name)
+        # сталі суми: без каталогу - уся сума пакета, з каталогом без
+        # формул - те, що каталог не пояснює
+        held = np.where(evaluated, 0.0, values - base[:, k])
+        approximate |= np.abs(held) > _RESIDUAL_RTOL * np.maximum(np.abs(values), 1.0)
+        if known.any():
+            setattr(expanded, name, np.where(
+                known[:, None], totals[..., k] + held[:, None], getattr(expanded, name)
+            ))
+    return expanded, approximate, evaluated
+
+
+def _formula_mask(formulas: Optional[Sequence[Optional[FormulaSet]]], n: int) -> np.ndarray:
+    # Сценарії, для яких задано набір формул
+    if formulas is None:
+        return np.zeros(n, dtype=bool)
+    if len(formulas) != n:
+        raise ValueError(f"Очікується {n} наборів формул, отримано {len(formulas)}")
+    return np.fromiter((f is not None for f in formulas), bool, n)
+
+
+def project(
+    scenarios: Union[ModelParams, Sequence[ModelParams], ModelParamsBatch],
+    spec: ProjectionSpec,
+    overrides: Optional[Mapping[str, object]] = None,
+    extra_items: Optional[Sequence[Optional[Sequence]]] = None,
+    formulas: Optional[Sequence[Optional[FormulaSet]]] = None,
+) -> Projection:
+    # Для ModelParamsBatch каталоги статей передаються в extra_items
+    # (у самому пакеті - лише суми базового періоду). formulas - набір
+    # формул кожного сценарію (None - без власних статей)
+    if isinstance(scenarios, ModelParams):
+        scenarios = [scenarios]
+    if not isinstance(scenarios, ModelParamsBatch):
+        extra_items = [p.extra_items for p in scenarios]
+        scenarios = ModelParamsBatch.from_params(scenarios)
+    params, approximate, evaluated = _expand(scenarios, spec, overrides, extra_items, formulas)
+    result = calc_total_batch(params)
+    per_period = {
+        name: np.ascontiguousarray(np.broadcast_to(result[name], params.Q.shape))
+        for name in RESULT_FIELDS
+    }
+    if evaluated.any():
+        _add_formulas(params, per_period, formulas, evaluated)
+    return Projection(
+        periods=period_index(spec), params=params, per_period=per_period,
+        approximate=approximate,
+    )
+
+
+def _add_formulas(
+    params: ModelParamsBatch,
+    per_period: Dict[str, np.ndarray],
+    formulas: Sequence[Optional[FormulaSet]],
+    evaluated: np.ndarray,
+) -> None:
+    # Власні статті по періодах: кожен набір формул (той самий об'єкт)
+    # обчислюється один раз на рядках своїх сценаріїв (сценарії × періоди)
+    groups: Dict[int, Tuple[FormulaSet, list]] = {}
+    for i in np.flatnonzero(evaluated).tolist():
+        groups.setdefault(id(formulas[i]), (formulas[i], []))[1].append(i)
+    changed = ("extra_cost", "extra_revenue", "extra_net", "total")
+    for name in changed:
+        per_period[name] = np.array(per_period[name])
+    for formula_set, rows in groups.values():
+        rows = np.asarray(rows)
+        subset = ModelParamsBatch(**{name: v[rows] for name, v in vars(params).items()})
+        result = formula_set.extend(subset, {name: v[rows] for name, v in per_period.items()})
+        for name in changed:
+            per_period[name][rows] = result[name]
@@ -0,0 +1,624 @@
+# Звіти PDF / XLSX для наборів сценаріїв (для керівництва, без браузера).
+#
+# Документ містить висновок (той самий текст, що й в app.py), графік
+# залежності загальних витрат від обраного показника, таблицю порівняння
+# та розбивку витрат кожного сценарію. Для app.py - write_pdf / write_xlsx
+# над ScenarioStore; для сотень наборів (магазинів, груп сценаріїв) -
+# render_reports або командний рядок:
+#
+#   python reports.py scenarios.csv reports/ --group-by store --workers 8
+#   python reports.py scenarios.jsonl reports/ --group-size 20 --format xlsx
+#
+# Вхідний файл - у форматі batch_runner.py; з --group-by рядки однієї
+# групи мають іти підряд. Групи читаються блоками й передаються в пул
+# процесів (у польоті не більше 2 * workers документів), кожен процес
+# пише документ одразу на диск. Шрифт із кирилицею (DejaVu Sans, Arial
+# або BAGSHOP_REPORT_FONT) один раз урізається до потрібних символів
+# (латиниця, кирилиця, пунктуація) і кешується на диску: fpdf2 розбирає
+# шрифт для кожного PDF, і повний TTF займав би більшість часу документа.
+import argparse
+import datetime
+import functools
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from downsampling import lttb
+from model_transaction_costs import RESULT_FIELDS, ModelParamsBatch, calc_total_batch
+from scenario_store import (
+    COMPARISON_COLUMNS,
+    PLOT_COLUMNS,
+    Scenario,
+    ScenarioStore,
+    describe_item,
+)
+
+FORMATS = ("pdf", "xlsx")
+DEFAULT_X_METRIC = "Частка онлайн оплат, %"
+Y_METRIC = "Разом, грн"
+
+# Точок на графіку звіту (довші ряди проріджуються LTTB)
+CHART_POINTS = 1000
+
+# Колонки таблиці порівняння в PDF (повна таблиця - у XLSX)
+PDF_COMPARISON = (
+    "Q (замовлення)",
+    "Середній чек, грн",
+    "Логістика, грн",
+    "Платіжні сервіси, грн",
+    "Маркетинг, грн",
+    "Персонал, грн",
+    "Додаткові, грн",
+    "Разом, грн",
+)
+
+# Шрифти з кирилицею: (звичайний, жирний)
+FONT_CANDIDATES = (
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+     "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/TTF/DejaVuSans.ttf", "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf"),
+    ("/Library/Fonts/Arial Unicode.ttf", "/Library/Fonts/Arial Unicode.ttf"),
+    ("C:\\Windows\\Fonts\\arial.ttf", "C:\\Windows\\Fonts\\arialbd.ttf"),
+)
+
+# Символи, що лишаються в кешованому шрифті
+FONT_UNICODES = (
+    list(range(0x20, 0x7F))         # латиниця
+    + list(range(0xA0, 0x180))      # Latin-1, Latin Extended-A
+    + list(range(0x400, 0x530))     # кирилиця
+    + list(range(0x2010, 0x205F))   # тире, лапки, три крапки
+    + [0x20B4, 0x2116, 0x2212]      # ₴, №, мінус
+)
+
+_COUNT_FIELDS = ("Q", "n_new_customers")
+_SHARE_FIELDS = ("p_loc", "p_int", "return_rate", "online_share")
+_PLOT_FIELDS = {label: (name, scale) for label, name, scale in PLOT_COLUMNS}
+
+
+# --- ТЕКСТ І ТАБЛИЦІ (спільні з app.py) ---
+
+
+def breakdown_rows(result: Dict[str, float]) -> List[Tuple[str, float]]:
+    # Рядки таблиці "Стаття - сума" для одного сценарію
+    rows = [
+        ("Логістика", result["logistics"]),
+        ("Платіжні сервіси", result["payments"]),
+        ("Маркетинг", result["marketing"]),
+        ("Персонал", result["staff"]),
+    ]
+    if result["extra_net"] != 0:
+        rows.append(("Додаткові показники", result["extra_net"]))
+        # власні статті (formulas.py) входять до додаткових показників
+        rows += [
+            (f"у т.ч. {name}", value)
+            for name, value in result.items() if name not in RESULT_FIELDS
+        ]
+    rows.append(("Разом", result["total"]))
+    return rows
+
+
+def conclusion_text(base: Scenario, best: Scenario) -> str:
+    # Висновок (markdown: **жирний**) порівняно з базовим сценарієм
+    best_total = best.result["total"]
+    diff = base.result["total"] - best_total
+
+    text = []
+    text.append(
+        f"Найменші трансакційні витрати отримано у **сценарії №{best.id}** "
+        f"із загальною сумою **{best_total:.2f} грн**."
+    )
+
+    if diff > 0:
+        text.append(
+            f"Порівняно з базовим сценарієм №{base.id}, економія становить "
+            f"**{diff:.2f} грн**, що свідчить про доцільність впровадження "
+            f"відповідних змін у параметрах моделі."
+        )
+    elif diff < 0:
+        text.append(
+            f"Порівняно з базовим сценарієм №{base.id}, витрати зросли на "
+            f"**{-diff:.2f} грн**, тобто запропоновані зміни є економічно "
+            f"недоцільними."
+        )
+    else:
+        text.append(
+            "Загальні витрати збігаються з базовим сценарієм, тобто суттєвий "
+            "економічний ефект від змін параметрів відсутній."
+        )
+
+    p = best.params
+    text.append(
+        "Найкращий сценарій характеризується такими ключовими параметрами: "
+        f"кількість замовлень – {p.Q}, середній чек – {p.avg_check:.2f} грн, "
+        f"частка локальних доставок – {p.p_loc:.2f}, рівень повернень – "
+        f"{p.return_rate:.3f}, частка онлайн-оплат – {p.online_share:.2f}, "
+        f"ставка комісії платіжного сервісу – {p.pay_commission * 100:.2f} %, "
+        f"кількість нових клієнтів – {p.n_new_customers}, CAC – {p.cac:.2f} грн, "
+        f"фіксовані витрати на персонал – {p.staff_fixed:.2f} грн, "
+        f"змінні витрати на обробку одного замовлення – "
+        f"{p.staff_per_order:.2f} грн."
+    )
+    # Додатковий показник
+    if p.extra_items:
+        extra_parts = [describe_item(item) for item in p.extra_items]
+        text.append(
+            "У найкращому сценарії додатково враховано такі показники: "
+            + "; ".join(extra_parts)
+            + "."
+        )
+
+    text.append(
+        "Таким чином, обраний сценарій забезпечує більш вигідне поєднання "
+        "обсягу замовлень, структури доставки, рівня повернень, вартості "
+        "залучення клієнтів та витрат на персонал, що в результаті знижує "
+        "загальну суму трансакційних витрат інтернет-магазину BagShop."
+    )
+    return "\n\n".join(text)
+
+
+def store_conclusion(store: ScenarioStore) -> str:
+    return conclusion_text(store[0], store.best())
+
+
+def chart_points(store: ScenarioStore, x_metric: str, budget: int = CHART_POINTS):
+    # (x, y) графіка залежності "Разом, грн" від x_metric, впорядковані за x
+    x_name, x_scale = _PLOT_FIELDS[x_metric]
+    y_name, y_scale = _PLOT_FIELDS[Y_METRIC]
+    order = store.order_by(x_name)
+    x = store.column(x_name)[order]
+    y = store.column(y_name)[order]
+    if len(order) > budget:
+        picked = lttb(x, y, budget)
+        x, y = x[picked], y[picked]
+    return x * x_scale, y * y_scale
+
+
+def _paragraphs(text: str) -> List[List[Tuple[str, bool]]]:
+    # Абзаци markdown як частини (текст, жирний)
+    return [
+        [(part, i % 2 == 1) for i, part in enumerate(paragraph.split("**")) if part]
+        for paragraph in text.split("\n\n")
+    ]
+
+
+# --- PDF ---
+
+
+@functools.lru_cache(maxsize=1)
+def font_files() -> Tuple[str, str]:
+    # Шрифт із кирилицею (шукається один раз на процес)
+    custom = os.environ.get("BAGSHOP_REPORT_FONT")
+    if custom:
+        bold = os.environ.get("BAGSHOP_REPORT_FONT_BOLD", custom)
+        return custom, bold
+    for regular, bold in FONT_CANDIDATES:
+        if os.path.exists(regular):
+            return regular, bold if os.path.exists(bold) else regular
+    raise RuntimeError(
+        "Не знайдено шрифту з кирилицею; вкажіть TTF-файл у BAGSHOP_REPORT_FONT"
+    )
+
+
+def _subset_font(path: str) -> str:
+    # Урізаний шрифт у тимчасовому каталозі (спільний для процесів)
+    stat = os.stat(path)
+    digest = hashlib.blake2b(
+        f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=8
+    ).hexdigest()
+    cache_dir = os.path.join(tempfile.gettempdir(), "bagshop-report-fonts")
+    target = os.path.join(cache_dir, f"{digest}.ttf")
+    if os.path.exists(target):
+        return target
+    from fontTools import subset, ttLib
+
+    options = subset.Options(notdef_outline=True, recommended_glyphs=True)
+    options.layout_features = []
+    options.drop_tables += ["GSUB", "GPOS", "GDEF", "hdmx", "FFTM"]
+    font = ttLib.TTFont(path, recalcTimestamp=False)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=FONT_UNICODES)
+    subsetter.subset(font)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    font.save(tmp)
+    os.replace(tmp, target)
+    return target
+
+
+@functools.lru_cache(maxsize=1)
+def compiled_fonts() -> Tuple[str, str]:
+    # (звичайний, жирний) урізані шрифти; один раз на процес
+    _fpdf()
+    regular, bold = font_files()
+    return _subset_font(regular), _subset_font(bold)
+
+
+def _fpdf():
+    try:
+        import fpdf
+    except ImportError as e:
+        raise ImportError("Для PDF-звітів потрібен пакет fpdf2") from e
+    return fpdf
+
+
+def _table(pdf, header: Sequence[str], rows: Iterable[Sequence[str]], widths: Sequence[float]):
+    # Таблиця з повтором заголовка на кожній сторінці
+    def head():
+        pdf.set_font(style="B")
+        for text, width in zip(header, widths):
+            pdf.cell(width, 6, text, border=1, align="C")
+        pdf.ln(6)
+        pdf.set_font(style="")
+
+    head()
+    for row in rows:
+        if pdf.will_page_break(5):
+            pdf.add_page()
+            head()
+        for i, (text, width) in enumerate(zip(row, widths)):
+            pdf.cell(width, 5, text, border=1, align="L" if i == 0 else "R")
+        pdf.ln(5)
+
+
+def _chart(pdf, x: np.ndarray, y: np.ndarray, x_metric: str, height: float = 80.0):
+    # Лінійний графік примітивами PDF: рамка, підписи меж осей, ламана
+    if pdf.will_page_break(height + 12):
+        pdf.add_page()
+    left = pdf.l_margin + 22
+    top = pdf.get_y() + 2
+    width = pdf.epw - 24
+    pdf.set_draw_color(120)
+    pdf.rect(left, top, width, height)
+    x_lo, x_hi = float(x.min()), float(x.max())
+    y_lo, y_hi = float(y.min()), float(y.max())
+    x_span = (x_hi - x_lo) or 1.0
+    y_span = (y_hi - y_lo) or 1.0
+    px = left + (x - x_lo) / x_span * width
+    py = top + height - (y - y_lo) / y_span * height
+    pdf.set_draw_color(31, 119, 180)
+    pdf.set_line_width(0.4)
+    pdf.polyline(list(zip(px.tolist(), py.tolist())))
+    pdf.set_line_width(0.2)
+    pdf.set_draw_color(0)
+
+    pdf.set_font(size=7)
+    for value, pos in ((y_hi, top), (y_lo, top + height - 3)):
+        pdf.set_xy(pdf.l_margin, pos)
+        pdf.cell(20, 3, f"{value:.0f}", align="R")
+    for value, pos, align in ((x_lo, left, "L"), (x_hi, left + width - 30, "R")):
+        pdf.set_xy(pos, top + height + 1)
+        pdf.cell(30, 3, f"{value:.2f}", align=align)
+    pdf.set_xy(left, top + height + 1)
+    pdf.cell(width, 3, x_metric, align="C")
+    pdf.set_font(size=9)
+    pdf.set_y(top + height + 8)
+
+
+def write_pdf(
+    store: ScenarioStore, path: str, title: str, x_metric: str = DEFAULT_X_METRIC
+) -> None:
+    fpdf = _fpdf()
+    regular, bold = compiled_fonts()
+    pdf = fpdf.FPDF(orientation="L", format="A4")
+    pdf.set_auto_page_break(True, margin=12)
+    pdf.add_font("Report", "", regular)
+    pdf.add_font("Report", "B", bold)
+    pdf.set_title(title)
+    pdf.add_page()
+
+    pdf.set_font("Report", "B", 14)
+    pdf.cell(0, 8, title, new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Report", "", 9)
+    pdf.cell(0, 5, f"Сформовано {datetime.date.today():%d.%m.%Y}; сценаріїв: {len(store)}",
+             new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(2)
+
+    pdf.set_font("Report", "B", 11)
+    pdf.cell(0, 6, "Висновок", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Report", "", 9)
+    for paragraph in store_conclusion(store).split("\n\n"):
+        pdf.multi_cell(0, 4.5, paragraph, markdown=True, new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(1)
+
+    if len(store) > 1:
+        pdf.ln(2)
+        pdf.set_font("Report", "B", 11)
+        pdf.cell(0, 6, f"Залежність «{Y_METRIC}» від «{x_metric}»",
+                 new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Report", "", 9)
+        x, y = chart_points(store, x_metric)
+        _chart(pdf, x, y, x_metric)
+
+    pdf.set_font("Report", "B", 11)
+    pdf.cell(0, 6, "Порівняння сценаріїв", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Report", "", 7)
+    columns = {label: (name, scale) for label, name, scale in COMPARISON_COLUMNS}
+    values = [store.column(columns[label][0]) * columns[label][1] for label in PDF_COMPARISON]
+    ids = store.ids.tolist()
+    rows = (
+        [str(ids[i])] + [
+            f"{v[i]:.0f}" if columns[label][0] in _COUNT_FIELDS else f"{v[i]:.2f}"
+            for label, v in zip(PDF_COMPARISON, values)
+        ]
+        for i in range(len(store))
+    )
+    widths = [17] + [(pdf.epw - 17) / len(PDF_COMPARISON)] * len(PDF_COMPARISON)
+    _table(pdf, ["Сценарій", *PDF_COMPARISON], rows, widths)
+
+    pdf.ln(4)
+    pdf.set_font("Report", "B", 11)
+    pdf.cell(0, 6, "Розбивка витрат за сценаріями", new_x="LMARGIN", new_y="NEXT")
+    for scenario in store:
+        rows = breakdown_rows(scenario.result)
+        if pdf.will_page_break(6 * (len(rows) + 2)):
+            pdf.add_page()
+        pdf.set_font("Report", "B", 9)
+        pdf.cell(0, 6, f"Сценарій №{scenario.id}", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Report", "", 8)
+        _table(pdf, ["Стаття", "Сума, грн"],
+               ((label, f"{value:.2f}") for label, value in rows), (70, 35))
+        pdf.ln(2)
+
+    pdf.output(path)
+
+
+# --- XLSX ---
+
+
+def _xlsxwriter():
+    try:
+        import xlsxwriter
+    except ImportError as e:
+        raise ImportError("Для XLSX-звітів потрібен пакет XlsxWriter") from e
+    return xlsxwriter
+
+
+def _number_format(name: str) -> str:
+    if name in _COUNT_FIELDS:
+        return "0"
+    if name in _SHARE_FIELDS:
+        return "0.000"
+    return "#,##0.00"
+
+
+def write_xlsx(
+    store: ScenarioStore, path: str, title: str, x_metric: str = DEFAULT_X_METRIC
+) -> None:
+    # constant_memory: рядки кожного аркуша пишуться по порядку й одразу
+    # скидаються на диск, тож пам'ять не залежить від кількості сценаріїв
+    xlsxwriter = _xlsxwriter()
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        bold = workbook.add_format({"bold": True})
+        heading = workbook.add_format({"bold": True, "font_size": 14})
+        wrap = workbook.add_format({"text_wrap": True, "valign": "top"})
+        formats = {}
+
+        sheet = workbook.add_worksheet("Висновок")
+        sheet.set_column(0, 0, 120)
+        sheet.write(0, 0, title, heading)
+        sheet.write(1, 0, f"Сформовано {datetime.date.today():%d.%m.%Y}; сценаріїв: {len(store)}")
+        for row, parts in enumerate(_paragraphs(store_conclusion(store)), start=3):
+            if len(parts) == 1:
+                sheet.write(row, 0, parts[0][0], wrap)
+            else:
+                pieces = []
+                for text, is_bold in parts:
+                    pieces += [bold, text] if is_bold else [text]
+                sheet.write_rich_string(row, 0, *pieces, wrap)
+
+        sheet = workbook.add_worksheet("Порівняння")
+        sheet.freeze_panes(1, 1)
+        sheet.write(0, 0, "Сценарій", bold)
+        columns = []
+        for col, (label, name, scale) in enumerate(COMPARISON_COLUMNS, start=1):
+            sheet.write(0, col, label, bold)
+            sheet.set_column(col, col, 16)
+            values = store.column(name)
+            if name == "extras":
+                columns.append((values.tolist(), None))
+            else:
+                if name not in formats:
+                    formats[name] = workbook.add_format({"num_format": _number_format(name)})
+                columns.append(((values * scale).tolist(), formats[name]))
+        for i, scenario_id in enumerate(store.ids.tolist()):
+            sheet.write_number(i + 1, 0, scenario_id)
+            for col, (values, fmt) in enumerate(columns, start=1):
+                sheet.write(i + 1, col, values[i], fmt)
+
+        sheet = workbook.add_worksheet("Статті")
+        money = workbook.add_format({"num_format": "#,##0.00"})
+        sheet.set_column(1, 1, 28)
+        sheet.set_column(2, 2, 16)
+        for col, label in enumerate(("Сценарій", "Стаття", "Сума, грн")):
+            sheet.write(0, col, label, bold)
+        row = 1
+        for scenario in store:
+            for label, value in breakdown_rows(scenario.result):
+                sheet.write_number(row, 0, scenario.id)
+                sheet.write_string(row, 1, label)
+                sheet.write_number(row, 2, value, money)
+                row += 1
+
+        if len(store) > 1:
+            sheet = workbook.add_worksheet("Графік")
+            x, y = chart_points(store, x_metric)
+            sheet.write_row(0, 0, (x_metric, Y_METRIC), bold)
+            chart = workbook.add_chart({"type": "scatter", "subtype": "straight"})
+            chart.add_series({
+                "name": Y_METRIC,
+                "categories": ["Графік", 1, 0, len(x), 0],
+                "values": ["Графік", 1, 1, len(x), 1],
+            })
+            chart.set_title({"name": f"Залежність «{Y_METRIC}» від «{x_metric}»"})
+            chart.set_x_axis({"name": x_metric})
+            chart.set_y_axis({"name": Y_METRIC})
+            chart.set_legend({"none": True})
+            chart.set_size({"width": 900, "height": 480})
+            sheet.insert_chart(0, 3, chart)
+            for i, (xi, yi) in enumerate(zip(x.tolist(), y.tolist()), start=1):
+                sheet.write_number(i, 0, xi)
+                sheet.write_number(i, 1, yi)
+    finally:
+        workbook.close()
+
+
+_WRITERS = {"pdf": write_pdf, "xlsx": write_xlsx}
+
+
+# --- ПАКЕТНЕ ФОРМУВАННЯ ---
+
+
+@dataclass
+class ReportJob:
+    # Один документ: набір сценаріїв (колонками, як у ScenarioStore.extend)
+    name: str
+    batch: ModelParamsBatch
+    result: Dict[str, np.ndarray]
+
+
+def file_name(name: str) -> str:
+    # Назва документа -> безпечна назва файлу (кирилиця зберігається)
+    return re.sub(r"[^\w.-]+", "_", name).strip("._") or "report"
+
+
+def render_job(
+    job: ReportJob, out_dir: str, formats: Sequence[str] = FORMATS,
+    x_metric: str = DEFAULT_X_METRIC,
+) -> List[str]:
+    store = ScenarioStore(capacity=max(len(job.batch), 1))
+    store.extend(job.batch, job.result)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{file_name(job.name)}.{fmt}")
+        _WRITERS[fmt](store, path, job.name, x_metric)
+        paths.append(path)
+    return paths
+
+
+def _init_worker() -> None:
+    # Один раз на процес: шрифти та імпорт бібліотек
+    compiled_fonts()
+    _xlsxwriter()
+
+
+def _render(args) -> List[str]:
+    return render_job(*args)
+
+
+def render_reports(
+    jobs: Iterable[ReportJob],
+    out_dir: str,
+    formats: Sequence[str] = FORMATS,
+    workers: int = 1,
+    x_metric: str = DEFAULT_X_METRIC,
+) -> Iterator[List[str]]:
+    # Формує документи (у пулі процесів при workers > 1) і повертає шляхи
+    # файлів кожного документа в порядку jobs
+    unknown = [fmt for fmt in formats if fmt not in _WRITERS]
+    if unknown:
+        raise ValueError(f"Невідомий формат звіту: {', '.join(unknown)}")
+    if x_metric not in _PLOT_FIELDS:
+        raise ValueError(f"Невідомий показник графіка: {x_metric}")
+    os.makedirs(out_dir, exist_ok=True)
+    if workers <= 1:
+        for job in jobs:
+            yield render_job(job, out_dir, formats, x_metric)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = []
+        for job in jobs:
+            pending.append(pool.submit(_render, (job, out_dir, formats, x_metric)))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _slice(batch: ModelParamsBatch, rows) -> ModelParamsBatch:
+    return ModelParamsBatch(**{
+        name: values[rows] for name, values in vars(batch).items()
+    })
+
+
+def read_jobs(
+    path: str,
+    group_by: Optional[str] = None,
+    group_size: int = 1,
+    chunk_size: int = 10_000,
+) -> Iterator[ReportJob]:
+    # Документи з файлу batch_runner.py: за значенням колонки group_by
+    # (рядки групи - підряд) або по group_size рядків
+    from batch_runner import parse_chunk, read_raw_chunks
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    carry: List[Tuple[ModelParamsBatch, np.ndarray]] = []
+    carry_key = None
+    first_row = 0
+
+    def job(key, parts) -> ReportJob:
+        batch = parts[0] if len(parts) == 1 else ModelParamsBatch(**{
+            name: np.concatenate([vars(p)[name] for p in parts]) for name in vars(parts[0])
+        })
+        return ReportJob(str(key), batch, calc_total_batch(batch))
+
+    for header, data, _, _ in read_raw_chunks(path, chunk_size):
+        batch, frame = parse_chunk(header, data)
+        if group_by is not None:
+            if group_by not in frame:
+                raise ValueError(f"У файлі немає колонки {group_by}")
+            keys = frame[group_by].astype(str).to_numpy()
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            bounds = np.r_[starts, len(keys)]
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                key = keys[start]
+                if carry and key != carry_key:
+                    yield job(carry_key, carry)
+                    carry = []
+                carry_key = key
+                carry.append(_slice(batch, slice(start, stop)))
+        else:
+            for start in range(0, len(batch), group_size):
+                stop = min(start + group_size, len(batch))
+                yield job(f"{stem}_{first_row + start + 1:06d}", [_slice(batch, slice(start, stop))])
+            first_row += len(batch)
+    if carry:
+        yield job(carry_key, carry)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Звіти PDF / XLSX для сценаріїв")
+    parser.add_argument("input", help="CSV або JSONL у форматі batch_runner.py")
+    parser.add_argument("output", help="каталог для документів")
+    parser.add_argument("--group-by", help="колонка, що визначає документ (магазин тощо)")
+    parser.add_argument("--group-size", type=int, default=1,
+                        help="сценаріїв у документі, якщо немає --group-by")
+    parser.add_argument("--format", choices=FORMATS, action="append",
+                        help="формат (можна кілька; за замовчуванням обидва)")
+    parser.add_argument("--x", default=DEFAULT_X_METRIC, help="показник по осі X графіка")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    documents = 0
+    jobs = read_jobs(args.input, args.group_by, args.group_size)
+    for _ in render_reports(jobs, args.output, args.format or FORMATS, args.workers, args.x):
+        documents += 1
+        if documents % 100 == 0:
+            print(f"{documents} документів, {time.perf_counter() - started:.1f} с",
+                  file=sys.stderr)
+    print(f"Готово: {documents} документів за {time.perf_counter() - started:.1f} с",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+# Колонкове сховище сценаріїв для app.py.
+#
+# Вхідні параметри і результати зберігаються як типізовані масиви numpy,
+# що лише доповнюються (ємність подвоюється). Найкращий сценарій та
+# впорядкування за метриками підтримуються інкрементально, а таблиці
+# порівняння і графіка будуються з колонок без проходу по рядках у Python
+# і кешуються до наступної зміни сховища. Для тисяч сценаріїв select і
+# comparison_page дають відфільтровану, впорядковану сторінку таблиці, не
+# формуючи решту рядків.
+import bisect
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from formulas import FormulaSet
+from model_transaction_costs import (
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ExtraItem,
+    ModelParams,
+    ModelParamsBatch,
+)
+
+# (назва колонки, поле ModelParams / результату, множник)
+COMPARISON_COLUMNS: Tuple[Tuple[str, str, float], ...] = (
+    ("Q (замовлення)", "Q", 1.0),
+    ("Середній чек, грн", "avg_check", 1.0),
+    ("Частка локальних доставок", "p_loc", 1.0),
+    ("Частка міжобласних", "p_int", 1.0),
+    ("Рівень повернень", "return_rate", 1.0),
+    ("Вартість локальної доставк., грн", "c_loc", 1.0),
+    ("Вартість міжобласної доставк., грн", "c_int", 1.0),
+    ("Повернення локал., грн", "c_ret_loc", 1.0),
+    ("Повернення міжобл., грн", "c_ret_int", 1.0),
+    ("Частка онлайн оплат", "online_share", 1.0),
+    ("Комісія платіжного сервісу, %", "pay_commission", 100.0),
+    ("Залучені клієнти", "n_new_customers", 1.0),
+    ("CAC, грн", "cac", 1.0),
+    ("Фіксовані витрати персонал, грн", "staff_fixed", 1.0),
+    ("Змінні витрати на замовлення, грн", "staff_per_order", 1.0),
+    ("Додаткові показники", "extras", 1.0),
+    ("Логістика, грн", "logistics", 1.0),
+    ("Платіжні сервіси, грн", "payments", 1.0),
+    ("Маркетинг, грн", "marketing", 1.0),
+    ("Персонал, грн", "staff", 1.0),
+    ("Додаткові, грн", "extra_net", 1.0),
+    ("Разом, грн", "total", 1.0),
+)
+
+PLOT_COLUMNS: Tuple[Tuple[str, str, float], ...] = (
+    ("Q (замовлення)", "Q", 1.0),
+    ("Середній чек, грн", "avg_check", 1.0),
+    ("Частка локальних доставок", "p_loc", 1.0),
+    ("Частка міжобласних", "p_int", 1.0),
+    ("Рівень повернень, %", "return_rate", 100.0),
+    ("Частка онлайн оплат, %", "online_share", 100.0),
+    ("Комісія платіжного сервісу, %", "pay_commission", 100.0),
+    ("Залучені клієнти", "n_new_customers", 1.0),
+    ("CAC, грн", "cac", 1.0),
+    ("Фіксовані витрати персонал, грн", "staff_fixed", 1.0),
+    ("Змінні витрати на замовлення, грн", "staff_per_order", 1.0),
+    ("Логістика, грн", "logistics", 1.0),
+    ("Платіжні сервіси, грн", "payments", 1.0),
+    ("Маркетинг, грн", "marketing", 1.0),
+    ("Персонал, грн", "staff", 1.0),
+    ("Додаткові, грн", "extra_net", 1.0),
+    ("Разом, грн", "total", 1.0),
+)
+
+# Цілочисельні поля ModelParams (у сховищі - float64, щоб не втратити
+# дробові значення від оптимізатора чи перебору сітки)
+_INT_FIELDS = ("Q", "n_new_customers")
+
+# Зведені суми статей сценаріїв, доданих пакетом (extend)
+_SUMMARY_FIELDS = ("_items_cost", "_items_revenue")
+
+# Більші пакети не вставляються в індекси впорядкування поелементно
+_INCREMENTAL_LIMIT = 64
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    id: int
+    params: ModelParams
+    result: Dict[str, float]
+
+
+# Одиниці суми статті за базою нарахування
+EXTRA_UNITS = {
+    "flat": "грн",
+    "per_order": "грн/замовл.",
+    "per_return": "грн/поверн.",
+    "percent_of_revenue": "% виручки",
+}
+
+
+def describe_item(item: ExtraItem) -> str:
+    mark = "+" if item.kind == "cost" else "-"
+    return f"{item.name} ({mark}{item.amount:.2f} {EXTRA_UNITS[item.basis]})"
+
+
+def describe_extras(
+    items: Sequence[ExtraItem], components: Optional[Dict[str, float]] = None
+) -> str:
+    # components - значення власних статей (formulas.py)
+    parts = [describe_item(item) for item in items]
+    parts += [f"{name} = {value:.2f}" for name, value in (components or {}).items()]
+    return "; ".join(parts) if parts else "-"
+
+
+def _resized(values: np.ndarray, size: int, capacity: int) -> np.ndarray:
+    # Новий масив ємності capacity з першими size значеннями (np.resize
+    # заповнює весь масив повторами, що для мільйонів рядків помітно)
+    out = np.empty(capacity, dtype=values.dtype)
+    out[:size] = values[:size]
+    return out
+
+
+class ScenarioStore:
+    def __init__(self, capacity: int = 64):
+        self._size = 0
+        self._capacity = capacity
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._columns: Dict[str, np.ndarray] = {}
+        for name in PARAM_FIELDS + RESULT_FIELDS + _SUMMARY_FIELDS:
+            self._columns[name] = np.empty(capacity, dtype=np.float64)
+        # Статті сценаріїв; None - сценарій із пакета, статті якого зведені
+        # до сум _SUMMARY_FIELDS і створюються лише на вимогу
+        self._extras: List[Optional[Tuple[ExtraItem, ...]]] = []
+        # значення власних статей (ключі результату поза RESULT_FIELDS)
+        self._components: List[Optional[Dict[str, float]]] = []
+        # набори формул, якими обчислено власні статті (для прогнозу)
+        self._formulas: List[Optional[FormulaSet]] = []
+        # текст колонки "Додаткові показники"; None - ще не сформовано
+        self._extras_text = np.empty(capacity, dtype=object)
+        self._best = -1
+        # метрика -> (відсортовані значення, позиції рядків)
+        self._order: Dict[str, Tuple[List[float], List[int]]] = {}
+        # ті самі позиції масивом (до наступної зміни сховища)
+        self._order_rows: Dict[str, np.ndarray] = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._version = 0
+        self._token = uuid.uuid4().hex
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self) -> Iterator[Scenario]:
+        for i in range(self._size):
+            yield self[i]
+
+    def __getitem__(self, i: int) -> Scenario:
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("Сценарію з таким номером немає")
+        return Scenario(int(self._ids[i]), self.params(i), self.result(i))
+
+    @property
+    def version(self) -> int:
+        # Зростає при кожній зміні; зручно як ключ кешування
+        return self._version
+
+    @property
+    def key(self) -> str:
+        # Унікальний для вмісту сховища ключ (для st.cache_data тощо)
+        return f"{self._token}:{self._version}"
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size]
+
+    def column(self, name: str) -> np.ndarray:
+        if name == "extras":
+            return self._describe_pending()
+        return self._columns[name][:self._size]
+
+    def _items(self, i: int) -> Tuple[ExtraItem, ...]:
+        items = self._extras[i]
+        if isinstance(items, list):
+            items = self._extras[i] = tuple(items)
+        elif items is None:
+            items = []
+            cost = self._columns["_items_cost"][i].item()
+            revenue = self._columns["_items_revenue"][i].item()
+            if cost:
+                items.append(ExtraItem("extra_cost", "cost", cost))
+            if revenue:
+                items.append(ExtraItem("extra_revenue", "revenue", revenue))
+            items = self._extras[i] = tuple(items)
+        return items
+
+    def _describe_pending(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        # Формує текст для сценаріїв з пакетів (усіх або лише rows); рядки
+        # без статей - "-" без проходу в Python (важливо для мільйонів
+        # сценаріїв з бібліотеки)
+        text = self._extras_text[:self._size]
+        selected = text if rows is None else text[rows]
+        pending = np.flatnonzero(pd.isna(selected))
+        if rows is not None:
+            pending = rows[pending]
+        if len(pending):
+            cost = self._columns["_items_cost"][pending]
+            revenue = self._columns["_items_revenue"][pending]
+            empty = (cost == 0) & (revenue == 0)
+            plain = np.fromiter(
+                (self._components[i] is None for i in pending), bool, len(pending)
+            )
+            text[pending[empty & plain]] = "-"
+            for i in pending[~(empty & plain)].tolist():
+                text[i] = describe_extras(self._items(i), self._components[i])
+        return text if rows is None else text[rows]
+
+    def params(self, i: int) -> ModelParams:
+        values = {name: self._columns[name][i].item() for name in PARAM_FIELDS}
+        for name in _INT_FIELDS:
+            if values[name].is_integer():
+                values[name] = int(values[name])
+        return ModelParams(**values, extra_items=list(self._items(i)))
+
+    def extra_catalogs(self) -> List[Optional[Sequence[ExtraItem]]]:
+        # Каталоги статей сценаріїв; None - лише зведені суми (extend без
+        # extra_items)
+        return self._extras[:self._size]
+
+    def formula_sets(self) -> List[Optional[FormulaSet]]:
+        # Набори формул сценаріїв; None - без формул або невідомий (пакет,
+        # бібліотека)
+        return self._formulas[:self._size]
+
+    def batch(self) -> ModelParamsBatch:
+        # Усі сценарії як ModelParamsBatch (додаткові показники - сумами)
+        columns = {name: self.column(name) for name in PARAM_FIELDS}
+        columns["extra_cost"] = self.column("extra_cost")
+        columns["extra_revenue"] = self.column("extra_revenue")
+        return ModelParamsBatch.from_columns(columns, size=self._size)
+
+    def result(self, i: int) -> Dict[str, float]:
+        result = {name: self._columns[name][i].item() for name in RESULT_FIELDS}
+        result.update(self._components[i] or {})
+        return result
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, 2 * self._capacity)
+        self._ids = _resized(self._ids, self._size, capacity)
+        self._extras_text = _resized(self._extras_text, self._size, capacity)
+        for name, values in self._columns.items():
+            self._columns[name] = _resized(values, self._size, capacity)
+        self._capacity = capacity
+
+    def append(
+        self,
+        params: ModelParams,
+        result: Dict[str, float],
+        formulas: Optional[FormulaSet] = None,
+    ) -> int:
+        # Додає сценарій і повертає його номер (нумерація з 1); formulas -
+        # набір, яким обчислено власні статті result
+        i = self._size
+        self._grow(i + 1)
+        scenario_id = i + 1
+        self._ids[i] = scenario_id
+        for name in PARAM_FIELDS:
+            self._columns[name][i] = getattr(params, name)
+        for name in RESULT_FIELDS:
+            self._columns[name][i] = result[name]
+        items = tuple(params.extra_items)
+        components = {
+            name: float(value) for name, value in result.items() if name not in RESULT_FIELDS
+        }
+        self._columns["_items_cost"][i] = 0.0
+        self._columns["_items_revenue"][i] = 0.0
+        self._extras.append(items)
+        self._components.append(components)
+        self._formulas.append(formulas)
+        self._extras_text[i] = describe_extras(items, components)
+        self._size += 1
+        self._after_append(i, i + 1)
+        return scenario_id
+
+    def extend(
+        self,
+        batch: ModelParamsBatch,
+        result: Dict[str, np.ndarray],
+        extra_items: Optional[Sequence[Optional[Sequence[ExtraItem]]]] = None,
+        components: Optional[Sequence[Optional[Dict[str, float]]]] = None,
+        formulas: Optional[FormulaSet] = None,
+    ) -> np.ndarray:
+        # Пакетне додавання (наприклад, результатів перебору сітки).
+        # Додаткові показники зберігаються двома зведеними статтями, якщо
+        # для рядка не передано extra_items (None - теж зведені).
+        # components - значення власних статей кожного рядка (замість
+        # спільних колонок result поза RESULT_FIELDS); formulas - спільний
+        # набір формул пакета.
+        n = len(batch)
+        start = self._size
+        self._grow(start + n)
+        self._ids[start:start + n] = np.arange(start + 1, start + n + 1)
+        for name in PARAM_FIELDS:
+            self._columns[name][start:start + n] = getattr(batch, name)
+        for name in RESULT_FIELDS:
+            self._columns[name][start:start + n] = result[name]
+        self._columns["_items_cost"][start:start + n] = batch.extra_cost
+        self._columns["_items_revenue"][start:start + n] = batch.extra_revenue
+        custom = {
+            name: np.broadcast_to(values, (n,)).tolist()
+            for name, values in result.items() if name not in RESULT_FIELDS
+        }
+        if components is not None:
+            self._components.extend(components)
+        elif custom:
+            self._components.extend(
+                {name: values[i] for name, values in custom.items()} for i in range(n)
+            )
+        else:
+            self._components.extend([None] * n)
+        self._formulas.extend([formulas] * n)
+        if extra_items is None:
+            self._extras.extend([None] * n)
+        else:
+            # списки статей перетворюються на кортежі лише при зверненні (_items)
+            self._extras.extend(extra_items)
+        self._extras_text[start:start + n] = None
+        self._size += n
+        self._after_append(start, start + n)
+        return self._ids[start:start + n]
+
+    def _after_append(self, start: int, stop: int) -> None:
+        totals = self._columns["total"]
+        new_best = start + int(np.argmin(totals[start:stop]))
+        if self._best < 0 or totals[new_best] < totals[self._best]:
+            self._best = new_best
+        if stop - start > _INCREMENTAL_LIMIT:
+            # великі пакети дешевше впорядкувати заново при наступному запиті
+            self._order.clear()
+        for metric, (values, rows) in self._order.items():
+            column = self.column(metric)
+            for i in range(start, stop):
+                pos = bisect.bisect_right(values, column[i])
+                values.insert(pos, column[i])
+                rows.insert(pos, i)
+        self._order_rows.clear()
+        self._frames.clear()
+        self._version += 1
+
+    def clear(self) -> None:
+        self.__init__(self._capacity)
+
+    def best(self) -> Optional[Scenario]:
+        # Сценарій з найменшим total (при рівності - перший)
+        if self._best < 0:
+            return None
+        return self[self._best]
+
+    def order_by(self, metric: str, ascending: bool = True) -> np.ndarray:
+        # Позиції рядків, впорядковані за метрикою. Індекс будується при
+        # першому запиті і далі оновлюється при кожному додаванні.
+        if metric not in self._order:
+            column = self.column(metric)
+            rows = np.argsort(column, kind="stable")
+            self._order[metric] = (column[rows].tolist(), rows.tolist())
+        rows = self._order_rows.get(metric)
+        if rows is None:
+            rows = self._order_rows[metric] = np.asarray(self._order[metric][1], dtype=np.int64)
+        return rows if ascending else rows[::-1]
+
+    def select(
+        self,
+        filters: Optional[Mapping[str, Tuple[Optional[float], Optional[float]]]] = None,
+        sort_by: Optional[str] = None,
+        ascending: bool = True,
+    ) -> np.ndarray:
+        # Позиції рядків, що проходять фільтри {поле: (від, до)} (межі
+        # включно, None - без межі), впорядковані за полем sort_by (None -
+        # за номером сценарію)
+        if sort_by is None:
+            rows = np.arange(self._size)
+            if not ascending:
+                rows = rows[::-1]
+        else:
+            rows = self.order_by(sort_by, ascending)
+        if filters:
+            mask = np.ones(self._size, dtype=bool)
+            for name, (low, high) in filters.items():
+                column = self.column(name)
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+            rows = rows[mask[rows]]
+        return rows
+
+    def _frame(self, key: str, spec: Sequence[Tuple[str, str, float]]) -> pd.DataFrame:
+        frame = self._frames.get(key)
+        if frame is None:
+            data = {}
+            for label, name, scale in spec:
+                values = self.column(name)
+                data[label] = values * scale if scale != 1.0 else values
+            frame = pd.DataFrame(
+                data, index=pd.Index(self.ids, name="Сценарій"), copy=False
+            )
+            self._frames[key] = frame
+        return frame
+
+    def comparison_frame(self) -> pd.DataFrame:
+        # Числова таблиця порівняння; форматування - під час показу
+        return self._frame("comparison", COMPARISON_COLUMNS)
+
+    def comparison_page(self, rows: np.ndarray) -> pd.DataFrame:
+        # Таблиця порівняння лише для рядків rows (наприклад, сторінки з
+        # select); текст додаткових показників формується тільки для них
+        rows = np.asarray(rows, dtype=np.int64)
+        data = {}
+        for label, name, scale in COMPARISON_COLUMNS:
+            if name == "extras":
+                data[label] = self._describe_pending(rows)
+            else:
+                values = self._columns[name][rows]
+                data[label] = values * scale if scale != 1.0 else values
+        return pd.DataFrame(data, index=pd.Index(self._ids[rows], name="Сценарій"), copy=False)
+
+    def plot_frame(self) -> pd.DataFrame:
+        return self._frame("plot", PLOT_COLUMNS)
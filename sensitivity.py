@@ -0,0 +1,140 @@
+# Аналіз чутливості загальних трансакційних витрат до полів ModelParams.
+#
+# tornado - зміна по одному параметру (one-at-a-time) навколо базового
+# сценарію; sobol - індекси Соболя першого порядку і повні за схемою
+# Сальтеллі. Обидва методи рахують усі точки одним calc_total_batch.
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_transaction_costs import (
+    PARAM_FIELDS,
+    ModelParams,
+    ModelParamsBatch,
+    apply_extra_items,
+    calc_total_batch,
+)
+
+# Поля, які варто аналізувати за замовчуванням (p_int похідне від p_loc)
+DEFAULT_FIELDS = tuple(name for name in PARAM_FIELDS if name != "p_int")
+
+
+def _evaluate(
+    base: ModelParams, values: Mapping[str, np.ndarray], size: int
+) -> Dict[str, np.ndarray]:
+    columns = {name: getattr(base, name) for name in PARAM_FIELDS}
+    columns.update(values)
+    if "p_loc" in values and "p_int" not in values:
+        columns["p_int"] = 1.0 - columns["p_loc"]
+    batch = ModelParamsBatch.from_columns(columns, size=size)
+    return calc_total_batch(apply_extra_items(batch, base.extra_items))
+
+
+def relative_bounds(
+    base: ModelParams,
+    fields: Sequence[str] = DEFAULT_FIELDS,
+    rel: float = 0.1,
+) -> Dict[str, Tuple[float, float]]:
+    # Межі ±rel від базового значення; частки не виходять за [0, 1]
+    bounds = {}
+    for name in fields:
+        value = getattr(base, name)
+        low, high = value * (1 - rel), value * (1 + rel)
+        if name in ("p_loc", "p_int", "return_rate", "online_share", "pay_commission"):
+            low, high = max(low, 0.0), min(high, 1.0)
+        bounds[name] = (low, high)
+    return bounds
+
+
+def tornado(
+    base: ModelParams,
+    bounds: Optional[Mapping[str, Tuple[float, float]]] = None,
+    metric: str = "total",
+) -> pd.DataFrame:
+    # Для кожного поля - значення метрики на нижній і верхній межі при
+    # незмінних інших параметрах. Рядки впорядковані за розмахом.
+    if bounds is None:
+        bounds = relative_bounds(base)
+    names = list(bounds)
+    k = len(names)
+    if k == 0:
+        return pd.DataFrame(
+            columns=["field", "low", "high", "metric_low", "metric_high", "base", "swing"]
+        )
+
+    values = {}
+    for i, name in enumerate(names):
+        column = np.full(2 * k, float(getattr(base, name)))
+        column[2 * i] = bounds[name][0]
+        column[2 * i + 1] = bounds[name][1]
+        values[name] = column
+    result = _evaluate(base, values, 2 * k)[metric]
+    base_value = _evaluate(base, {}, 1)[metric][0]
+
+    frame = pd.DataFrame(
+        {
+            "field": names,
+            "low": [bounds[n][0] for n in names],
+            "high": [bounds[n][1] for n in names],
+            "metric_low": result[0::2],
+            "metric_high": result[1::2],
+        }
+    )
+    frame["base"] = base_value
+    frame["swing"] = (frame["metric_high"] - frame["metric_low"]).abs()
+    return frame.sort_values("swing", ascending=False, ignore_index=True)
+
+
+def sobol(
+    base: ModelParams,
+    bounds: Optional[Mapping[str, Tuple[float, float]]] = None,
+    n: int = 4096,
+    seed: int = 0,
+    metrics: Sequence[str] = ("total",),
+) -> pd.DataFrame:
+    # Індекси Соболя (оцінювачі Saltelli 2010 / Jansen) для рівномірних
+    # розподілів у межах bounds. Потребує n * (k + 2) обчислень моделі.
+    # Повертає охайну таблицю: metric, field, S1, ST.
+    if bounds is None:
+        bounds = relative_bounds(base)
+    names = list(bounds)
+    k = len(names)
+    low = np.array([bounds[name][0] for name in names], dtype=np.float64)
+    high = np.array([bounds[name][1] for name in names], dtype=np.float64)
+
+    rng = np.random.default_rng(seed)
+    a = low + (high - low) * rng.random((n, k))
+    b = low + (high - low) * rng.random((n, k))
+
+    # Блоки: A, B, AB_1 ... AB_k (AB_i - матриця A зі стовпцем i з B)
+    stacked = np.empty(((k + 2) * n, k))
+    stacked[:n] = a
+    stacked[n:2 * n] = b
+    for i in range(k):
+        block = stacked[(i + 2) * n:(i + 3) * n]
+        block[:] = a
+        block[:, i] = b[:, i]
+
+    result = _evaluate(
+        base, {name: stacked[:, i] for i, name in enumerate(names)}, len(stacked)
+    )
+
+    rows = []
+    for metric in metrics:
+        y = result[metric]
+        # центрування суттєво зменшує похибку оцінювача S1, коли середнє
+        # витрат набагато більше за їх розкид
+        y = y - y[:2 * n].mean()
+        f_a, f_b = y[:n], y[n:2 * n]
+        var = np.var(y[:2 * n])
+        for i, name in enumerate(names):
+            f_ab = y[(i + 2) * n:(i + 3) * n]
+            if var > 0:
+                s1 = np.mean(f_b * (f_ab - f_a)) / var
+                st = 0.5 * np.mean((f_a - f_ab) ** 2) / var
+            else:
+                s1 = st = 0.0
+            rows.append({"metric": metric, "field": name, "S1": s1, "ST": st})
+    return pd.DataFrame(rows, columns=["metric", "field", "S1", "ST"])
+
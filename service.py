@@ -0,0 +1,318 @@
+# HTTP-сервіс розрахунку трансакційних витрат (без Streamlit).
+#
+# Лише стандартна бібліотека (asyncio) та numpy. Маршрути:
+#   GET  /health      - перевірка доступності
+#   GET  /stats       - кількість запитів і пакетів розрахунку
+#   GET  /metrics     - метрики profiling у форматі Prometheus
+#   POST /calc        - один сценарій (словник полів ModelParams)
+#   POST /calc/batch  - {"scenarios": [...]} -> {"results": [...]}
+#
+# Одиночні запити, що надходять одночасно, об'єднуються в мікропакет і
+# рахуються одним викликом calc_total_batch: запит чекає не довше
+# max_delay або до накопичення max_batch сценаріїв.
+#
+#   python service.py --port 8080
+#   curl -X POST localhost:8080/calc -d @scenario.json
+import argparse
+import asyncio
+import json
+import math
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import profiling
+from model_transaction_costs import (
+    EXTRA_BASES,
+    EXTRA_KINDS,
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ExtraItem,
+    ModelParams,
+    ModelParamsBatch,
+    calc_total_batch,
+)
+
+DEFAULT_MAX_BATCH = 1024
+DEFAULT_MAX_DELAY = 0.001       # с
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def evaluate(scenarios: Sequence[ModelParams]) -> List[Dict[str, float]]:
+    # Один векторизований розрахунок для всіх сценаріїв
+    result = calc_total_batch(ModelParamsBatch.from_params(scenarios))
+    columns = [result[name].tolist() for name in RESULT_FIELDS]
+    return [dict(zip(RESULT_FIELDS, row)) for row in zip(*columns)]
+
+
+@dataclass
+class BatcherStats:
+    requests: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+
+
+class MicroBatcher:
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH, max_delay: float = DEFAULT_MAX_DELAY):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stats = BatcherStats()
+        self._pending: List[Tuple[ModelParams, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Handle] = None
+
+    async def submit(self, params: ModelParams) -> Dict[str, float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((params, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            # max_delay = 0: пакет - усе, що прийшло за один оберт циклу подій
+            if self.max_delay > 0:
+                self._timer = loop.call_later(self.max_delay, self.flush)
+            else:
+                self._timer = loop.call_soon(self.flush)
+        return await future
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        self.stats.requests += len(pending)
+        self.stats.batches += 1
+        self.stats.largest_batch = max(self.stats.largest_batch, len(pending))
+        try:
+            results = evaluate([params for params, _ in pending])
+        except Exception:
+            # помилка одного сценарію не повинна зривати решту пакета:
+            # кожен запит рахується окремо і отримує власний результат
+            self._flush_each(pending)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():   # клієнт міг відключитися
+                future.set_result(result)
+
+    @staticmethod
+    def _flush_each(pending: List[Tuple[ModelParams, asyncio.Future]]) -> None:
+        for params, future in pending:
+            if future.done():
+                continue
+            try:
+                result = evaluate([params])[0]
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+def _number(value, what: str) -> float:
+    # Лише скінченні числа JSON; bool - підклас int, тому перевіряється окремо
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise HTTPError(400, f"{what}: очікується число, отримано {json.dumps(value)}")
+    if not math.isfinite(value):
+        raise HTTPError(400, f"{what}: очікується скінченне число")
+    return float(value)
+
+
+def _text(value, what: str) -> str:
+    if not isinstance(value, str):
+        raise HTTPError(400, f"{what}: очікується рядок")
+    return value
+
+
+def _parse_item(data, index: int) -> ExtraItem:
+    what = f"extra_items[{index}]"
+    if not isinstance(data, dict):
+        raise HTTPError(400, f"{what}: очікується об'єкт")
+    missing = [name for name in ("name", "kind", "amount") if name not in data]
+    if missing:
+        raise HTTPError(400, f"{what}: відсутні поля {', '.join(missing)}")
+    unknown = set(data) - {"name", "kind", "amount", "basis", "category"}
+    if unknown:
+        raise HTTPError(400, f"{what}: невідомі поля {', '.join(sorted(unknown))}")
+    kind = _text(data["kind"], f"{what}.kind")
+    if kind not in EXTRA_KINDS:
+        raise HTTPError(400, f"{what}.kind: очікується одне з {', '.join(EXTRA_KINDS)}")
+    basis = _text(data.get("basis", "flat"), f"{what}.basis")
+    if basis not in EXTRA_BASES:
+        raise HTTPError(400, f"{what}.basis: очікується одне з {', '.join(EXTRA_BASES)}")
+    return ExtraItem(
+        _text(data["name"], f"{what}.name"),
+        kind,
+        _number(data["amount"], f"{what}.amount"),
+        basis,
+        _text(data.get("category", ""), f"{what}.category"),
+    )
+
+
+def _parse_params(data) -> ModelParams:
+    # Повна перевірка тіла запиту: некоректний сценарій - 400 для цього
+    # запиту, а не помилка всього мікропакета
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Очікується об'єкт з полями ModelParams")
+    missing = [name for name in PARAM_FIELDS if name not in data]
+    if missing:
+        raise HTTPError(400, f"Відсутні поля ModelParams: {', '.join(missing)}")
+    unknown = set(data) - set(PARAM_FIELDS) - {"extra_items"}
+    if unknown:
+        raise HTTPError(400, f"Невідомі поля ModelParams: {', '.join(sorted(unknown))}")
+    items = data.get("extra_items") or []
+    if not isinstance(items, list):
+        raise HTTPError(400, "extra_items: очікується список")
+    return ModelParams(
+        **{name: _number(data[name], name) for name in PARAM_FIELDS},
+        extra_items=[_parse_item(item, i) for i, item in enumerate(items)],
+    )
+
+
+class Service:
+    def __init__(self, batcher: Optional[MicroBatcher] = None):
+        self.batcher = batcher or MicroBatcher()
+
+    async def route(self, method: str, path: str, body: bytes):
+        if path == "/health":
+            return {"status": "ok"}
+        if path == "/stats":
+            stats = self.batcher.stats
+            return {
+                "requests": stats.requests,
+                "batches": stats.batches,
+                "largest_batch": stats.largest_batch,
+                "mean_batch": stats.requests / stats.batches if stats.batches else 0.0,
+            }
+        if path == "/metrics":
+            return profiling.prometheus_text()
+        if path not in ("/calc", "/calc/batch"):
+            raise HTTPError(404, f"Невідомий маршрут: {path}")
+        if method != "POST":
+            raise HTTPError(405, "Підтримується лише POST")
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "Некоректний JSON") from None
+
+        if path == "/calc":
+            return await self.batcher.submit(_parse_params(data))
+        scenarios = data.get("scenarios") if isinstance(data, dict) else data
+        if not isinstance(scenarios, list):
+            raise HTTPError(400, "Очікується список scenarios")
+        params = [_parse_params(item) for item in scenarios]
+        return {"results": evaluate(params) if params else []}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # HTTP/1.1 з keep-alive: кілька запитів по одному з'єднанню
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                keep_alive = await self._respond(head, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            # клієнт закрив з'єднання або надіслав завеликі заголовки
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, head: bytes, reader, writer) -> bool:
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, version = lines[0].split(" ", 2)
+        except ValueError:
+            self._write(writer, 400, {"error": "Некоректний рядок запиту"}, False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            self._write(writer, 400, {"error": "Некоректний Content-Length"}, False)
+            return False
+        if length > MAX_BODY_SIZE:
+            self._write(writer, 413, {"error": "Завеликий запит"}, False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+
+        try:
+            status, payload = 200, await self.route(method, path.split("?", 1)[0], body)
+        except HTTPError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        self._write(writer, status, payload, keep_alive)
+        return keep_alive
+
+    @staticmethod
+    def _write(writer, status: int, payload, keep_alive: bool) -> None:
+        # рядок віддається як текст (метрики), решта - як JSON
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode()
+            content_type = "application/json"
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                f"Content-Type: {content_type}; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode()
+            + body
+        )
+
+
+async def serve(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_batch: int = DEFAULT_MAX_BATCH,
+    max_delay: float = DEFAULT_MAX_DELAY,
+) -> None:
+    service = Service(MicroBatcher(max_batch, max_delay))
+    server = await asyncio.start_server(service.handle, host, port, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP-сервіс розрахунку витрат")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument(
+        "--max-delay-ms", type=float, default=DEFAULT_MAX_DELAY * 1000,
+        help="найдовше очікування сусідніх запитів для мікропакета",
+    )
+    args = parser.parse_args()
+    print(f"Сервіс слухає http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch, args.max_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# Потоковий перебір сітки параметрів ModelParams.
+#
+# Декартовий добуток значень обраних полів генерується ліниво, блоками
+# фіксованого розміру. Кожен блок рахується векторизовано, тому пам'ять не
+# залежить від розміру сітки (хоч 10^8 точок). Статті, що не залежать від
+# полів сітки, рахуються один раз (incremental.IncrementalEvaluator).
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from model_transaction_costs import (
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ModelParams,
+    ModelParamsBatch,
+    apply_extra_items,
+)
+from formulas import FormulaSet
+from incremental import IncrementalEvaluator
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+@dataclass
+class SweepChunk:
+    start: int                     # глобальний номер першої точки блоку
+    index: np.ndarray              # глобальні номери точок блоку
+    params: ModelParamsBatch
+    result: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def column(self, name: str) -> np.ndarray:
+        if name in self.result:
+            return self.result[name]
+        return getattr(self.params, name)
+
+    def to_frame(
+        self, axes: Sequence[str], rows: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        if rows is None:
+            rows = slice(None)
+        data = {name: self.column(name)[rows] for name in axes}
+        data.update({name: values[rows] for name, values in self.result.items()})
+        return pd.DataFrame(data, index=pd.Index(self.index[rows], name="point"))
+
+
+class Grid:
+    def __init__(
+        self,
+        base: ModelParams,
+        axes: Mapping[str, Iterable[float]],
+        formulas: Optional[FormulaSet] = None,
+    ):
+        unknown = [name for name in axes if name not in PARAM_FIELDS]
+        if unknown:
+            raise ValueError(f"Невідомі поля ModelParams: {', '.join(unknown)}")
+        self.base = base
+        self.formulas = formulas
+        self.axes = {name: np.asarray(list(values), dtype=np.float64)
+                     for name, values in axes.items()}
+        for name, values in self.axes.items():
+            if values.ndim != 1 or len(values) == 0:
+                raise ValueError(f"Порожній або не одновимірний діапазон для {name}")
+        self.shape = tuple(len(v) for v in self.axes.values())
+        self.size = int(np.prod(self.shape, dtype=np.int64))
+
+        self._extra_items = base.extra_items
+        self._base_columns = {name: getattr(base, name) for name in PARAM_FIELDS}
+        self._changed = list(self.axes)
+        if "p_loc" in self.axes and "p_int" not in self.axes:
+            self._changed.append("p_int")
+        self.evaluator = IncrementalEvaluator(base, formulas)
+
+    def batch(self, start: int, stop: int) -> ModelParamsBatch:
+        flat = np.arange(start, stop, dtype=np.int64)
+        positions = np.unravel_index(flat, self.shape)
+        columns = dict(self._base_columns)
+        for (name, values), pos in zip(self.axes.items(), positions):
+            columns[name] = values[pos]
+        # як і в app.py: частка міжобласних доповнює частку локальних
+        if "p_loc" in self.axes and "p_int" not in self.axes:
+            columns["p_int"] = 1.0 - columns["p_loc"]
+        batch = ModelParamsBatch.from_columns(columns, size=stop - start)
+        # статті на замовлення / % виручки залежать від змінюваних полів
+        return apply_extra_items(batch, self._extra_items)
+
+    def chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[SweepChunk]:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size має бути додатним")
+        for start in range(0, self.size, chunk_size):
+            stop = min(start + chunk_size, self.size)
+            batch = self.batch(start, stop)
+            yield SweepChunk(
+                start=start,
+                index=np.arange(start, stop, dtype=np.int64),
+                params=batch,
+                result=self.evaluator.evaluate_batch(batch, self._changed),
+            )
+
+
+def sweep(
+    base: ModelParams,
+    axes: Mapping[str, Iterable[float]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    formulas: Optional[FormulaSet] = None,
+) -> Iterator[SweepChunk]:
+    # axes: {"Q": range(5000, 20001, 500), "p_loc": np.linspace(0, 1, 21), ...}
+    # Поля, яких немає в axes, беруться з base; formulas - власні статті
+    # (formulas.compile_formulas), їх значення теж потрапляють у result.
+    return Grid(base, axes, formulas).chunks(chunk_size)
+
+
+class TopK:
+    # k найкращих точок за метрикою (за замовчуванням - найменший total)
+    def __init__(self, k: int = 10, metric: str = "total", largest: bool = False):
+        self.k = k
+        self.metric = metric
+        self.largest = largest
+        self._frame: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: SweepChunk, axes: Sequence[str]) -> None:
+        values = chunk.column(self.metric)
+        key = -values if self.largest else values
+        if len(key) > self.k:
+            pick = np.argpartition(key, self.k - 1)[: self.k]
+        else:
+            pick = np.arange(len(key))
+        frame = chunk.to_frame(axes, pick)
+        if self._frame is not None:
+            frame = pd.concat([self._frame, frame])
+        self._frame = frame.sort_values(
+            self.metric, ascending=not self.largest, kind="stable"
+        ).head(self.k)
+
+    def result(self) -> pd.DataFrame:
+        if self._frame is None:
+            return pd.DataFrame()
+        return self._frame
+
+
+class Aggregate:
+    # Кількість, сума, мін/макс, середнє і стандартне відхилення метрик.
+    # Середнє і дисперсія об'єднуються між блоками формулою Чана,
+    # тому результат стабільний і не потребує всієї вибірки в пам'яті.
+    def __init__(self, metrics: Sequence[str] = RESULT_FIELDS):
+        self.metrics = list(metrics)
+        self.count = 0
+        self._sum = np.zeros(len(self.metrics))
+        self._mean = np.zeros(len(self.metrics))
+        self._m2 = np.zeros(len(self.metrics))
+        self._min = np.full(len(self.metrics), np.inf)
+        self._max = np.full(len(self.metrics), -np.inf)
+
+    def update(self, chunk: SweepChunk, axes: Sequence[str]) -> None:
+        values = np.stack([chunk.column(m) for m in self.metrics])
+        n = values.shape[1]
+        if n == 0:
+            return
+        mean = values.mean(axis=1)
+        m2 = ((values - mean[:, None]) ** 2).sum(axis=1)
+        total = self.count + n
+        delta = mean - self._mean
+        self._mean = self._mean + delta * n / total
+        self._m2 = self._m2 + m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self._sum += values.sum(axis=1)
+        self._min = np.minimum(self._min, values.min(axis=1))
+        self._max = np.maximum(self._max, values.max(axis=1))
+
+    def result(self) -> pd.DataFrame:
+        std = np.sqrt(self._m2 / self.count) if self.count else self._m2
+        return pd.DataFrame(
+            {
+                "count": self.count,
+                "sum": self._sum,
+                "min": self._min,
+                "max": self._max,
+                "mean": self._mean,
+                "std": std,
+            },
+            index=pd.Index(self.metrics, name="metric"),
+        )
+
+
+def run_sweep(
+    base: ModelParams,
+    axes: Mapping[str, Iterable[float]],
+    reducers: Sequence[object],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    formulas: Optional[FormulaSet] = None,
+) -> List[object]:
+    # Проганяє всю сітку через редьюсери (TopK, Aggregate або будь-який
+    # об'єкт з методами update(chunk, axes) і result()).
+    grid = Grid(base, axes, formulas)
+    names = list(grid.axes)
+    for chunk in grid.chunks(chunk_size):
+        for reducer in reducers:
+            reducer.update(chunk, names)
+    return [reducer.result() for reducer in reducers]
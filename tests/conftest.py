@@ -0,0 +1,47 @@
+import pytest
+
+from model_transaction_costs import ExtraItem, ModelParams
+
+
+def make_params(extra_items=(), **changes) -> ModelParams:
+    # Значення 2024 року (як default_params в app.py)
+    values = dict(
+        Q=10900,
+        avg_check=870,
+        p_loc=0.30,
+        p_int=0.70,
+        return_rate=0.061,
+        c_loc=45,
+        c_int=50,
+        c_ret_loc=15,
+        c_ret_int=20,
+        online_share=0.50,
+        pay_commission=0.0275,
+        n_new_customers=12308,
+        cac=52,
+        staff_fixed=500000,
+        staff_per_order=22,
+    )
+    values.update(changes)
+    return ModelParams(**values, extra_items=list(extra_items))
+
+
+# Статті на всі бази нарахування й обидва типи
+ALL_BASES_ITEMS = (
+    ExtraItem("Оренда", "cost", 30000.0),
+    ExtraItem("Пакування", "cost", 4.5, "per_order"),
+    ExtraItem("Утилізація", "cost", 12.0, "per_return"),
+    ExtraItem("Роялті", "cost", 1.5, "percent_of_revenue"),
+    ExtraItem("Кешбек партнера", "revenue", 0.4, "percent_of_revenue"),
+    ExtraItem("Субсидія", "revenue", 8000.0),
+)
+
+
+@pytest.fixture
+def base_params() -> ModelParams:
+    return make_params()
+
+
+@pytest.fixture
+def params_with_items() -> ModelParams:
+    return make_params(ALL_BASES_ITEMS)
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from calibration import save_params
+from conftest import make_params
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def test_calibrated_defaults_above_widget_bounds(tmp_path, monkeypatch):
+    # рік журналів: Q і кількість клієнтів більші за типові межі полів
+    path = tmp_path / "calibrated_params.json"
+    save_params(make_params(Q=2500000, n_new_customers=120000, cac=350.0), str(path))
+    monkeypatch.setenv("BAGSHOP_CALIBRATED_PARAMS", str(path))
+    monkeypatch.setenv("BAGSHOP_LIBRARY", str(tmp_path / "library"))
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    assert not at.exception
+    inputs = {widget.label: widget for widget in at.number_input}
+    q = inputs["Кількість замовлень"]
+    assert q.value == 2500000
+    assert q.max >= 2500000
+    assert inputs["Залучені клієнти"].value == 120000
+    assert inputs["CAC (грн)"].value == pytest.approx(350.0)
+
+    [button for button in at.button if button.label == "Розрахувати"][0].click().run()
+    assert not at.exception
+    assert len(at.session_state["scenarios"]) == 1
+    assert at.session_state["scenarios"][0].params.Q == 2500000
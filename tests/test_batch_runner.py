@@ -0,0 +1,92 @@
+import io
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import batch_runner
+from conftest import ALL_BASES_ITEMS, make_params
+from model_transaction_costs import PARAM_FIELDS, calc_total, params_to_dict
+
+
+def _scenarios(n):
+    return [
+        make_params(ALL_BASES_ITEMS if i % 3 == 0 else (), Q=1000 + 100 * i, cac=40 + i % 7)
+        for i in range(n)
+    ]
+
+
+def _write_csv(path, scenarios):
+    rows = []
+    for params in scenarios:
+        data = params_to_dict(params)
+        data["extra_items"] = json.dumps(data["extra_items"], ensure_ascii=False)
+        rows.append(data)
+    pd.DataFrame(rows, columns=list(PARAM_FIELDS) + ["extra_items"]).to_csv(path, index=False)
+
+
+def _check(frame, scenarios):
+    assert list(frame["row"]) == list(range(len(scenarios)))
+    expected = [calc_total(params)["total"] for params in scenarios]
+    assert frame["total"].to_numpy() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("name", ["empty.csv", "empty.jsonl"])
+def test_empty_input(tmp_path, name):
+    source = tmp_path / name
+    source.write_text(",".join(PARAM_FIELDS) + "\n" if name.endswith(".csv") else "")
+    output = tmp_path / "out.csv"
+    log = io.StringIO()
+    assert batch_runner.run(str(source), str(output), chunk_size=10, log=log) == 0
+    assert "100.0%" in log.getvalue()
+    assert not os.path.exists(str(output) + ".checkpoint.json")
+    assert pd.read_csv(output).empty
+
+
+@pytest.mark.parametrize("output_name", ["out.csv", "out.parquet"])
+def test_resume_after_interrupted_run(tmp_path, monkeypatch, output_name):
+    if output_name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    scenarios = _scenarios(25)
+    source = tmp_path / "scenarios.csv"
+    _write_csv(source, scenarios)
+    output = str(tmp_path / output_name)
+    checkpoint = output + ".checkpoint.json"
+
+    evaluate = batch_runner.evaluate_chunk
+    calls = []
+
+    def failing(args):
+        calls.append(args[2])
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return evaluate(args)
+
+    monkeypatch.setattr(batch_runner, "evaluate_chunk", failing)
+    with pytest.raises(KeyboardInterrupt):
+        batch_runner.run(str(source), output, chunk_size=10, log=io.StringIO())
+    state = batch_runner.Checkpoint.load(checkpoint)
+    assert (state.chunks_done, state.rows_done) == (2, 20)
+
+    calls.clear()
+    log = io.StringIO()
+    assert batch_runner.run(str(source), output, chunk_size=10, log=log) == 25
+    # продовження рахує лише останній блок
+    assert calls == [20]
+    assert "Продовження з рядка 20" in log.getvalue()
+    assert not os.path.exists(checkpoint)
+    _check(pd.read_parquet(output) if output.endswith(".parquet") else pd.read_csv(output),
+           scenarios)
+
+
+def test_checkpoint_of_another_run_is_rejected(tmp_path):
+    source = tmp_path / "scenarios.csv"
+    _write_csv(source, _scenarios(5))
+    output = str(tmp_path / "out.csv")
+    batch_runner.Checkpoint(str(source), output, 20, 1, 5).save(output + ".checkpoint.json")
+    with pytest.raises(ValueError):
+        batch_runner.run(str(source), output, chunk_size=10, log=io.StringIO())
+    assert batch_runner.run(str(source), output, chunk_size=10, restart=True,
+                            log=io.StringIO()) == 5
+    _check(pd.read_csv(output), _scenarios(5))
@@ -0,0 +1,84 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from conftest import make_params
+from exact import (
+    EXTRA_KINDS,
+    ROUNDING_MODES,
+    FixedBatch,
+    Rounding,
+    RoundingRules,
+    calc_total_exact,
+    calc_total_kopiykas,
+    decimal_extra_totals,
+    random_batch,
+    reconcile,
+)
+from model_transaction_costs import EXTRA_BASES, ExtraItem, calc_total
+
+RULES = [
+    RoundingRules(*(Rounding(mode, step) for _ in dataclasses.fields(RoundingRules)))
+    for mode in ROUNDING_MODES
+    for step in (1, 100)
+]
+
+
+def _items(seed: int):
+    rng = np.random.default_rng(seed)
+    items = [
+        ExtraItem(f"item{k}", EXTRA_KINDS[k % 2], int(rng.integers(1, 10**6)) / 100, basis)
+        for k, basis in enumerate(EXTRA_BASES * 2)
+        if basis != "percent_of_revenue"
+    ]
+    items += [
+        ExtraItem(f"fee{k}", kind, int(rng.integers(1, 10**6)) / 10**5, "percent_of_revenue")
+        for k, kind in enumerate(EXTRA_KINDS)
+    ]
+    return items
+
+
+@pytest.mark.parametrize("rules", RULES, ids=lambda r: f"{r.unit.mode}/{r.unit.step}")
+def test_reconcile_with_decimal(rules):
+    fixed = FixedBatch.from_batch(random_batch(20000, seed=1))
+    assert reconcile(fixed, rules) == []
+
+
+@pytest.mark.parametrize("rules", RULES, ids=lambda r: f"{r.extra.mode}/{r.extra.step}")
+def test_extra_items_match_decimal(rules):
+    batch = random_batch(300, seed=2)
+    catalogs = [_items(i % 7) for i in range(len(batch))]
+    params = []
+    for i, items in enumerate(catalogs):
+        p = batch.to_params(i)
+        p.extra_items = items
+        params.append(p)
+    fixed = FixedBatch.from_params(params, rules)
+    for i, items in enumerate(catalogs):
+        expected = decimal_extra_totals(fixed, i, items, rules)
+        assert (int(fixed.extra_cost[i]), int(fixed.extra_revenue[i])) == expected
+
+
+def test_shared_catalog_and_empty_rows():
+    items = _items(0)
+    params = [make_params(items), make_params(), make_params(items, Q=20000)]
+    fixed = FixedBatch.from_params(params)
+    assert fixed.extra_cost[1] == fixed.extra_revenue[1] == 0
+    for i in (0, 2):
+        assert (fixed.extra_cost[i], fixed.extra_revenue[i]) == decimal_extra_totals(fixed, i, items)
+
+
+def test_kopiykas_close_to_float(params_with_items):
+    exact = calc_total_kopiykas(params_with_items)
+    approx = calc_total(params_with_items)
+    assert all(isinstance(v, int) for v in exact.values())
+    # різниця - лише від округлень до копійки на кожному кроці
+    assert exact["total"] / 100 == pytest.approx(approx["total"], abs=5.0)
+
+
+def test_overflow_is_reported():
+    fixed = FixedBatch.from_batch(random_batch(3))
+    fixed.Q = fixed.Q * 10**9
+    with pytest.raises(OverflowError):
+        calc_total_exact(fixed)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from conftest import ALL_BASES_ITEMS, make_params
+from formulas import Formula, FormulaError, compile_formulas
+from model_transaction_costs import ModelParamsBatch
+
+FORMULAS = [
+    Formula("packaging", "Q * 4.5"),
+    Formula("fx_fees", "payments * p_int * 0.015"),
+    Formula("insurance", "max(0, (logistics + packaging) * 0.002 - 1000)"),
+    Formula("cashback", "Q * online_share * avg_check * 0.01", "revenue"),
+    Formula("scaled", "min(Q, 12000, n_new_customers) ** 2 / 1000 + abs(-cac) * 2 ** -1"),
+    Formula("per_extra", "extra_cost * 0.01 - extra_revenue / 2"),
+]
+
+
+def _scenarios(n: int):
+    rng = np.random.default_rng(0)
+    return [
+        make_params(
+            ALL_BASES_ITEMS if i % 2 else (),
+            Q=int(rng.integers(1000, 20000)),
+            avg_check=float(rng.uniform(300, 2000)),
+            p_loc=(p := float(rng.uniform(0, 1))),
+            p_int=1 - p,
+            online_share=float(rng.uniform(0, 1)),
+            cac=float(rng.uniform(10, 100)),
+            n_new_customers=int(rng.integers(0, 20000)),
+        )
+        for i in range(n)
+    ]
+
+
+def test_scalar_and_vector_kernels_agree():
+    formula_set = compile_formulas(FORMULAS)
+    scenarios = _scenarios(50)
+    batch = formula_set.calc_total_batch(ModelParamsBatch.from_params(scenarios))
+    for i, params in enumerate(scenarios):
+        scalar = formula_set.calc_total(params)
+        for name, value in scalar.items():
+            assert batch[name][i] == pytest.approx(value, rel=1e-12), name
+
+
+def test_constant_formula_broadcasts_in_batch():
+    formula_set = compile_formulas([Formula("rent", "1000 * 12")])
+    batch = formula_set.calc_total_batch(ModelParamsBatch.from_params(_scenarios(3)))
+    np.testing.assert_array_equal(batch["rent"], 12000.0)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["Q ** Q ** Q", "9 ** 9 ** 9", "Q ** Q", "2 ** 11", "Q ** -(11)", "__import__('os')", "Q.real"],
+)
+def test_rejected_expressions(expression):
+    with pytest.raises(FormulaError):
+        compile_formulas([Formula("x", expression)])
+
+
+def test_scalar_kernel_uses_float_arithmetic():
+    formula_set = compile_formulas([Formula("big", "Q ** 10 * 10 ** 10")])
+    assert isinstance(formula_set.calc_total(make_params())["big"], float)
+    overflow = compile_formulas([Formula("huge", "(Q ** 10) ** 10")])
+    with pytest.raises(FormulaError):
+        overflow.calc_total(make_params())
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(FormulaError, match="Циклічна"):
+        compile_formulas([Formula("a", "b + 1"), Formula("b", "a * 2")])
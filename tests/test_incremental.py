@@ -0,0 +1,96 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from conftest import make_params
+from formulas import Formula, compile_formulas
+from incremental import FORMULAS, IncrementalEvaluator
+from model_transaction_costs import (
+    ExtraItem,
+    ModelParamsBatch,
+    apply_extra_items,
+    calc_total,
+    calc_total_batch,
+)
+
+
+def _counts(evaluator, changes):
+    evaluator.reset_counts()
+    result = evaluator.evaluate(changes)
+    return result, set(evaluator.recomputed), set(evaluator.reused)
+
+
+def test_cac_recomputes_only_marketing(params_with_items):
+    evaluator = IncrementalEvaluator(params_with_items)
+    result, recomputed, reused = _counts(evaluator, {"cac": 60})
+    assert recomputed == {"marketing"}
+    assert reused == {"logistics", "payments", "staff", "extra"}
+    expected = calc_total(dataclasses.replace(params_with_items, cac=60))
+    assert result == pytest.approx(expected)
+
+
+def test_q_recomputes_per_order_extras(params_with_items):
+    evaluator = IncrementalEvaluator(params_with_items)
+    result, recomputed, reused = _counts(evaluator, {"Q": 12000})
+    assert recomputed == {"logistics", "payments", "staff", "extra"}
+    assert reused == {"marketing"}
+    assert result == pytest.approx(calc_total(dataclasses.replace(params_with_items, Q=12000)))
+
+
+def test_flat_extras_do_not_depend_on_q():
+    base = make_params([ExtraItem("Оренда", "cost", 30000.0)])
+    _, recomputed, _ = _counts(IncrementalEvaluator(base), {"Q": 12000})
+    assert "extra" not in recomputed
+    # лише частка повернень: статті на повернення - так, фіксовані - ні
+    base = make_params([ExtraItem("Утилізація", "cost", 12.0, "per_return")])
+    _, recomputed, _ = _counts(IncrementalEvaluator(base), {"return_rate": 0.08})
+    assert recomputed == {"logistics", "extra"}
+
+
+def test_unchanged_reuses_everything(params_with_items):
+    evaluator = IncrementalEvaluator(params_with_items)
+    result, recomputed, reused = _counts(evaluator, {})
+    assert not recomputed
+    assert result == pytest.approx(calc_total(params_with_items))
+
+
+def test_formulas_follow_their_inputs(params_with_items):
+    formula_set = compile_formulas([Formula("fx_fees", "payments * p_int * 0.015")])
+    evaluator = IncrementalEvaluator(params_with_items, formula_set)
+    result, recomputed, _ = _counts(evaluator, {"cac": 60})
+    assert FORMULAS not in recomputed
+    expected = formula_set.calc_total(dataclasses.replace(params_with_items, cac=60))
+    assert result == pytest.approx(expected)
+    result, recomputed, _ = _counts(evaluator, {"online_share": 0.7})
+    assert recomputed == {"payments", FORMULAS}
+    expected = formula_set.calc_total(dataclasses.replace(params_with_items, online_share=0.7))
+    assert result == pytest.approx(expected)
+
+
+def test_batch_matches_full_evaluation(params_with_items):
+    cac = np.linspace(20, 80, 7)
+    q = np.linspace(5000, 15000, 7)
+    base = ModelParamsBatch.from_params([params_with_items] * 7)
+    batch = apply_extra_items(
+        dataclasses.replace(base, cac=cac, Q=q), params_with_items.extra_items
+    )
+    evaluator = IncrementalEvaluator(params_with_items)
+    evaluator.reset_counts()
+    result = evaluator.evaluate_batch(batch, ["cac", "Q"])
+    assert set(evaluator.recomputed) == {"logistics", "payments", "marketing", "staff", "extra"}
+    expected = calc_total_batch(batch)
+    for name, values in expected.items():
+        np.testing.assert_allclose(result[name], values)
+
+
+def test_batch_cac_only_broadcasts_reused(params_with_items):
+    evaluator = IncrementalEvaluator(params_with_items)
+    base = ModelParamsBatch.from_params([params_with_items] * 5)
+    batch = dataclasses.replace(base, cac=np.linspace(20, 80, 5))
+    evaluator.reset_counts()
+    result = evaluator.evaluate_batch(batch, ["cac"])
+    assert set(evaluator.recomputed) == {"marketing"}
+    # незмінні статті - перегляд без копіювання
+    assert result["logistics"].strides == (0,)
+    np.testing.assert_allclose(result["total"], calc_total_batch(batch)["total"])
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from conftest import ALL_BASES_ITEMS, make_params
+from formulas import Formula, compile_formulas
+from library import ScenarioLibrary
+from model_transaction_costs import ExtraItem, ModelParamsBatch, calc_total, calc_total_batch
+
+
+@pytest.fixture
+def library(tmp_path):
+    lib = ScenarioLibrary(str(tmp_path / "library"))
+    yield lib
+    lib.close()
+
+
+def test_formula_results_do_not_collide(library):
+    params = make_params(ALL_BASES_ITEMS)
+    formula_set = compile_formulas([Formula("packaging", "Q * 4.5")])
+    plain_key = library.save(params, calc_total(params), name="без формул")
+    formula_key = library.save(params, formula_set.calc_total(params), name="з формулами")
+    assert plain_key != formula_key
+    assert len(library) == 2
+    # повторне збереження того самого результату - той самий ключ
+    assert library.save(params, formula_set.calc_total(params)) == formula_key
+    assert len(library) == 2
+
+    _, result = library.get(formula_key)
+    assert result["packaging"] == pytest.approx(params.Q * 4.5)
+    _, plain = library.get(plain_key)
+    assert "packaging" not in plain
+
+
+def test_components_survive_load_and_compact(library):
+    params = make_params(ALL_BASES_ITEMS)
+    formula_set = compile_formulas([Formula("packaging", "Q * 4.5")])
+    expected = formula_set.calc_total(params)
+    key = library.save(params, expected)
+    for _ in range(2):
+        store = library.to_store()
+        assert store[0].result == pytest.approx(expected)
+        assert library.to_store([key])[0].result == pytest.approx(expected)
+        library.compact()
+
+
+def test_import_and_load_order(library):
+    scenarios = [make_params(Q=q) for q in (1000, 2000, 3000)]
+    batch = ModelParamsBatch.from_params(scenarios)
+    assert library.import_batch(batch) == 3
+    assert library.import_batch(batch) == 0
+    params = make_params(ALL_BASES_ITEMS, Q=4000)
+    library.save(params)
+    loaded = library.load()
+    np.testing.assert_array_equal(loaded.batch.Q, [1000, 2000, 3000, 4000])
+    np.testing.assert_allclose(loaded.result["total"][:3], calc_total_batch(batch)["total"])
+    assert loaded.extra_items[:3] == [None] * 3
+    assert loaded.extra_items[3] == list(ALL_BASES_ITEMS)
+    assert library.keys() == library.load(library.keys()).keys
+
+
+def test_shared_catalog_loads_once_per_text(library):
+    import json
+    from dataclasses import asdict
+
+    scenarios = [make_params(Q=q) for q in (1000, 2000, 3000, 4000)]
+    batch = ModelParamsBatch.from_params(scenarios)
+    text = json.dumps([asdict(item) for item in ALL_BASES_ITEMS])
+    other = json.dumps([asdict(ALL_BASES_ITEMS[0])])
+    assert library.import_batch(batch, extra_items=[text, None, text, other]) == 4
+    loaded = library.load()
+    assert loaded.extra_items[0] == list(ALL_BASES_ITEMS)
+    assert loaded.extra_items[0] is loaded.extra_items[2]
+    assert loaded.extra_items[1] is None
+    assert loaded.extra_items[3] == [ALL_BASES_ITEMS[0]]
+
+    store = library.to_store()
+    totals = calc_total_batch(batch)["total"]
+    expected = [list(ALL_BASES_ITEMS), [], list(ALL_BASES_ITEMS), [ALL_BASES_ITEMS[0]]]
+    for i, items in enumerate(expected):
+        assert store[i].params.extra_items == items
+        assert store[i].result["total"] == pytest.approx(totals[i])
+
+
+def test_search_treats_wildcards_literally(library):
+    library.save(make_params(Q=1000), name="знижка 50%", tags=["a_b"])
+    library.save(make_params(Q=2000), name="знижка 500", tags=["axb"])
+    assert list(library.search("50%")["name"]) == ["знижка 50%"]
+    assert list(library.search(tags=["a_b"])["name"]) == ["знижка 50%"]
+    assert len(library.search("знижка")) == 2
+
+
+def test_import_checks_only_chunk_keys(library):
+    # пакети більші за ліміт параметрів запиту; частина ключів уже є
+    scenarios = [make_params(Q=1000 + q) for q in range(2000)]
+    batch = ModelParamsBatch.from_params(scenarios)
+    first = ModelParamsBatch.from_params(scenarios[:1200] + scenarios[:5])
+    assert library.import_batch(first) == 1200
+    assert library.import_batch(batch) == 800
+    assert library.import_batch(batch) == 0
+    assert len(library) == 2000
+    np.testing.assert_array_equal(np.sort(library.load().batch.Q), [s.Q for s in scenarios])
+
+
+def test_categories_are_not_merged(library):
+    food = make_params([ExtraItem("Пакування", "cost", 4.5, "per_order", "food")])
+    bags = make_params([ExtraItem("Пакування", "cost", 4.5, "per_order", "bags")])
+    keys = [library.save(food), library.save(bags)]
+    assert len(library) == 2
+    assert [library.get(key)[0].extra_items[0].category for key in keys] == ["food", "bags"]
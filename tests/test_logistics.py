@@ -0,0 +1,142 @@
+import io
+import json
+from dataclasses import asdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch_runner
+from conftest import make_params
+from logistics import Tariff, TariffTable, ZoneLogistics, load_zone_logistics
+from model_transaction_costs import (
+    PARAM_FIELDS,
+    ModelParamsBatch,
+    calc_logistics,
+    calc_total,
+    calc_total_batch,
+    params_to_dict,
+)
+
+TARIFFS = [
+    Tariff("np", "kyiv", 1.0, 50.0, 30.0, 0.5),
+    Tariff("np", "kyiv", 5.0, 70.0, 40.0, 0.5),
+    Tariff("np", "region", 1.0, 60.0, 35.0),
+    Tariff("np", "region", 5.0, 90.0, 45.0),
+    Tariff("ukr", "kyiv", 2.0, 40.0, 20.0),
+    Tariff("ukr", "region", 2.0, 45.0, 25.0),
+    Tariff("ukr", "region", 10.0, 80.0, 50.0),
+]
+
+
+def _batch():
+    rng = np.random.default_rng(7)
+    scenarios = [
+        make_params(Q=int(q), p_loc=p, p_int=1 - p, return_rate=r, c_loc=cl, c_int=ci)
+        for q, p, r, cl, ci in zip(
+            rng.integers(100, 50000, 50), rng.random(50), rng.random(50) * 0.2,
+            rng.random(50) * 100, rng.random(50) * 100,
+        )
+    ]
+    return scenarios, ModelParamsBatch.from_params(scenarios)
+
+
+def test_two_zones_match_calc_logistics_exactly():
+    scenarios, batch = _batch()
+    for params in scenarios:
+        zones = ZoneLogistics.from_params(params)
+        assert zones.calc(params) == calc_logistics(params)
+        assert zones.calc_total(params) == calc_total(params)
+    zones = ZoneLogistics.from_params(batch)
+    np.testing.assert_array_equal(zones.calc(batch), calc_logistics(batch))
+    expected = calc_total_batch(batch)
+    for name, values in zones.calc_total_batch(batch).items():
+        np.testing.assert_array_equal(values, expected[name])
+
+
+def test_tariff_brackets_edges():
+    table = TariffTable(TARIFFS)
+    # межа категорії включна: 1.0 кг - ще перша категорія, 1.0001 - друга
+    delivery, returns = table.rates("np", "kyiv", [0.0, 0.5, 1.0, 1.0001, 2.0, 5.0])
+    np.testing.assert_array_equal(delivery, [50, 50, 50, 70, 70, 70])
+    np.testing.assert_array_equal(returns, [30, 30, 30, 40, 40, 40])
+    # спільні межі інших перевізників (2.0) не змінюють категорію np
+    delivery, _ = table.rates("ukr", "region", [2.0, 2.5, 10.0])
+    np.testing.assert_array_equal(delivery, [45, 80, 80])
+    # оголошена вартість - відсоток понад ціну
+    delivery, _ = table.rates("np", "kyiv", 1.0, declared_value=1000.0)
+    assert delivery == pytest.approx(55.0)
+    # коди замість назв
+    delivery, _ = table.rates(table.carriers.index("ukr"), table.zones.index("kyiv"), 1.5)
+    assert delivery == 40.0
+
+
+def test_tariff_lookup_errors():
+    table = TariffTable(TARIFFS)
+    with pytest.raises(ValueError, match="перевізник"):
+        table.rates("dhl", "kyiv", 1.0)
+    with pytest.raises(ValueError, match="зона"):
+        table.rates("np", "lviv", 1.0)
+    with pytest.raises(ValueError, match="зона"):
+        table.rates("np", 5, 1.0)
+    # найбільша категорія сітки - 10 кг
+    with pytest.raises(ValueError, match="перевищує"):
+        table.rates("ukr", "region", 10.5)
+    # у ukr / kyiv немає категорії понад 2 кг
+    with pytest.raises(ValueError, match="Немає тарифу"):
+        table.rates("ukr", "kyiv", [1.0, 3.0])
+    with pytest.raises(ValueError, match="Дубльована"):
+        TariffTable(TARIFFS + [Tariff("np", "kyiv", 5.0, 75.0)])
+
+
+def test_zone_costs_average_carriers_and_weights():
+    table = TariffTable(TARIFFS)
+    delivery, returns = table.zone_costs({"np": 0.25, "ukr": 0.75}, [0.5, 1.5])
+    # kyiv: np (50, 70), ukr (40, 40); region: np (60, 90), ukr (45, 45)
+    np.testing.assert_allclose(delivery, [0.25 * 60 + 0.75 * 40, 0.25 * 75 + 0.75 * 45])
+    np.testing.assert_allclose(returns, [0.25 * 35 + 0.75 * 20, 0.25 * 40 + 0.75 * 25])
+
+
+def _write_inputs(tmp_path, scenarios):
+    rows = [params_to_dict(p) for p in scenarios]
+    source = tmp_path / "scenarios.csv"
+    pd.DataFrame(rows, columns=list(PARAM_FIELDS)).to_csv(source, index=False)
+    pd.DataFrame([asdict(t) for t in TARIFFS]).to_csv(tmp_path / "tariffs.csv", index=False)
+    return source
+
+
+def test_batch_runner_with_zones(tmp_path):
+    scenarios, batch = _batch()
+    source = _write_inputs(tmp_path, scenarios)
+    config = {
+        "zones": {"kyiv": 0.6, "region": 0.4},
+        "tariffs": "tariffs.csv",
+        "carriers": {"np": 0.5, "ukr": 0.5},
+        "weight": 1.5,
+    }
+    (tmp_path / "zones.json").write_text(json.dumps(config))
+    zones = load_zone_logistics(str(tmp_path / "zones.json"))
+    assert zones.zones == ("kyiv", "region")
+
+    output = tmp_path / "out.csv"
+    batch_runner.run(str(source), str(output), chunk_size=20, logistics=zones, log=io.StringIO())
+    frame = pd.read_csv(output)
+    expected = zones.calc_total_batch(batch)
+    np.testing.assert_allclose(frame["logistics"], expected["logistics"])
+    np.testing.assert_allclose(frame["total"], expected["total"])
+    # решта статей - як без зонної моделі
+    np.testing.assert_allclose(frame["payments"], calc_total_batch(batch)["payments"])
+
+
+def test_zone_config_validation():
+    explicit = ZoneLogistics.from_dict({
+        "zones": {"a": 0.5, "b": 0.5},
+        "delivery": {"a": 10, "b": 20},
+        "returns": {"a": 1, "b": 2},
+    })
+    params = make_params(Q=100, return_rate=0.1)
+    assert explicit.calc(params) == pytest.approx(100 * 15 + 100 * 0.1 * 1.5)
+    with pytest.raises(ValueError, match="частки"):
+        ZoneLogistics.from_dict({"zones": {"a": 0.5}, "delivery": {}, "returns": {}})
+    with pytest.raises(ValueError, match="немає вартості"):
+        ZoneLogistics.from_dict({"zones": {"a": 1.0}, "delivery": {}, "returns": {"a": 1}})
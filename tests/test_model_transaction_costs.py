@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from conftest import ALL_BASES_ITEMS, make_params
+from model_transaction_costs import (
+    EXTRA_BASES,
+    PARAM_FIELDS,
+    RESULT_FIELDS,
+    ExtraItem,
+    ModelParamsBatch,
+    apply_extra_items,
+    calc_total,
+    calc_total_batch,
+    params_from_dict,
+    params_key,
+    params_to_dict,
+)
+
+
+def _scenarios(n: int):
+    rng = np.random.default_rng(1)
+    out = []
+    for i in range(n):
+        p = float(rng.uniform(0, 1))
+        # кожен сценарій - своя підмножина статей на всі бази
+        items = [item for j, item in enumerate(ALL_BASES_ITEMS) if (i >> j) & 1]
+        out.append(make_params(
+            items,
+            Q=int(rng.integers(0, 30000)),
+            avg_check=float(rng.uniform(100, 3000)),
+            p_loc=p,
+            p_int=1 - p,
+            return_rate=float(rng.uniform(0, 0.3)),
+            online_share=float(rng.uniform(0, 1)),
+            n_new_customers=int(rng.integers(0, 20000)),
+            cac=float(rng.uniform(0, 200)),
+        ))
+    return out
+
+
+def test_batch_matches_scalar_with_extras():
+    scenarios = _scenarios(64)
+    batch = ModelParamsBatch.from_params(scenarios)
+    result = calc_total_batch(batch)
+    assert set(result) == set(RESULT_FIELDS)
+    for i, params in enumerate(scenarios):
+        expected = calc_total(params)
+        for name in RESULT_FIELDS:
+            assert result[name][i] == pytest.approx(expected[name], rel=1e-12, abs=1e-6), name
+
+
+@pytest.mark.parametrize("basis", EXTRA_BASES)
+@pytest.mark.parametrize("kind", ["cost", "revenue"])
+def test_every_basis_and_kind(basis, kind):
+    params = make_params([ExtraItem("x", kind, 3.0, basis)])
+    drivers = {
+        "flat": 1.0,
+        "per_order": params.Q,
+        "per_return": params.Q * params.return_rate,
+        "percent_of_revenue": params.Q * params.avg_check / 100.0,
+    }
+    expected = calc_total(params)
+    assert expected[f"extra_{kind}"] == pytest.approx(3.0 * drivers[basis])
+    batch = calc_total_batch(ModelParamsBatch.from_params([params]))
+    assert batch["total"][0] == pytest.approx(expected["total"])
+
+
+def test_shared_catalog_matches_per_scenario_items():
+    scenarios = [make_params(ALL_BASES_ITEMS, Q=q) for q in (0, 5000, 20000)]
+    plain = ModelParamsBatch.from_params([make_params(Q=q) for q in (0, 5000, 20000)])
+    shared = calc_total_batch(apply_extra_items(plain, ALL_BASES_ITEMS))
+    expected = calc_total_batch(ModelParamsBatch.from_params(scenarios))
+    for name in RESULT_FIELDS:
+        np.testing.assert_allclose(shared[name], expected[name])
+
+
+def test_from_columns_broadcasts_scalars():
+    batch = ModelParamsBatch.from_columns(
+        {name: getattr(make_params(), name) for name in PARAM_FIELDS} | {"Q": [1, 2, 3]}
+    )
+    assert len(batch) == 3
+    np.testing.assert_array_equal(batch.cac, 52.0)
+    np.testing.assert_array_equal(batch.extra_cost, 0.0)
+
+
+def test_to_params_roundtrip(params_with_items):
+    batch = ModelParamsBatch.from_params([params_with_items])
+    params = batch.to_params(0)
+    assert isinstance(params.Q, int)
+    assert calc_total(params) == pytest.approx(calc_total(params_with_items))
+
+
+def test_dict_roundtrip_and_key(params_with_items):
+    again = params_from_dict(params_to_dict(params_with_items))
+    assert again == params_with_items
+    assert params_key(again) == params_key(params_with_items)
+    assert params_key(make_params(Q=10900.0)) == params_key(make_params(Q=10900))
+    with pytest.raises(ValueError):
+        params_from_dict({"Q": 1})
+
+
+def test_key_includes_item_category():
+    plain = make_params([ExtraItem("Пакування", "cost", 4.5, "per_order")])
+    food = make_params([ExtraItem("Пакування", "cost", 4.5, "per_order", "food")])
+    bags = make_params([ExtraItem("Пакування", "cost", 4.5, "per_order", "bags")])
+    assert len({params_key(plain), params_key(food), params_key(bags)}) == 3
+    # порожня категорія - той самий ключ, що й без неї
+    assert params_key(plain) == params_key(
+        make_params([ExtraItem("Пакування", "cost", 4.5, "per_order", "")])
+    )
@@ -0,0 +1,162 @@
+import dataclasses
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import ALL_BASES_ITEMS, make_params
+from model_transaction_costs import ModelParamsBatch, apply_extra_items, calc_total_batch
+from optimizer import (
+    DEFAULT_BOUNDS,
+    InfeasibleError,
+    LinearConstraint,
+    _simplex,
+    marketing_budget,
+    min_orders,
+    optimize,
+    pareto_front,
+)
+
+_NONE = np.zeros((0, 2))
+
+
+def _lp(c, a_ub=_NONE, b_ub=(), a_eq=None, b_eq=()):
+    c = np.asarray(c, dtype=np.float64)
+    a_eq = np.zeros((0, len(c))) if a_eq is None else np.asarray(a_eq, dtype=np.float64)
+    return _simplex(c, np.asarray(a_ub, dtype=np.float64).reshape(-1, len(c)),
+                    np.asarray(b_ub, dtype=np.float64), a_eq, np.asarray(b_eq, dtype=np.float64))
+
+
+def _vertex_optimum(c, a_ub, b_ub):
+    # Перебір усіх вершин: n активних обмежень із a_ub і z >= 0
+    n = len(c)
+    rows = np.vstack([a_ub, -np.eye(n)])
+    rhs = np.concatenate([b_ub, np.zeros(n)])
+    best = np.inf
+    for active in itertools.combinations(range(len(rows)), n):
+        a = rows[list(active)]
+        if abs(np.linalg.det(a)) < 1e-9:
+            continue
+        z = np.linalg.solve(a, rhs[list(active)])
+        if (rows @ z <= rhs + 1e-7).all():
+            best = min(best, c @ z)
+    return best
+
+
+def test_simplex_known_optima():
+    # max x + y: x + 2y <= 4, 3x + y <= 6 -> (1.6, 1.2)
+    z = _lp([-1.0, -1.0], [[1, 2], [3, 1]], [4, 6])
+    np.testing.assert_allclose(z, [1.6, 1.2])
+    # рівність і обмеження з від'ємною правою частиною (x >= 1)
+    z = _lp([1.0, 2.0], [[-1, 0]], [-1], [[1, 1]], [3])
+    np.testing.assert_allclose(z, [3.0, 0.0])
+    z = _lp([2.0, 1.0], [[-1, 0]], [-1], [[1, 1]], [3])
+    np.testing.assert_allclose(z, [1.0, 2.0])
+    # вироджена вершина (три обмеження через одну точку)
+    z = _lp([-1.0, -1.0], [[1, 0], [0, 1], [1, 1]], [1, 1, 2])
+    np.testing.assert_allclose(z, [1.0, 1.0])
+
+
+def test_simplex_matches_vertex_enumeration():
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        n, m = 3, 5
+        a_ub = rng.uniform(-1, 2, (m, n))
+        b_ub = rng.uniform(0.5, 5, m)
+        # межі змінних, щоб задача була обмеженою
+        a_ub = np.vstack([a_ub, np.eye(n)])
+        b_ub = np.concatenate([b_ub, rng.uniform(1, 4, n)])
+        c = rng.normal(size=n)
+        z = _lp(c, a_ub, b_ub)
+        assert (a_ub @ z <= b_ub + 1e-7).all() and (z >= -1e-9).all()
+        assert c @ z == pytest.approx(_vertex_optimum(c, a_ub, b_ub), abs=1e-7)
+
+
+def test_simplex_infeasible_and_unbounded():
+    # x <= 1 і x >= 2
+    with pytest.raises(InfeasibleError):
+        _lp([1.0, 0.0], [[1, 0], [-1, 0]], [1, -2])
+    # x + y == -1 при x, y >= 0
+    with pytest.raises(InfeasibleError):
+        _lp([1.0, 1.0], a_eq=[[1, 1]], b_eq=[-1])
+    # max x без верхньої межі
+    with pytest.raises(ValueError, match="необмежена"):
+        _lp([-1.0, 0.0], [[0, 1]], [1])
+
+
+def _grid_min(base, axes):
+    # Мінімум total на сітці (включно з усіма вершинами області)
+    names = list(axes)
+    mesh = [m.ravel() for m in np.meshgrid(*axes.values(), indexing="ij")]
+    columns = {name: getattr(base, name) for name in DEFAULT_BOUNDS}
+    columns.update(dict(zip(names, mesh)))
+    if "p_loc" in names:
+        columns["p_int"] = 1.0 - columns["p_loc"]
+    batch = ModelParamsBatch.from_columns(columns, size=len(mesh[0]))
+    return calc_total_batch(apply_extra_items(batch, base.extra_items))["total"].min()
+
+
+@pytest.mark.parametrize("free", [
+    ["Q", "cac", "online_share"],
+    ["p_loc", "c_loc", "return_rate"],
+    ["Q", "p_loc", "staff_per_order", "avg_check"],
+])
+def test_optimize_not_worse_than_grid(free):
+    base = make_params(ALL_BASES_ITEMS)
+    bounds = {
+        "Q": (8000.0, 12000.0),
+        "cac": (40.0, 60.0),
+        "online_share": (0.2, 0.8),
+        "p_loc": (0.1, 0.9),
+        "c_loc": (30.0, 60.0),
+        "return_rate": (0.02, 0.1),
+        "staff_per_order": (15.0, 30.0),
+        "avg_check": (700.0, 1000.0),
+    }
+    opt = optimize(base, free, bounds=bounds)
+    assert opt.success
+    grid = _grid_min(base, {name: np.linspace(*bounds[name], 9) for name in free})
+    assert opt.result["total"] <= grid + 1e-6 * abs(grid)
+    for name in free:
+        lo, hi = bounds[name]
+        assert lo - 1e-9 <= opt.x[name] <= hi + 1e-9
+    # точний пошук по відрізку не збільшує total
+    assert all(b <= a + 1e-9 * abs(a) for a, b in zip(opt.history, opt.history[1:]))
+
+
+def test_optimize_respects_constraints():
+    base = make_params(Q=10000)
+    free = ["Q", "p_loc", "n_new_customers", "online_share"]
+    constraints = [min_orders(9000.0), marketing_budget(base, 300000.0, free)]
+    bounds = {"Q": (0.0, 20000.0), "n_new_customers": (5000.0, 10000.0)}
+    opt = optimize(base, free, bounds=bounds, constraints=constraints)
+    assert opt.success
+    assert opt.params.Q >= 9000.0 - 1e-6
+    assert opt.params.n_new_customers * base.cac <= 300000.0 + 1e-6
+    assert opt.params.n_new_customers >= 5000.0 - 1e-6
+    assert opt.params.p_loc + opt.params.p_int == pytest.approx(1.0)
+    # total зростає з Q і n_new_customers - оптимум на межах обмежень
+    assert opt.params.Q == pytest.approx(9000.0)
+    assert opt.params.n_new_customers == pytest.approx(5000.0)
+
+    with pytest.raises(InfeasibleError):
+        optimize(base, ["Q"], bounds={"Q": (0.0, 5000.0)}, constraints=[min_orders(6000.0)])
+    with pytest.raises(ValueError):
+        marketing_budget(base, 1000.0, ["n_new_customers", "cac"])
+    with pytest.raises(ValueError):
+        optimize(base, ["Q"], constraints=[LinearConstraint({"Q": 1.0}, "<", 1.0)])
+
+
+def test_pareto_front_is_non_dominated():
+    base = make_params()
+    constraints = [min_orders(3000.0)]
+    front = pareto_front(base, ["Q", "p_loc", "online_share"],
+                         q_values=[1000, 2000, 4000, 8000, 16000], constraints=constraints)
+    # Q < 3000 недопустимі й пропускаються
+    assert front["Q"].min() >= 3000
+    assert front["Q"].is_monotonic_increasing
+    assert front["total"].is_monotonic_increasing
+    for _, row in front.iterrows():
+        point = optimize(dataclasses.replace(base, Q=row["Q"]),
+                         ["p_loc", "online_share"], constraints=constraints)
+        assert row["total"] == pytest.approx(point.result["total"])
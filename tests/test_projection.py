@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from conftest import ALL_BASES_ITEMS, make_params
+from formulas import Formula, compile_formulas
+from model_transaction_costs import (
+    RESULT_FIELDS,
+    ExtraItem,
+    ModelParamsBatch,
+    calc_total,
+    calc_total_batch,
+)
+from projection import ProjectionSpec, StaffStep, expand, project
+from scenario_store import ScenarioStore
+
+SPEC = ProjectionSpec(
+    periods=6,
+    q_growth=0.05,
+    return_seasonality=(1.0, 1.2, 0.8),
+    staff_steps=(StaffStep(12000, 600000.0),),
+)
+
+
+def _period_params(proj, scenario, period, items):
+    # ModelParams періоду з тими самими статтями, що й у вихідного сценарію
+    params = ModelParamsBatch(
+        **{name: values[:, period] for name, values in vars(proj.params).items()}
+    ).to_params(scenario)
+    params.extra_items = list(items)
+    return params
+
+
+def test_projection_matches_calc_total_per_period():
+    scenarios = [make_params(ALL_BASES_ITEMS), make_params(Q=5000, extra_items=ALL_BASES_ITEMS[:2])]
+    proj = project(scenarios, SPEC)
+    for s, base in enumerate(scenarios):
+        for period in range(SPEC.periods):
+            expected = calc_total(_period_params(proj, s, period, base.extra_items))
+            for name in RESULT_FIELDS:
+                assert proj.per_period[name][s, period] == pytest.approx(expected[name])
+
+
+def test_batch_with_catalogs_matches_params():
+    scenarios = [make_params(ALL_BASES_ITEMS), make_params()]
+    expected = project(scenarios, SPEC).per_period["total"]
+    batch = ModelParamsBatch.from_params(scenarios)
+    catalogs = [s.extra_items for s in scenarios]
+    np.testing.assert_allclose(project(batch, SPEC, extra_items=catalogs).per_period["total"], expected)
+    # без каталогів - лише суми базового періоду (статті не зростають з Q)
+    frozen = project(batch, SPEC).per_period["extra_net"]
+    np.testing.assert_allclose(frozen, np.broadcast_to(frozen[:, :1], frozen.shape))
+
+
+def test_expand_respects_extra_overrides():
+    batch = ModelParamsBatch.from_params([make_params(ALL_BASES_ITEMS)])
+    expanded = expand(batch, SPEC, {"extra_cost": 1.0}, [ALL_BASES_ITEMS])
+    np.testing.assert_array_equal(expanded.extra_cost, 1.0)
+    assert expanded.extra_revenue[0, -1] > expanded.extra_revenue[0, 0]
+
+
+def test_store_catalogs():
+    store = ScenarioStore()
+    params = make_params([ExtraItem("Пакування", "cost", 4.5, "per_order")])
+    store.append(params, calc_total(params))
+    plain = ModelParamsBatch.from_params([make_params([ExtraItem("x", "cost", 100.0)])])
+    store.extend(plain, calc_total_batch(plain))
+    proj = project(store.batch(), SPEC, extra_items=store.extra_catalogs())
+    np.testing.assert_allclose(proj.per_period["extra_cost"][0], 4.5 * proj.params.Q[0])
+    np.testing.assert_allclose(proj.per_period["extra_cost"][1], 100.0)
+
+
+def test_formula_components_carry_over():
+    # extra_cost пакета = статті каталогу + власна стаття 1000 грн
+    params = make_params([ExtraItem("Пакування", "cost", 4.5, "per_order")])
+    batch = ModelParamsBatch.from_params([params])
+    batch.extra_cost = batch.extra_cost + 1000.0
+    proj = project(batch, SPEC, extra_items=[params.extra_items])
+    np.testing.assert_allclose(proj.per_period["extra_cost"][0], 4.5 * proj.params.Q[0] + 1000.0)
+    # без набору формул 1000 грн не перераховуються - прогноз наближений
+    assert proj.approximate.tolist() == [True]
+
+
+FORMULAS = compile_formulas([
+    Formula("packaging", "Q * 4.5"),
+    Formula("fx_fees", "payments * p_int * 0.015"),
+    Formula("bonus", "min(Q, 12000) * 0.1", "revenue"),
+])
+
+
+def test_formulas_evaluated_per_period():
+    store = ScenarioStore()
+    with_formulas = make_params(ALL_BASES_ITEMS)
+    store.append(with_formulas, FORMULAS.calc_total(with_formulas), FORMULAS)
+    plain = make_params(ALL_BASES_ITEMS[:3], Q=8000)
+    store.append(plain, calc_total(plain))
+    proj = project(store.batch(), SPEC, extra_items=store.extra_catalogs(),
+                   formulas=store.formula_sets())
+    assert proj.approximate.tolist() == [False, False]
+    for period in range(SPEC.periods):
+        expected = FORMULAS.calc_total(_period_params(proj, 0, period, with_formulas.extra_items))
+        for name in RESULT_FIELDS:
+            assert proj.per_period[name][0, period] == pytest.approx(expected[name])
+        expected = calc_total(_period_params(proj, 1, period, plain.extra_items))
+        assert proj.per_period["total"][1, period] == pytest.approx(expected["total"])
+    # пакування росте разом з Q, а не лишається на рівні першого періоду
+    assert proj.per_period["extra_cost"][0, -1] > proj.per_period["extra_cost"][0, 0]
+
+
+def test_components_without_formulas_are_approximate():
+    # як сценарій з бібліотеки: значення власних статей є, набору формул немає
+    params = make_params(ALL_BASES_ITEMS)
+    batch = ModelParamsBatch.from_params([params])
+    store = ScenarioStore()
+    store.extend(batch, FORMULAS.calc_total_batch(batch), [params.extra_items])
+    summed = ModelParamsBatch.from_params([make_params(ALL_BASES_ITEMS[:1])])
+    store.extend(summed, calc_total_batch(summed))
+    proj = project(store.batch(), SPEC, extra_items=store.extra_catalogs(),
+                   formulas=store.formula_sets())
+    assert proj.approximate.tolist() == [True, True]
+    assert not project([params], SPEC).approximate.any()
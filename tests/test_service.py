@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+
+from model_transaction_costs import calc_total, params_to_dict
+from service import HTTPError, MicroBatcher, Service, _parse_params
+from conftest import make_params
+
+
+def _body(**changes) -> dict:
+    data = params_to_dict(make_params())
+    data.update(changes)
+    return data
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"Q": "abc"},
+        {"Q": True},
+        {"cac": None},
+        {"extra_items": [{"name": "x", "kind": "cost", "amount": 1, "basis": "weird"}]},
+        {"extra_items": [{"name": "x", "kind": "other", "amount": 1}]},
+        {"extra_items": [{"name": "x", "kind": "cost", "amount": "1"}]},
+        {"extra_items": {"name": "x"}},
+        {"unknown": 1},
+    ],
+)
+def test_parse_params_rejects_bad_input(changes):
+    with pytest.raises(HTTPError) as e:
+        _parse_params(_body(**changes))
+    assert e.value.status == 400
+
+
+def test_bad_request_does_not_fail_batch():
+    async def run():
+        service = Service(MicroBatcher(max_batch=100, max_delay=0.01))
+        good = json.dumps(_body()).encode()
+        bad = json.dumps(_body(Q="abc")).encode()
+        return await asyncio.gather(
+            service.route("POST", "/calc", good),
+            service.route("POST", "/calc", bad),
+            service.route("POST", "/calc", good),
+            return_exceptions=True,
+        )
+
+    first, error, second = asyncio.run(run())
+    assert isinstance(error, HTTPError) and error.status == 400
+    assert first == second
+    assert first["total"] == pytest.approx(calc_total(make_params())["total"])
+
+
+def test_batch_failure_falls_back_to_single_requests(monkeypatch):
+    import service
+
+    evaluate = service.evaluate
+
+    def failing(scenarios):
+        if len(scenarios) > 1:
+            raise RuntimeError("batch")
+        if scenarios[0].Q < 0:
+            raise RuntimeError("bad scenario")
+        return evaluate(scenarios)
+
+    monkeypatch.setattr(service, "evaluate", failing)
+
+    async def run():
+        batcher = MicroBatcher(max_batch=100, max_delay=0.01)
+        good = _parse_params(_body())
+        bad = _parse_params(_body(Q=-1))
+        return await asyncio.gather(
+            batcher.submit(good), batcher.submit(bad), return_exceptions=True
+        )
+
+    good, bad = asyncio.run(run())
+    assert good["total"] == pytest.approx(calc_total(make_params())["total"])
+    assert isinstance(bad, RuntimeError)